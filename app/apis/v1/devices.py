@@ -1,31 +1,71 @@
 """Device management API endpoints."""
 
-from typing import Annotated
+import json
+from typing import Annotated, AsyncGenerator, AsyncIterator, Optional, Sequence
 
 from dependency_injector.wiring import Provide, inject
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.core.containers import Container
 from app.dtos.devices_dto import DevicePayload, UpdateDevicePayload
 from app.repos.device_repo import DeviceRepo
-from app.services.dahua_netsdk_service import DahuaNetSDKService
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.device_registry import DeviceRegistry
+from app.types.dahua_netsdk_types import AccessCardRecord
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
 
+def _encode_ndjson_page(page: Sequence[AccessCardRecord]) -> bytes:
+    return "".join(json.dumps(record.to_dict()) + "\n" for record in page).encode()
+
+
+async def _ndjson_response(
+    pages: AsyncGenerator[Sequence[AccessCardRecord], None],
+) -> StreamingResponse:
+    """Stream record pages as NDJSON, one line per record.
+
+    The first page is fetched before the response starts so that login and
+    query errors still surface as a regular HTTP error.
+    """
+    first_page = await anext(pages, [])
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            yield _encode_ndjson_page(first_page)
+            async for page in pages:
+                yield _encode_ndjson_page(page)
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @router.get("/{device_code}/recordings")
 @inject
 async def get_device_recordings(
     device_code: str,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
     n_rec: int = 1,
     by_asc_order: bool = False,
+    stream: bool = False,
 ):
-    """Get device recordings by device code using dependency injection."""
+    """Get device recordings by device code using dependency injection.
+
+    With ``stream=true`` the records are sent as NDJSON page by page.
+    """
     try:
-        records = dahua_net_sdk_service.find_records(
+        if stream:
+            return await _ndjson_response(
+                dahua_net_sdk_service.iter_records(
+                    device_code, n_rec=n_rec, by_asc_order=by_asc_order
+                )
+            )
+
+        records = await dahua_net_sdk_service.find_records(
             device_code, n_rec=n_rec, by_asc_order=by_asc_order
         )
 
@@ -40,16 +80,38 @@ async def get_device_recordings(
 async def get_device_recordings_from(
     device_code: str,
     from_rec_no: int,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
     n_rec: int = 1,
     by_asc_order: bool = False,
+    stream: bool = False,
+    from_time: Optional[int] = None,
 ):
-    """Get device recordings from a specific record number using dependency injection."""
+    """Get device recordings from a specific record number using dependency injection.
+
+    With ``stream=true`` the records are sent as NDJSON page by page. Passing the
+    ``from_time`` (unix timestamp) of the record at ``from_rec_no`` lets the device
+    seek there instead of scanning its whole history.
+    """
     try:
-        records = dahua_net_sdk_service.find_records_by_rec_no(
-            device_code, from_rec_no=from_rec_no, n_rec=n_rec, by_asc_order=by_asc_order
+        if stream:
+            return await _ndjson_response(
+                dahua_net_sdk_service.iter_records_by_rec_no(
+                    device_code,
+                    from_rec_no=from_rec_no,
+                    n_rec=n_rec,
+                    by_asc_order=by_asc_order,
+                    from_time=from_time,
+                )
+            )
+
+        records = await dahua_net_sdk_service.find_records_by_rec_no(
+            device_code,
+            from_rec_no=from_rec_no,
+            n_rec=n_rec,
+            by_asc_order=by_asc_order,
+            from_time=from_time,
         )
 
         return records
@@ -62,13 +124,13 @@ async def get_device_recordings_from(
 @inject
 async def get_device_info(
     device_code: str,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
 ):
     """Get device info by device code using dependency injection."""
     try:
-        device_info = dahua_net_sdk_service.get_device_info(device_code)
+        device_info = await dahua_net_sdk_service.get_device_info(device_code)
         return device_info
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -105,11 +167,15 @@ async def list_devices(
 @inject
 async def create_device(
     device_repo: Annotated[DeviceRepo, Depends(Provide[Container.device_repo])],
+    device_registry: Annotated[
+        DeviceRegistry, Depends(Provide[Container.device_registry])
+    ],
     device_data: DevicePayload,
 ):
     """Create a new device using dependency injection."""
     try:
         device = await device_repo.create_device(device_data)
+        device_registry.invalidate(device_data.code)
         return {"id": device.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -120,6 +186,9 @@ async def create_device(
 async def update_device(
     device_code: str,
     device_repo: Annotated[DeviceRepo, Depends(Provide[Container.device_repo])],
+    device_registry: Annotated[
+        DeviceRegistry, Depends(Provide[Container.device_registry])
+    ],
     device_data: UpdateDevicePayload,
 ):
     """Update an existing device using dependency injection."""
@@ -127,6 +196,9 @@ async def update_device(
         device = await device_repo.update_device_by_code(
             device_code, device_data.model_dump()
         )
+        device_registry.invalidate(device_code)
+        if device_data.code is not None:
+            device_registry.invalidate(device_data.code)
         if not device:
             raise HTTPException(status_code=404, detail="Device not found")
 
@@ -140,10 +212,14 @@ async def update_device(
 async def delete_device(
     device_code: str,
     device_repo: Annotated[DeviceRepo, Depends(Provide[Container.device_repo])],
+    device_registry: Annotated[
+        DeviceRegistry, Depends(Provide[Container.device_registry])
+    ],
 ):
     """Delete a device using dependency injection."""
     try:
         await device_repo.delete_device_by_code(device_code)
+        device_registry.invalidate(device_code)
         return {"detail": "Device deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -17,3 +17,75 @@ async def event_bus_stats(container: Container = Depends(get_container)):
     event_bus = container.event_bus()
     stats = event_bus.get_stats()
     return {"status": "healthy", "event_bus": stats}
+
+
+@router.get("/netsdk")
+async def netsdk_stats(container: Container = Depends(get_container)):
+    """Get NetSDK find handle, cursor and record buffer statistics"""
+    dahua_netsdk_service = container.dahua_netsdk_service()
+    stats = dahua_netsdk_service.get_find_handle_stats()
+    return {"status": "healthy", "netsdk": stats}
+
+
+@router.get("/sessions")
+async def session_stats(container: Container = Depends(get_container)):
+    """Get device session states, reconnects and keepalive statistics"""
+    dahua_netsdk_service = container.dahua_netsdk_service()
+    stats = dahua_netsdk_service.get_session_stats()
+    return {"status": "healthy", "sessions": stats}
+
+
+@router.get("/alarms")
+async def alarm_stats(container: Container = Depends(get_container)):
+    """Get device alarm subscriptions and received alarm statistics"""
+    dahua_netsdk_service = container.dahua_netsdk_service()
+    return {"status": "healthy", "alarms": dahua_netsdk_service.get_alarm_stats()}
+
+
+@router.get("/logins")
+async def login_stats(container: Container = Depends(get_container)):
+    """Get login queue depth, throughput and wait statistics"""
+    login_scheduler = container.login_scheduler()
+    return {"status": "healthy", "logins": login_scheduler.get_stats()}
+
+
+@router.get("/uploads")
+async def upload_stats(container: Container = Depends(get_container)):
+    """Get S3 snapshot upload queue and throughput statistics"""
+    s3_uploader = container.s3_uploader()
+    return {"status": "healthy", "uploads": s3_uploader.get_stats()}
+
+
+@router.get("/webhooks")
+async def webhook_stats(container: Container = Depends(get_container)):
+    """Get webhook routes, queues and delivery statistics"""
+    webhook_router = container.webhook_router()
+    webhook_dispatcher = container.webhook_dispatcher()
+    return {
+        "status": "healthy",
+        "webhooks": {
+            **webhook_router.get_stats(),
+            "delivery": webhook_dispatcher.get_stats(),
+        },
+    }
+
+
+@router.get("/outbox")
+async def outbox_stats(container: Container = Depends(get_container)):
+    """Get event outbox storage, delivery and replay statistics"""
+    event_outbox = container.event_outbox()
+    return {"status": "healthy", "outbox": event_outbox.get_stats()}
+
+
+@router.get("/checkpoints")
+async def checkpoint_stats(container: Container = Depends(get_container)):
+    """Get pending and written device checkpoint statistics"""
+    checkpoint_writer = container.checkpoint_writer()
+    return {"status": "healthy", "checkpoints": checkpoint_writer.get_stats()}
+
+
+@router.get("/devices")
+async def device_registry_stats(container: Container = Depends(get_container)):
+    """Get device registry cache statistics"""
+    device_registry = container.device_registry()
+    return {"status": "healthy", "devices": device_registry.get_stats()}
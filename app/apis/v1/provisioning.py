@@ -0,0 +1,90 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.containers import Container
+from app.dtos.provisioning_dto import FleetSyncPayload, ProvisioningJobPayload
+from app.services.provisioning_service import ProvisioningService
+from app.services.user_sync_service import UserSyncService
+from app.types.dahua_netsdk_types import UserPayload
+
+router = APIRouter(prefix="/provisioning", tags=["provisioning"])
+
+
+@router.post("/jobs", status_code=202)
+@inject
+async def create_job(
+    body: ProvisioningJobPayload,
+    provisioning_service: ProvisioningService = Depends(
+        Provide[Container.provisioning_service]
+    ),
+):
+    """Add a user to many devices at once; poll the job for progress."""
+    user = UserPayload(
+        card_name=body.user.card_name,
+        card_no=body.user.card_no,
+        user_id=body.user.user_id,
+        sz_pw=body.user.sz_pw,
+        valid_start_time=body.user.valid_start_time,
+        valid_end_time=body.user.valid_end_time,
+    )
+    job = await provisioning_service.create_job(
+        user,
+        face_image_url=body.face_image_url,
+        company_code=body.company_code,
+        device_codes=body.device_codes,
+    )
+    return job.to_dict(with_results=False)
+
+
+@router.get("/jobs")
+@inject
+async def list_jobs(
+    provisioning_service: ProvisioningService = Depends(
+        Provide[Container.provisioning_service]
+    ),
+):
+    """List recent provisioning jobs, newest first."""
+    return [job.to_dict(with_results=False) for job in provisioning_service.list_jobs()]
+
+
+@router.get("/jobs/{job_id}")
+@inject
+async def get_job(
+    job_id: str,
+    provisioning_service: ProvisioningService = Depends(
+        Provide[Container.provisioning_service]
+    ),
+):
+    """Get a provisioning job with its per-device results."""
+    job = provisioning_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.post("/sync")
+@inject
+async def sync_fleet(
+    body: FleetSyncPayload,
+    user_sync_service: UserSyncService = Depends(Provide[Container.user_sync_service]),
+):
+    """Make every target device hold exactly the given users."""
+    payloads = [
+        UserPayload(
+            card_name=user.card_name,
+            card_no=user.card_no,
+            user_id=user.user_id,
+            sz_pw=user.sz_pw,
+            valid_start_time=user.valid_start_time,
+            valid_end_time=user.valid_end_time,
+        )
+        for user in body.users
+    ]
+    reports = await user_sync_service.sync_devices(
+        payloads,
+        company_code=body.company_code,
+        device_codes=body.device_codes,
+        delete_missing=body.delete_missing,
+        dry_run=body.dry_run,
+    )
+    return [report.to_dict() for report in reports]
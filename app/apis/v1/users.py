@@ -2,8 +2,15 @@ from dependency_injector.wiring import Provide, inject
 from fastapi import APIRouter, Depends
 
 from app.core.containers import Container
-from app.dtos.users_dto import AddFacePayload, AddUserPayload
-from app.services.dahua_netsdk_service import DahuaNetSDKService
+from app.dtos.users_dto import (
+    AddFacePayload,
+    AddFacesBatchPayload,
+    AddUserPayload,
+    AddUsersBatchPayload,
+    SyncUsersPayload,
+)
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.user_sync_service import UserSyncService
 from app.types.dahua_netsdk_types import UserPayload
 
 router = APIRouter(prefix="/device/{device_code}/users", tags=["users"])
@@ -14,8 +21,8 @@ router = APIRouter(prefix="/device/{device_code}/users", tags=["users"])
 async def add_user(
     device_code: str,
     body: AddUserPayload,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
 ):
 
@@ -27,10 +34,10 @@ async def add_user(
     )
     try:
 
-        dahua_net_sdk_service.add_user(device_code, demo_payload)
+        await dahua_net_sdk_service.add_user(device_code, demo_payload)
 
         if body.face_image_url:
-            dahua_net_sdk_service.add_face(
+            await dahua_net_sdk_service.add_face(
                 device_code, demo_payload.user_id, body.face_image_url
             )
     except Exception as e:
@@ -39,17 +46,104 @@ async def add_user(
     return {"message": "User added successfully"}
 
 
+@router.post(":batch")
+@inject
+async def add_users_batch(
+    device_code: str,
+    body: AddUsersBatchPayload,
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
+    ),
+):
+    """Add many users at once; the result lists the outcome of every user."""
+    payloads = [
+        UserPayload(
+            card_name=user.card_name,
+            card_no=user.card_no,
+            user_id=user.user_id,
+            sz_pw=user.sz_pw,
+            valid_start_time=user.valid_start_time,
+            valid_end_time=user.valid_end_time,
+        )
+        for user in body.users
+    ]
+    try:
+        results = await dahua_net_sdk_service.add_users(device_code, payloads)
+    except Exception as e:
+        return {"error": str(e)}
+
+    succeeded = sum(1 for result in results if result.success)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": [result.to_dict() for result in results],
+    }
+
+
+@router.post(":sync")
+@inject
+async def sync_users(
+    device_code: str,
+    body: SyncUsersPayload,
+    user_sync_service: UserSyncService = Depends(Provide[Container.user_sync_service]),
+):
+    """Make the device hold exactly the given users, writing only the changes."""
+    payloads = [
+        UserPayload(
+            card_name=user.card_name,
+            card_no=user.card_no,
+            user_id=user.user_id,
+            sz_pw=user.sz_pw,
+            valid_start_time=user.valid_start_time,
+            valid_end_time=user.valid_end_time,
+        )
+        for user in body.users
+    ]
+    report = await user_sync_service.sync_device(
+        device_code,
+        payloads,
+        delete_missing=body.delete_missing,
+        dry_run=body.dry_run,
+    )
+    return report.to_dict()
+
+
+@router.post("/faces:batch")
+@inject
+async def add_faces_batch(
+    device_code: str,
+    body: AddFacesBatchPayload,
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
+    ),
+):
+    """Enroll many faces at once; the result lists the outcome of every face."""
+    try:
+        results = await dahua_net_sdk_service.add_faces(
+            device_code, [(face.user_id, face.face_image_url) for face in body.faces]
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+    succeeded = sum(1 for result in results if result.success)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": [result.to_dict() for result in results],
+    }
+
+
 @router.get("")
 @inject
 async def list_users(
     device_code: str,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
 ):
     """List users for a specific device using dependency injection."""
     try:
-        users = dahua_net_sdk_service.list_users(device_code)
+        users = await dahua_net_sdk_service.list_users(device_code)
         return users
     except Exception as e:
         return {"error": str(e)}
@@ -60,31 +154,51 @@ async def list_users(
 async def get_user(
     device_code: str,
     user_id: str,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
 ):
     """Get a specific user for a device."""
     try:
         print("get user id====")
-        user = dahua_net_sdk_service.find_user(device_code, user_id)
+        user = await dahua_net_sdk_service.find_user(device_code, user_id)
         return user
     except Exception as e:
         return {"error": str(e)}
 
 
+@router.delete("/{user_id}")
+@inject
+async def remove_user(
+    device_code: str,
+    user_id: str,
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
+    ),
+):
+    """Remove a user and all of their cards from a device."""
+    try:
+        removed = await dahua_net_sdk_service.remove_user(device_code, user_id)
+        if not removed:
+            return {"error": "User not found"}
+        return {"message": "User removed successfully"}
+    except Exception as e:
+        return {"error": str(e)}
+
+
 @router.post("/{user_id}/face")
+@inject
 async def add_face(
     device_code: str,
     user_id: str,
     body: AddFacePayload,
-    dahua_net_sdk_service: DahuaNetSDKService = Depends(
-        Provide[Container.dahua_netsdk_service]
+    dahua_net_sdk_service: AsyncDahuaNetSDKService = Depends(
+        Provide[Container.async_dahua_netsdk_service]
     ),
 ):
     """Add a face to a specific user for a device."""
     try:
-        dahua_net_sdk_service.add_face(device_code, user_id, face_data)
+        await dahua_net_sdk_service.add_face(device_code, user_id, body.face_image_url)
         return {"message": "Face added successfully"}
     except Exception as e:
         return {"error": str(e)}
@@ -6,9 +6,21 @@ from app.core.database import Database
 from app.core.event_bus import AsyncEventBus
 from app.core.settings import Settings
 from app.handlers.device_event_handler import DeviceAutoRegisterHandler
-from app.handlers.update_last_rec_no_handler import UpdateLastRecNoHandler
 from app.repos.device_repo import DeviceRepo
+from app.repos.event_repo import EventRepo
+from app.repos.webhook_repo import WebhookRepo
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.checkpoint_writer import CheckpointWriter
 from app.services.dahua_netsdk_service import DahuaNetSDKService
+from app.services.device_registry import DeviceRegistry
+from app.services.event_outbox import EventOutbox
+from app.services.face_image_fetcher import FaceImageFetcher
+from app.services.login_scheduler import LoginScheduler
+from app.services.provisioning_service import ProvisioningService
+from app.services.s3_uploader import S3Uploader
+from app.services.user_sync_service import UserSyncService
+from app.services.webhook_dispatcher import WebhookDispatcher
+from app.services.webhook_router import WebhookRouter
 from app.workers.worker_manager import WorkerManager
 
 
@@ -21,7 +33,61 @@ class Container(containers.DeclarativeContainer):
     # Database singleton - managed manually in lifespan
     db = providers.Singleton(Database, settings=settings.provided)
 
-    dahua_netsdk_service = providers.Singleton(DahuaNetSDKService)
+    dahua_netsdk_service = providers.Singleton(
+        DahuaNetSDKService,
+        user_directory_ttl=settings.provided.USER_DIRECTORY_TTL_SECONDS,
+        keepalive_interval=settings.provided.AUTO_REGISTER_HEARTBEAT_INTERVAL,
+        reconnect_wait=settings.provided.SESSION_RECONNECT_WAIT_SECONDS,
+        reconnect_backoff_max=settings.provided.SESSION_RECONNECT_BACKOFF_MAX_SECONDS,
+        max_sessions=settings.provided.AUTO_REGISTER_MAX_SESSIONS,
+    )
+
+    face_image_fetcher = providers.Singleton(
+        FaceImageFetcher,
+        cache_dir=settings.provided.FACE_CACHE_DIR,
+        max_memory_bytes=settings.provided.FACE_CACHE_MEMORY_BYTES,
+        max_disk_bytes=settings.provided.FACE_CACHE_DISK_BYTES,
+        ttl=settings.provided.FACE_CACHE_TTL_SECONDS,
+        max_concurrency=settings.provided.FACE_FETCH_MAX_CONCURRENCY,
+    )
+
+    async_dahua_netsdk_service = providers.Singleton(
+        AsyncDahuaNetSDKService,
+        dahua_netsdk_service=dahua_netsdk_service,
+        max_workers=settings.provided.NETSDK_EXECUTOR_MAX_WORKERS,
+        face_image_fetcher=face_image_fetcher,
+    )
+
+    s3_uploader = providers.Singleton(
+        S3Uploader,
+        bucket=settings.provided.AWS_S3_BUCKET,
+        region=settings.provided.AWS_REGION,
+        access_key_id=settings.provided.AWS_ACCESS_KEY_ID,
+        secret_access_key=settings.provided.AWS_SECRET_ACCESS_KEY,
+        endpoint_url=settings.provided.AWS_S3_ENDPOINT_URL,
+        client_count=settings.provided.S3_CLIENT_POOL_SIZE,
+        max_concurrency=settings.provided.S3_UPLOAD_MAX_CONCURRENCY,
+        max_queue_size=settings.provided.S3_UPLOAD_QUEUE_SIZE,
+    )
+
+    webhook_dispatcher = providers.Singleton(
+        WebhookDispatcher,
+        default_url=settings.provided.WEBHOOK_URL,
+        http2=settings.provided.WEBHOOK_HTTP2,
+        max_connections=settings.provided.WEBHOOK_MAX_CONNECTIONS,
+        per_destination_concurrency=settings.provided.WEBHOOK_PER_DESTINATION_CONCURRENCY,
+        batch_size=settings.provided.WEBHOOK_BATCH_SIZE,
+        batch_linger=settings.provided.WEBHOOK_BATCH_LINGER_SECONDS,
+        timeout=settings.provided.WEBHOOK_TIMEOUT_SECONDS,
+    )
+
+    login_scheduler = providers.Singleton(
+        LoginScheduler,
+        async_dahua_netsdk_service=async_dahua_netsdk_service,
+        max_concurrency=settings.provided.LOGIN_MAX_CONCURRENCY,
+        rate=settings.provided.LOGIN_RATE_PER_SECOND,
+        burst=settings.provided.LOGIN_BURST,
+    )
 
     # Event Bus - will be initialized with main loop
     event_bus = providers.Singleton(AsyncEventBus)
@@ -33,19 +99,77 @@ class Container(containers.DeclarativeContainer):
         DeviceRepo, session_factory=db.provided.session_factory
     )
 
+    webhook_repo = providers.Factory(
+        WebhookRepo, session_factory=db.provided.session_factory
+    )
+
+    event_repo = providers.Factory(
+        EventRepo, session_factory=db.provided.session_factory
+    )
+
+    # Services
+    provisioning_service = providers.Singleton(
+        ProvisioningService,
+        async_dahua_netsdk_service=async_dahua_netsdk_service,
+        login_scheduler=login_scheduler,
+        device_repo=device_repo,
+        max_concurrency=settings.provided.PROVISIONING_MAX_CONCURRENCY,
+        per_device_concurrency=settings.provided.PROVISIONING_PER_DEVICE_CONCURRENCY,
+    )
+
+    webhook_router = providers.Singleton(
+        WebhookRouter,
+        webhook_dispatcher=webhook_dispatcher,
+        webhook_repo=webhook_repo,
+        default_url=settings.provided.WEBHOOK_URL,
+        default_timeout=settings.provided.WEBHOOK_TIMEOUT_SECONDS,
+        concurrency=settings.provided.WEBHOOK_PER_DESTINATION_CONCURRENCY,
+        max_queue_size=settings.provided.WEBHOOK_QUEUE_SIZE,
+        refresh_interval=settings.provided.WEBHOOK_ROUTES_REFRESH_SECONDS,
+    )
+
+    device_registry = providers.Singleton(
+        DeviceRegistry,
+        device_repo=device_repo,
+        ttl=settings.provided.DEVICE_REGISTRY_TTL_SECONDS,
+    )
+
+    checkpoint_writer = providers.Singleton(
+        CheckpointWriter,
+        device_repo=device_repo,
+        flush_interval=settings.provided.CHECKPOINT_FLUSH_INTERVAL_SECONDS,
+    )
+
+    event_outbox = providers.Singleton(
+        EventOutbox,
+        event_repo=event_repo,
+        webhook_router=webhook_router,
+        batch_size=settings.provided.OUTBOX_BATCH_SIZE,
+        flush_interval=settings.provided.OUTBOX_FLUSH_INTERVAL_SECONDS,
+        max_in_flight=settings.provided.OUTBOX_MAX_IN_FLIGHT,
+        replay_interval=settings.provided.OUTBOX_REPLAY_INTERVAL_SECONDS,
+        max_attempts=settings.provided.OUTBOX_MAX_ATTEMPTS,
+    )
+
+    user_sync_service = providers.Singleton(
+        UserSyncService,
+        async_dahua_netsdk_service=async_dahua_netsdk_service,
+        login_scheduler=login_scheduler,
+        device_repo=device_repo,
+        max_concurrency=settings.provided.USER_SYNC_MAX_CONCURRENCY,
+    )
+
     # Event Handlers
     device_auto_register_handler = providers.Factory(
         DeviceAutoRegisterHandler,
         device_repo=device_repo,
-        dahua_netsdk_service=dahua_netsdk_service,
+        device_registry=device_registry,
+        checkpoint_writer=checkpoint_writer,
+        async_dahua_netsdk_service=async_dahua_netsdk_service,
+        login_scheduler=login_scheduler,
         worker_manager=worker_manager,
     )
 
-    update_last_rec_no_handler = providers.Factory(
-        UpdateLastRecNoHandler,
-        device_repo=device_repo,
-    )
-
     def initialize_container_resources(self):
         """Initialize container resources"""
         # Set the main event loop for event bus
@@ -1,10 +1,12 @@
 import structlog
+from sqlalchemy import Connection, inspect
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.schema import CreateColumn
 
 from app.core.settings import Settings
 from app.models.base import BaseModel
@@ -41,6 +43,38 @@ class Database:
             return
         async with self.engine.begin() as conn:
             await conn.run_sync(BaseModel.metadata.create_all)
+            await conn.run_sync(self._add_missing_columns)
+
+    @staticmethod
+    def _add_missing_columns(conn: Connection) -> None:
+        """Add nullable model columns missing from tables that already exist.
+
+        create_all only creates missing tables, so columns added to a model
+        later would otherwise be absent from deployed databases. Safe to run
+        on every start: columns that exist are left alone.
+        """
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in BaseModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    logger.warning(
+                        "Missing non-nullable column must be added manually",
+                        table=table.name,
+                        column=column.name,
+                    )
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                table_name = conn.dialect.identifier_preparer.format_table(table)
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {ddl}")
+                logger.info(
+                    "Added missing column", table=table.name, column=column.name
+                )
 
     async def shutdown(self):
         """Shutdown the database connection."""
@@ -1,5 +1,6 @@
 from enum import Enum
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -24,6 +25,21 @@ class Settings(BaseSettings):
     AUTO_REGISTER_HEARTBEAT_INTERVAL: int = Field(
         default=30, description="Heartbeat interval in seconds"
     )
+    LOGIN_MAX_CONCURRENCY: int = Field(
+        default=16, description="Maximum device logins running at the same time"
+    )
+    LOGIN_RATE_PER_SECOND: float = Field(
+        default=20, description="Maximum device logins started per second"
+    )
+    LOGIN_BURST: int = Field(
+        default=20, description="Logins that may start at once after a quiet period"
+    )
+    SESSION_RECONNECT_WAIT_SECONDS: float = Field(
+        default=5, description="Seconds a device call waits for a reconnect"
+    )
+    SESSION_RECONNECT_BACKOFF_MAX_SECONDS: float = Field(
+        default=60, description="Longest delay between reconnect attempts"
+    )
 
     AUTO_REGISTER_SERVER_PORT: int = Field(
         default=9600, description="Server port for auto registration"
@@ -33,6 +49,46 @@ class Settings(BaseSettings):
         default="0.0.0.0", description="Server host for auto registration"
     )
 
+    # NetSDK configuration
+    NETSDK_EXECUTOR_MAX_WORKERS: int = Field(
+        default=32, description="Number of threads running blocking NetSDK calls"
+    )
+    USER_DIRECTORY_TTL_SECONDS: int = Field(
+        default=300, description="Seconds before a device's user list is reloaded"
+    )
+
+    # Provisioning configuration
+    PROVISIONING_MAX_CONCURRENCY: int = Field(
+        default=32, description="Maximum devices provisioned at the same time"
+    )
+    PROVISIONING_PER_DEVICE_CONCURRENCY: int = Field(
+        default=1, description="Maximum provisioning operations per device"
+    )
+
+    # User sync configuration
+    USER_SYNC_MAX_CONCURRENCY: int = Field(
+        default=8, description="Maximum devices synced at the same time"
+    )
+
+    # Face image cache configuration
+    FACE_CACHE_DIR: str = Field(
+        default=".cache/face_images",
+        description="Directory of the face image disk cache, empty to disable",
+    )
+    FACE_CACHE_MEMORY_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="Face image memory cache size"
+    )
+    FACE_CACHE_DISK_BYTES: int = Field(
+        default=1024 * 1024 * 1024, description="Face image disk cache size"
+    )
+    FACE_CACHE_TTL_SECONDS: int = Field(
+        default=300,
+        description="Seconds a cached face image is used before revalidating",
+    )
+    FACE_FETCH_MAX_CONCURRENCY: int = Field(
+        default=8, description="Maximum concurrent face image downloads"
+    )
+
     # Redis configuration
     REDIS_URL: str = Field(
         default="redis://localhost:6379/0", description="Redis connection URL"
@@ -71,11 +127,98 @@ class Settings(BaseSettings):
     )
     AWS_REGION: str = Field(default="us-east-1", description="AWS region")
     AWS_S3_BUCKET: str = Field(default="your_s3_bucket", description="S3 bucket name")
+    AWS_S3_ENDPOINT_URL: Optional[str] = Field(
+        default=None, description="S3-compatible endpoint, e.g. a local stand-in"
+    )
+    S3_CLIENT_POOL_SIZE: int = Field(
+        default=2, description="Number of long-lived S3 clients"
+    )
+    S3_UPLOAD_MAX_CONCURRENCY: int = Field(
+        default=16, description="Maximum snapshot uploads running at the same time"
+    )
+    S3_UPLOAD_QUEUE_SIZE: int = Field(
+        default=1000, description="Snapshot uploads queued before callers wait"
+    )
 
     WEBHOOK_URL: str = Field(
         default="https://webhook.site/3ed2a781-985e-4f50-be2a-18f352d1a258",
         description="Webhook URL",
     )
+    WEBHOOK_HTTP2: bool = Field(
+        default=False, description="Use HTTP/2 for webhooks (requires h2)"
+    )
+    WEBHOOK_MAX_CONNECTIONS: int = Field(
+        default=100, description="Maximum pooled webhook connections"
+    )
+    WEBHOOK_PER_DESTINATION_CONCURRENCY: int = Field(
+        default=8, description="Maximum webhook requests in flight per URL"
+    )
+    WEBHOOK_BATCH_SIZE: int = Field(
+        default=1, description="Events posted per webhook request; 1 disables batching"
+    )
+    WEBHOOK_BATCH_LINGER_SECONDS: float = Field(
+        default=0.05, description="Longest an event waits for its batch to fill"
+    )
+    WEBHOOK_TIMEOUT_SECONDS: float = Field(
+        default=10, description="Webhook request timeout"
+    )
+    WEBHOOK_QUEUE_SIZE: int = Field(
+        default=1000, description="Events queued per webhook before dropping"
+    )
+    WEBHOOK_ROUTES_REFRESH_SECONDS: float = Field(
+        default=30, description="Interval between checks for webhook changes"
+    )
+
+    POLLING_MIN_INTERVAL_SECONDS: float = Field(
+        default=1, description="Delay between polls of a device with new events"
+    )
+    POLLING_MAX_INTERVAL_SECONDS: float = Field(
+        default=30, description="Longest delay between polls of an idle device"
+    )
+    POLLING_BACKOFF_FACTOR: float = Field(
+        default=2, description="Growth of the polling delay per poll without events"
+    )
+    POLLING_JITTER: float = Field(
+        default=0.2, description="Random spread of each polling delay, as a fraction"
+    )
+
+    ALARM_SUBSCRIPTION_ENABLED: bool = Field(
+        default=True, description="Poll devices when they push access alarms"
+    )
+    ALARM_SAFETY_POLL_INTERVAL_SECONDS: float = Field(
+        default=60, description="Delay between polls of a device pushing alarms"
+    )
+
+    EVENT_PIPELINE_MAX_IN_FLIGHT: int = Field(
+        default=8, description="Events processed at the same time per device"
+    )
+    EVENT_DOWNLOAD_MAX_CONCURRENCY: int = Field(
+        default=2, description="Snapshot downloads at the same time per device"
+    )
+
+    DEVICE_REGISTRY_TTL_SECONDS: float = Field(
+        default=300, description="Longest a cached device row is used unchecked"
+    )
+
+    CHECKPOINT_FLUSH_INTERVAL_SECONDS: float = Field(
+        default=1, description="Interval between bulk writes of device checkpoints"
+    )
+
+    OUTBOX_BATCH_SIZE: int = Field(
+        default=200, description="Events stored per insert statement"
+    )
+    OUTBOX_FLUSH_INTERVAL_SECONDS: float = Field(
+        default=0.2, description="Longest an event waits to be stored or marked"
+    )
+    OUTBOX_MAX_IN_FLIGHT: int = Field(
+        default=1000, description="Events delivered at the same time from the outbox"
+    )
+    OUTBOX_REPLAY_INTERVAL_SECONDS: float = Field(
+        default=60, description="Interval between retries of undelivered events"
+    )
+    OUTBOX_MAX_ATTEMPTS: int = Field(
+        default=10, description="Deliveries tried before an event is marked failed"
+    )
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -17,6 +17,13 @@ class DevicePayload(BaseModel):
 
     is_active: Optional[bool] = Field(..., description="Whether the device is active")
 
+    polling_min_interval: Optional[float] = Field(
+        None, description="Seconds between polls while events arrive"
+    )
+    polling_max_interval: Optional[float] = Field(
+        None, description="Longest seconds between polls while idle"
+    )
+
 
 class UpdateDevicePayload(BaseModel):
     name: Optional[str] = Field(None, description="The name of the device")
@@ -30,3 +37,9 @@ class UpdateDevicePayload(BaseModel):
         None, description="The company code for the device"
     )
     is_active: Optional[bool] = Field(None, description="Whether the device is active")
+    polling_min_interval: Optional[float] = Field(
+        None, description="Seconds between polls while events arrive"
+    )
+    polling_max_interval: Optional[float] = Field(
+        None, description="Longest seconds between polls while idle"
+    )
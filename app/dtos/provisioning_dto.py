@@ -0,0 +1,40 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.dtos.users_dto import SyncUsersPayload, UserPayload
+
+
+class ProvisioningJobPayload(BaseModel):
+    user: UserPayload = Field(description="The user to add to every target device")
+    face_image_url: Optional[str] = Field(
+        description="The URL of the user's face image", default=None
+    )
+
+    company_code: Optional[str] = Field(
+        description="Target every active device of this company", default=None
+    )
+    device_codes: Optional[List[str]] = Field(
+        description="Target these devices", default=None
+    )
+
+    @model_validator(mode="after")
+    def check_targets(self) -> "ProvisioningJobPayload":
+        if not self.company_code and not self.device_codes:
+            raise ValueError("Either company_code or device_codes is required")
+        return self
+
+
+class FleetSyncPayload(SyncUsersPayload):
+    company_code: Optional[str] = Field(
+        description="Sync every active device of this company", default=None
+    )
+    device_codes: Optional[List[str]] = Field(
+        description="Sync these devices", default=None
+    )
+
+    @model_validator(mode="after")
+    def check_targets(self) -> "FleetSyncPayload":
+        if not self.company_code and not self.device_codes:
+            raise ValueError("Either company_code or device_codes is required")
+        return self
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -26,5 +26,34 @@ class UpdateUserPayload(UserPayload):
     face_image_url: Optional[str] = Field(description="The URL of the face image")
 
 
+class AddUsersBatchPayload(BaseModel):
+    users: List[UserPayload] = Field(
+        description="Users to add, each with one card", min_length=1
+    )
+
+
+class SyncUsersPayload(BaseModel):
+    users: List[UserPayload] = Field(
+        description="Every user that should be on the device, each with one card"
+    )
+    delete_missing: bool = Field(
+        description="Remove cards on the device that are not in users",
+        default=False,
+    )
+    dry_run: bool = Field(
+        description="Only report the changes, without applying them", default=False
+    )
+
+
 class AddFacePayload(BaseModel):
     face_image_url: str = Field(description="The URL of the face image to add")
+
+
+class UserFacePayload(AddFacePayload):
+    user_id: str = Field(description="The user the face belongs to")
+
+
+class AddFacesBatchPayload(BaseModel):
+    faces: List[UserFacePayload] = Field(
+        description="Faces to enroll, one photo per user", min_length=1
+    )
@@ -0,0 +1,2 @@
+class DeviceOfflineError(Exception):
+    """The device has no usable login: it is not logged in or is reconnecting."""
@@ -6,7 +6,10 @@ from NetSDK.SDK_Enum import EM_AUTOREGISTER_TYPE  # type: ignore
 
 from app.core.event_bus import Event, EventHandler
 from app.repos.device_repo import DeviceRepo
-from app.services.dahua_netsdk_service import DahuaNetSDKService
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.checkpoint_writer import CheckpointWriter
+from app.services.device_registry import DeviceRegistry
+from app.services.login_scheduler import LoginScheduler
 from app.workers.worker_manager import WorkerManager
 from app.workers.worker_types import WorkerType
 
@@ -19,11 +22,17 @@ class DeviceAutoRegisterHandler(EventHandler):
     def __init__(
         self,
         device_repo: DeviceRepo,
-        dahua_netsdk_service: DahuaNetSDKService,
+        device_registry: DeviceRegistry,
+        checkpoint_writer: CheckpointWriter,
+        async_dahua_netsdk_service: AsyncDahuaNetSDKService,
         worker_manager: WorkerManager,
+        login_scheduler: LoginScheduler,
     ):
         self.device_repo = device_repo
-        self.dahua_netsdk_service = dahua_netsdk_service
+        self.device_registry = device_registry
+        self.checkpoint_writer = checkpoint_writer
+        self.async_dahua_netsdk_service = async_dahua_netsdk_service
+        self.login_scheduler = login_scheduler
         self.worker_manager = worker_manager
 
     async def handle(self, event: Event) -> None:
@@ -47,7 +56,7 @@ class DeviceAutoRegisterHandler(EventHandler):
             )
 
             # Get device by code
-            device = await self.device_repo.get_by_code(device_code)
+            device = await self.device_registry.get(device_code)
             if device is None or device.is_active is False:
                 logger.info(
                     "Device is not registered or inactive", device_code=device_code
@@ -61,12 +70,16 @@ class DeviceAutoRegisterHandler(EventHandler):
                     "is_online": False,
                     "last_disconnected_at": datetime.now(),
                 }
-                await self.device_repo.update_device_by_code(device_code, updates)
+                await self.device_repo.patch_device_by_code(device_code, updates)
 
                 # Stop dynamic worker for polling events
                 self.worker_manager.stop_device_worker(
                     device_code, WorkerType.DEVICE_EVENTS_POLLING
                 )
+
+                # Release the login and any find handles still open on it
+                self.login_scheduler.cancel(device_code)
+                await self.async_dahua_netsdk_service.logout(device_code)
                 return
 
             if device.username is None or device.password is None:
@@ -77,9 +90,15 @@ class DeviceAutoRegisterHandler(EventHandler):
 
             logger.info("Device is connected", device_code=device_code)
 
-            login_id = self.dahua_netsdk_service.login(
+            login_id = await self.login_scheduler.login(
                 device_code, ip, port, device.username, device.password
             )
+            if login_id is None:
+                logger.info(
+                    "Login already queued for device or device disconnected",
+                    device_code=device_code,
+                )
+                return
 
             print(f"Login ID: {login_id}")
 
@@ -91,7 +110,7 @@ class DeviceAutoRegisterHandler(EventHandler):
             }
 
             # Update device using async repo
-            await self.device_repo.update_device_by_code(device_code, updates)
+            await self.device_repo.patch_device_by_code(device_code, updates)
 
             logger.info(
                 "Device status updated successfully",
@@ -102,10 +121,20 @@ class DeviceAutoRegisterHandler(EventHandler):
             # Start dynamic worker for polling events
             if login_id > 0:
                 if device.enabled_access_control_event is True:
+                    # The cached row's checkpoint is stale once a worker ran
+                    last_uploaded_rec_no = self.checkpoint_writer.get_checkpoint(
+                        device_code
+                    )
+                    if last_uploaded_rec_no is None:
+                        last_uploaded_rec_no = device.last_uploaded_rec_no
                     self.worker_manager.run_device_worker(
                         device_code,
                         WorkerType.DEVICE_EVENTS_POLLING,
-                        metadata={"last_uploaded_rec_no": device.last_uploaded_rec_no},
+                        metadata={
+                            "last_uploaded_rec_no": last_uploaded_rec_no,
+                            "polling_min_interval": device.polling_min_interval,
+                            "polling_max_interval": device.polling_max_interval,
+                        },
                     )
                     logger.info(
                         "Started worker for device",
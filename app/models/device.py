@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
 
 from app.models.base import BaseModel
 
@@ -37,3 +37,7 @@ class Device(BaseModel):
     enabled_access_control_event = Column(Boolean, default=False, nullable=False)
 
     last_uploaded_rec_no = Column(Integer, default=-1, nullable=False)
+
+    # Polling interval bounds in seconds; null uses the service settings
+    polling_min_interval = Column(Float, nullable=True)
+    polling_max_interval = Column(Float, nullable=True)
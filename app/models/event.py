@@ -2,24 +2,29 @@
 
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
 
 from app.models.base import BaseModel
 
 
+class WebhookStatus:
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class Event(BaseModel):
-    """Event model for storing camera events"""
+    """Event model for storing device events until they are delivered"""
 
     __tablename__ = "events"
+    __table_args__ = (Index("ix_events_webhook_sent", "webhook_sent", "created_at"),)
 
     # Basic info
-    event_type = Column(
-        String(50), nullable=False
-    )  # face_detection, motion, alarm, etc.
+    event_type = Column(String(50), nullable=False)  # access_card, alarm, etc.
     event_id = Column(String(100), unique=True, nullable=False)
 
     # Source info
-    camera_id = Column(String(36), ForeignKey("cameras.id"), nullable=False)
+    device_code = Column(String(100), nullable=False, index=True)
     occurred_at = Column(DateTime, default=datetime.now, nullable=False)
 
     # Event data
@@ -35,10 +40,10 @@ class Event(BaseModel):
 
     # Webhook status
     webhook_sent = Column(
-        String(20), default="pending", nullable=False
+        String(20), default=WebhookStatus.PENDING, nullable=False
     )  # pending, sent, failed
     webhook_sent_at = Column(DateTime, nullable=True)
-    webhook_attempts = Column(String(5), default="0", nullable=False)
+    webhook_attempts = Column(Integer, default=0, nullable=False)
 
     def __repr__(self):
-        return f"<Event(event_type='{self.event_type}', camera_id='{self.camera_id}', occurred_at='{self.occurred_at}')>"
+        return f"<Event(event_type='{self.event_type}', device_code='{self.device_code}', occurred_at='{self.occurred_at}')>"
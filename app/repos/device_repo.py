@@ -1,11 +1,14 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Mapping
 
-from sqlalchemy import select, update
+from sqlalchemy import case, select, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.dtos.devices_dto import DevicePayload
 from app.models.device import Device
 
+# Core table for hot write paths that need no ORM objects
+devices = Device.__table__
+
 
 class DeviceRepo:
     def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
@@ -21,6 +24,20 @@ class DeviceRepo:
             result = await session.execute(select(Device))
             return list(result.scalars().all())
 
+    async def get_devices_by_company_code(
+        self, company_code: str, active_only: bool = True
+    ) -> list[Device]:
+        """Retrieve the devices of a company."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory() as session:
+            query = select(Device).where(Device.company_code == company_code)
+            if active_only:
+                query = query.where(Device.is_active.is_(True))
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
     async def get_device_by_id(self, device_id: str) -> Device | None:
         """Retrieve a device by its ID."""
         if not self.session_factory:
@@ -86,6 +103,91 @@ class DeviceRepo:
             result = await session.execute(select(Device).where(Device.code == code))
             return result.scalar_one_or_none()
 
+    async def patch_device_by_code(self, code: str, updates: Dict[str, Any]) -> bool:
+        """Update device fields by code without reading the device back.
+
+        Returns whether a device matched. One round trip, no ORM objects.
+        """
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                update(devices).where(devices.c.code == code).values(**updates)
+            )
+            return result.rowcount > 0  # type: ignore
+
+    async def patch_device_by_id(self, device_id: str, updates: Dict[str, Any]) -> bool:
+        """Update device fields by ID without reading the device back."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                update(devices).where(devices.c.id == device_id).values(**updates)
+            )
+            return result.rowcount > 0  # type: ignore
+
+    async def patch_devices_by_codes(
+        self, codes: Iterable[str], updates: Dict[str, Any]
+    ) -> int:
+        """Set the same fields on many devices in one statement.
+
+        Returns the number of devices updated.
+        """
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+        codes = list(codes)
+        if not codes:
+            return 0
+
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                update(devices).where(devices.c.code.in_(codes)).values(**updates)
+            )
+            return result.rowcount  # type: ignore
+
+    async def bulk_patch_devices_by_code(
+        self, updates_by_code: Mapping[str, Mapping[str, Any]]
+    ) -> int:
+        """Set per-device fields on many devices in one statement.
+
+        Each field becomes a CASE over the device code; devices that do not
+        set a field keep their value. Returns the number of devices updated.
+        """
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+        if not updates_by_code:
+            return 0
+
+        columns: Dict[str, Dict[str, Any]] = {}
+        for code, updates in updates_by_code.items():
+            for column, value in updates.items():
+                columns.setdefault(column, {})[code] = value
+        values = {
+            column: case(values_by_code, value=devices.c.code, else_=devices.c[column])
+            for column, values_by_code in columns.items()
+        }
+
+        async with self.session_factory.begin() as session:
+            result = await session.execute(
+                update(devices)
+                .where(devices.c.code.in_(list(updates_by_code)))
+                .values(values)
+            )
+            return result.rowcount  # type: ignore
+
+    async def update_last_uploaded_rec_nos(
+        self, checkpoints: Mapping[str, int]
+    ) -> None:
+        """Set last_uploaded_rec_no of many devices in one statement."""
+        await self.bulk_patch_devices_by_code(
+            {
+                code: {"last_uploaded_rec_no": rec_no}
+                for code, rec_no in checkpoints.items()
+            }
+        )
+
     async def create_device(self, payload: DevicePayload) -> Device:
         """Create a new device."""
         if not self.session_factory:
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.event import Event, WebhookStatus
+
+
+class EventRepo:
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        """Event repository backing the webhook outbox."""
+        self.session_factory = session_factory
+
+    async def insert_events(self, rows: List[Dict[str, Any]]) -> set[str]:
+        """Insert events in one statement, skipping already stored event_ids.
+
+        Rows must carry their `id`; returns the ids that were inserted.
+        """
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+        if not rows:
+            return set()
+
+        statement = (
+            insert(Event)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+        )
+        ids = [row["id"] for row in rows]
+        async with self.session_factory() as session:
+            await session.execute(statement, rows)
+            await session.commit()
+            result = await session.execute(select(Event.id).where(Event.id.in_(ids)))
+            return set(result.scalars().all())
+
+    async def get_pending_events(
+        self, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> list[Event]:
+        """Undelivered events in insertion order, after a (created_at, id) key."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory() as session:
+            query = select(Event).where(Event.webhook_sent == WebhookStatus.PENDING)
+            if after is not None:
+                query = query.where(tuple_(Event.created_at, Event.id) > after)
+            query = query.order_by(Event.created_at, Event.id).limit(limit)
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    async def mark_sent(self, ids: List[str]) -> None:
+        """Mark events delivered."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        now = datetime.now()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Event)
+                .where(Event.id.in_(ids))
+                .values(
+                    webhook_sent=WebhookStatus.SENT,
+                    webhook_sent_at=now,
+                    webhook_attempts=Event.webhook_attempts + 1,
+                    processed="processed",
+                    processed_at=now,
+                )
+            )
+            await session.commit()
+
+    async def record_failed_attempts(self, ids: List[str], max_attempts: int) -> None:
+        """Count a failed delivery; events out of attempts are marked failed."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Event)
+                .where(Event.id.in_(ids))
+                .values(webhook_attempts=Event.webhook_attempts + 1)
+            )
+            await session.execute(
+                update(Event)
+                .where(Event.id.in_(ids), Event.webhook_attempts >= max_attempts)
+                .values(webhook_sent=WebhookStatus.FAILED, processed="failed")
+            )
+            await session.commit()
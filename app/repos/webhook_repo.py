@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.webhook import Webhook
+
+
+class WebhookRepo:
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        """Webhook repository for managing webhook configurations."""
+        self.session_factory = session_factory
+
+    async def get_active_webhooks(self) -> list[Webhook]:
+        """Retrieve the webhooks that should receive events."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Webhook).where(
+                    Webhook.is_active.is_(True), Webhook.deleted_at.is_(None)
+                )
+            )
+            return list(result.scalars().all())
+
+    async def get_version(self) -> Tuple[int, Optional[datetime]]:
+        """Row count and latest update of all webhooks, to detect changes."""
+        if not self.session_factory:
+            raise RuntimeError("Database session factory is not available.")
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(func.count(Webhook.id), func.max(Webhook.updated_at))
+            )
+            count, updated_at = result.one()
+            return count, updated_at
@@ -0,0 +1,141 @@
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.types.dahua_netsdk_types import AccessCardRecord
+
+if TYPE_CHECKING:
+    from app.services.dahua_netsdk_service import DahuaNetSDKService
+
+logger = structlog.get_logger(__name__)
+
+
+class AccessRecordCursor:
+    """Ascending access-record query kept open across polling cycles.
+
+    The cursor owns one FindRecord handle per device. A fetch that stops at
+    `max_records` leaves the handle open, positioned on the rest of the
+    backlog, and the next fetch keeps reading from it while the session and
+    position match. A drained handle does not see rows appended after it was
+    opened, so a fetch that reads to the end closes it and the next one opens
+    a fresh query at the checkpoint: reuse only applies while catching up on a
+    backlog. The handle is also closed on errors, logout and worker stop.
+    Every method that touches the handle holds the cursor's lock, so a close
+    from one executor thread waits for a fetch running on another.
+    """
+
+    def __init__(self, sdk_service: "DahuaNetSDKService", device_code: str):
+        self.sdk_service = sdk_service
+        self.device_code = device_code
+        self._lock = threading.Lock()
+        self._finde_handle: Optional[int] = None
+        self._login_id: Optional[int] = None
+        self._next_rec_no: Optional[int] = None
+        # Dropped by the SDK service; fetches no longer leave a handle open
+        self._retired = False
+        self._stats = {"opened": 0, "reused": 0, "closed": 0}
+
+    @property
+    def is_open(self) -> bool:
+        return self._finde_handle is not None
+
+    @property
+    def open_handles(self) -> int:
+        """Find handles currently open for this cursor's device."""
+        return self.sdk_service.open_find_handle_count(self.device_code)
+
+    def fetch(
+        self, from_rec_no: int, from_time: Optional[int], max_records: int
+    ) -> List[AccessCardRecord]:
+        """Read up to `max_records` records with rec_no >= `from_rec_no`."""
+        with self._lock:
+            try:
+                login_id = self.sdk_service.session_manager.acquire(self.device_code)
+                if self._finde_handle is not None and (
+                    login_id != self._login_id or from_rec_no != self._next_rec_no
+                ):
+                    self._close()
+
+                records: List[AccessCardRecord] = []
+                drained = True
+                if self._finde_handle is not None:
+                    records, drained = self._read(from_rec_no, max_records)
+                    if records:
+                        self._stats["reused"] += 1
+                    else:
+                        # The backlog ended exactly at the last fetch
+                        self._close()
+                if self._finde_handle is None:
+                    self._open(login_id, from_time)
+                    records, drained = self._read(from_rec_no, max_records)
+            except Exception:
+                self._close()
+                raise
+
+            if drained or self._retired:
+                self._close()
+            elif records:
+                self._next_rec_no = records[-1].rec_no + 1
+            return records
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def retire(self) -> None:
+        """Close the handle for good.
+
+        A caller still holding the cursor may fetch again, but no handle
+        outlives that fetch, since nothing would close it afterwards.
+        """
+        with self._lock:
+            self._retired = True
+            self._close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "is_open": self.is_open}
+
+    def _open(self, login_id: Optional[int], from_time: Optional[int]) -> None:
+        self._finde_handle = self.sdk_service.open_seek_query(
+            self.device_code, from_time
+        )
+        self._login_id = login_id
+        self._next_rec_no = None
+        if self._finde_handle is not None:
+            self._stats["opened"] += 1
+
+    def _read(
+        self, from_rec_no: int, max_records: int
+    ) -> Tuple[List[AccessCardRecord], bool]:
+        """Read whole pages; returns the records and whether the handle ran out."""
+        if self._finde_handle is None:
+            return [], True
+
+        # Whole pages only: the handle has already moved past every record of a
+        # page, so trimming one would lose records on the next fetch.
+        records: List[AccessCardRecord] = []
+        for page in self.sdk_service.iter_record_pages(
+            self._finde_handle, sys.maxsize, 2000, from_rec_no=from_rec_no
+        ):
+            records.extend(page)
+            if len(records) >= max_records:
+                return records, False
+        return records, True
+
+    def _close(self) -> None:
+        if self._finde_handle is None:
+            return
+        finde_handle, self._finde_handle = self._finde_handle, None
+        self._login_id = None
+        self._next_rec_no = None
+        self._stats["closed"] += 1
+        try:
+            self.sdk_service.close_find_handle(finde_handle)
+        except Exception as e:
+            logger.error(
+                "Error closing find handle",
+                device_code=self.device_code,
+                error=str(e),
+            )
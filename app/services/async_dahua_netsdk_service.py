@@ -0,0 +1,279 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import structlog
+
+from app.services.dahua_netsdk_service import DahuaNetSDKService
+from app.services.face_image_fetcher import FaceImageFetcher
+from app.types.dahua_netsdk_types import (
+    AccessCardRecord,
+    FaceBatchResult,
+    UserBatchResult,
+    UserPayload,
+)
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncDahuaNetSDKService:
+    """Awaitable facade over DahuaNetSDKService.
+
+    Every NetSDK call is a blocking ctypes call with multi-second timeouts, so
+    the calls are run on a dedicated, sized thread pool and the event loop never
+    waits on device I/O.
+    """
+
+    def __init__(
+        self,
+        dahua_netsdk_service: DahuaNetSDKService,
+        max_workers: int,
+        face_image_fetcher: FaceImageFetcher,
+    ) -> None:
+        self.sdk_service = dahua_netsdk_service
+        self.max_workers = max_workers
+        self.face_image_fetcher = face_image_fetcher
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="netsdk"
+        )
+
+    async def init(self):
+        logger.info("AsyncDahuaNetSDKService ready", max_workers=self.max_workers)
+
+    async def shutdown(self):
+        logger.info("AsyncDahuaNetSDKService shutting down...")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("AsyncDahuaNetSDKService shut down.")
+
+    async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def login(
+        self,
+        device_code: str,
+        device_ip: str,
+        device_port: int,
+        username: str,
+        password: str,
+    ) -> int:
+        return await self._run(
+            self.sdk_service.login,
+            device_code,
+            device_ip,
+            device_port,
+            username,
+            password,
+        )
+
+    async def _iterate(self, pages: Iterator[T]) -> AsyncGenerator[T, None]:
+        """Drive a blocking page generator from the executor, one page per hop."""
+        try:
+            while True:
+                page = await self._run(next, pages, None)
+                if page is None:
+                    break
+                yield page
+        finally:
+            await self._run(pages.close)
+
+    async def logout(self, device_code: str) -> None:
+        return await self._run(self.sdk_service.logout, device_code)
+
+    def iter_records(
+        self,
+        device_code: str,
+        card_no: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        n_rec: Optional[int] = 1,
+        by_asc_order: Optional[bool] = True,
+    ) -> AsyncGenerator[Sequence[AccessCardRecord], None]:
+        return self._iterate(
+            self.sdk_service.iter_records(
+                device_code, card_no, start_time, end_time, n_rec, by_asc_order
+            )
+        )
+
+    def iter_records_by_rec_no(
+        self,
+        device_code: str,
+        from_rec_no: int,
+        n_rec: int,
+        by_asc_order: bool,
+        from_time: Optional[int] = None,
+    ) -> AsyncGenerator[Sequence[AccessCardRecord], None]:
+        return self._iterate(
+            self.sdk_service.iter_records_by_rec_no(
+                device_code, from_rec_no, n_rec, by_asc_order, from_time
+            )
+        )
+
+    async def find_records(
+        self,
+        device_code: str,
+        card_no: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        n_rec: Optional[int] = 1,
+        by_asc_order: Optional[bool] = True,
+    ) -> List[AccessCardRecord]:
+        return await self._run(
+            self.sdk_service.find_records,
+            device_code,
+            card_no=card_no,
+            start_time=start_time,
+            end_time=end_time,
+            n_rec=n_rec,
+            by_asc_order=by_asc_order,
+        )
+
+    async def find_records_by_rec_no(
+        self,
+        device_code: str,
+        from_rec_no: int,
+        n_rec: int,
+        by_asc_order: bool,
+        from_time: Optional[int] = None,
+    ) -> List[AccessCardRecord]:
+        return await self._run(
+            self.sdk_service.find_records_by_rec_no,
+            device_code,
+            from_rec_no=from_rec_no,
+            n_rec=n_rec,
+            by_asc_order=by_asc_order,
+            from_time=from_time,
+        )
+
+    async def fetch_records(
+        self,
+        device_code: str,
+        from_rec_no: int,
+        from_time: Optional[int],
+        max_records: int,
+    ) -> List[AccessCardRecord]:
+        """Read new records through the device's persistent find cursor."""
+        cursor = self.sdk_service.get_record_cursor(device_code)
+        return await self._run(cursor.fetch, from_rec_no, from_time, max_records)
+
+    async def reset_record_cursor(self, device_code: str) -> None:
+        """Close the cursor's find handle; the next fetch reopens it."""
+        cursor = self.sdk_service.get_record_cursor(device_code)
+        await self._run(cursor.close)
+
+    async def add_user(self, device_code: str, payload: UserPayload):
+        return await self._run(self.sdk_service.add_user, device_code, payload)
+
+    async def add_users(
+        self, device_code: str, payloads: List[UserPayload]
+    ) -> List[UserBatchResult]:
+        return await self._run(self.sdk_service.add_users, device_code, payloads)
+
+    async def update_user(self, device_code: str, payload: UserPayload):
+        return await self._run(self.sdk_service.update_user, device_code, payload)
+
+    async def add_face(self, device_code: str, user_id: str, face_photo_url: str):
+        [result] = await self.add_faces(device_code, [(user_id, face_photo_url)])
+        if not result.success:
+            raise Exception(
+                result.error or f"Face insert failed with code {result.fail_code}"
+            )
+        return True
+
+    async def add_faces(
+        self, device_code: str, faces: List[Tuple[str, str]]
+    ) -> List[FaceBatchResult]:
+        """Enroll (user_id, face_image_url) pairs.
+
+        Photos come from the shared face image cache and are downloaded
+        concurrently on the event loop; only the SDK inserts run on the
+        executor.
+        """
+        images = await self.face_image_fetcher.fetch_many([url for _, url in faces])
+
+        results = [FaceBatchResult(user_id, url) for user_id, url in faces]
+        fetched: List[int] = []
+        for index, image in enumerate(images):
+            if isinstance(image, Exception):
+                results[index].error = f"Failed to fetch face image: {image}"
+            else:
+                fetched.append(index)
+
+        if fetched:
+            inserted = await self._run(
+                self.sdk_service.add_faces,
+                device_code,
+                [(faces[index][0], images[index]) for index in fetched],
+            )
+            for index, result in zip(fetched, inserted):
+                result.face_image_url = faces[index][1]
+                results[index] = result
+
+        return results
+
+    async def remove_user(self, device_code: str, user_id: str) -> bool:
+        return await self._run(self.sdk_service.remove_user, device_code, user_id)
+
+    async def remove_cards(
+        self, device_code: str, rec_nos: List[int]
+    ) -> List[Optional[str]]:
+        return await self._run(self.sdk_service.remove_cards, device_code, rec_nos)
+
+    async def find_user(
+        self, device_code: str, user_id: Optional[str] = None
+    ) -> Optional[UserPayload]:
+        # Fresh directory hits are answered on the loop, without an executor hop
+        if user_id is not None and self.sdk_service.is_logged_in(device_code):
+            directory = self.sdk_service.user_directory(device_code)
+            user = None if directory.is_stale else directory.get(user_id)
+            if user is not None:
+                return user
+        return await self._run(self.sdk_service.find_user, device_code, user_id)
+
+    async def list_users(self, device_code: str) -> list[UserPayload]:
+        return await self._run(self.sdk_service.list_users, device_code)
+
+    async def refresh_user_directory(self, device_code: str) -> None:
+        await self._run(self.sdk_service.refresh_user_directory, device_code)
+
+    async def get_device_info(self, device_code: str):
+        return await self._run(self.sdk_service.get_device_info, device_code)
+
+    async def download_remote_file(self, device_code: str, file_path: str):
+        return await self._run(
+            self.sdk_service.download_remote_file, device_code, file_path
+        )
+
+    @asynccontextmanager
+    async def lease_remote_file(
+        self, device_code: str, file_path: str
+    ) -> AsyncIterator[Optional[memoryview]]:
+        """Awaitable `DahuaNetSDKService.lease_remote_file`.
+
+        The download runs on the executor; the buffer goes back to the pool
+        when the block exits.
+        """
+        lease = self.sdk_service.lease_remote_file(device_code, file_path)
+        file_data = await self._run(lease.__enter__)
+        try:
+            yield file_data
+        except BaseException as e:
+            if not lease.__exit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            lease.__exit__(None, None, None)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+import structlog
+
+from app.repos.device_repo import DeviceRepo
+
+logger = structlog.get_logger(__name__)
+
+
+class CheckpointWriter:
+    """Coalesces device checkpoints into periodic bulk writes.
+
+    Workers record their latest last_uploaded_rec_no from any thread; only
+    the newest value per device is kept. Every `flush_interval` seconds all
+    changed devices are written, up to `max_batch` per statement. A flush can
+    be requested early (e.g. when a worker stops), and `shutdown` writes
+    whatever is left.
+    """
+
+    def __init__(
+        self, device_repo: DeviceRepo, flush_interval: float = 1, max_batch: int = 500
+    ):
+        self.device_repo = device_repo
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._dirty: Dict[str, int] = {}
+        # Newest checkpoint recorded per device, written or not
+        self._latest: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_now = asyncio.Event()
+        self._flushing = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+
+        self._stats = {"recorded": 0, "written": 0, "statements": 0, "failed": 0}
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        logger.info("Checkpoint writer shut down", **self._stats)
+
+    def record(self, device_code: str, rec_no: int) -> None:
+        """Remember a device's checkpoint; safe to call from any thread."""
+        with self._lock:
+            self._dirty[device_code] = rec_no
+            self._latest[device_code] = rec_no
+            self._stats["recorded"] += 1
+
+    def get_checkpoint(self, device_code: str) -> Optional[int]:
+        """The newest checkpoint recorded for a device by this process."""
+        with self._lock:
+            return self._latest.get(device_code)
+
+    def request_flush(self) -> None:
+        """Write pending checkpoints soon; safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._flush_now.set)
+
+    async def flush(self) -> None:
+        """Write all pending checkpoints now."""
+        async with self._flushing:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            items = list(dirty.items())
+            for i in range(0, len(items), self.max_batch):
+                batch = dict(items[i : i + self.max_batch])
+                try:
+                    await self.device_repo.update_last_uploaded_rec_nos(batch)
+                except Exception as e:
+                    self._stats["failed"] += 1
+                    logger.error(
+                        "Failed to write checkpoints", devices=len(batch), error=str(e)
+                    )
+                    with self._lock:
+                        # Keep them for the next flush unless a newer one came
+                        for device_code, rec_no in batch.items():
+                            self._dirty.setdefault(device_code, rec_no)
+                    continue
+                self._stats["statements"] += 1
+                self._stats["written"] += len(batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._dirty)
+        return {**self._stats, "pending": pending}
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
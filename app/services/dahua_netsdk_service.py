@@ -1,4 +1,6 @@
-from typing import Any, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import structlog
 from NetSDK.NetSDK import NetClient  # type: ignore
@@ -6,25 +8,99 @@ from NetSDK.SDK_Callback import *  # type: ignore
 from NetSDK.SDK_Enum import *  # type: ignore
 from NetSDK.SDK_Struct import *  # type: ignore
 
-from app.types.dahua_netsdk_types import AccessCardRecord, UserPayload
+from app.services.access_record_cursor import AccessRecordCursor
+from app.services.session_manager import DeviceSession, SessionManager
+from app.services.user_directory import UserDirectory
+from app.types.access_card_record_batch import AccessCardRecordBatch
+from app.types.dahua_netsdk_types import (
+    AccessCardRecord,
+    FaceBatchResult,
+    UserBatchResult,
+    UserPayload,
+)
 from app.utils.dahua_converter import net_time_to_timestamp, timestamp_to_net_time
+from app.utils.file_buffer_pool import FileBufferPool
+from app.utils.record_buffer_pool import RecordBuffer, RecordBufferPool
 from app.utils.requests import get_face_image_url_to_bytes
 
 logger = structlog.get_logger(__name__)
 
+# Seek window for incremental record queries: records sharing the checkpoint's
+# second are re-read and dropped by rec_no, the end is effectively open.
+SEEK_MARGIN_SECONDS = 1
+SEEK_END_TIME = 4102444799  # 2099-12-31 23:59:59
+
+# Cards requested per FindNextRecord when enumerating a device's users
+USER_PAGE_SIZE = 500
+
+# Password written for cards created without one
+DEFAULT_CARD_PASSWORD = "123456"
+
+# Records per multi-record insert until a device reports a lower limit
+INSERT_BATCH_SIZE = 100
+FACE_INSERT_BATCH_SIZE = 10
+
+
+def seek_window(from_time: Optional[int]) -> tuple[Optional[int], Optional[int]]:
+    """Time condition for a query resuming at a checkpoint record's time."""
+    if from_time is None:
+        return None, None
+    return max(from_time - SEEK_MARGIN_SECONDS, 1), SEEK_END_TIME
+
 
 class DahuaNetSDKService:
     sdk: NetClient
 
-    sessions: dict[str, int] = {}
-
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        user_directory_ttl: float = 300,
+        keepalive_interval: float = 30,
+        reconnect_wait: float = 5,
+        reconnect_backoff_max: float = 60,
+        max_sessions: int = 1000,
+    ) -> None:
         logger.info("Init DahuaNetSDKService")
+        self.session_manager = SessionManager(
+            login=self._login_session,
+            logout=self._logout_login_id,
+            probe=self._probe_login_id,
+            on_lost=self._release_device_handles,
+            on_connected=self._on_session_connected,
+            keepalive_interval=keepalive_interval,
+            reconnect_wait=reconnect_wait,
+            backoff_max=reconnect_backoff_max,
+            max_sessions=max_sessions,
+        )
+        # SDK callbacks, referenced for as long as the SDK may call them
+        self._disconnect_callback = fDisConnect(self._on_sdk_disconnect)
+        self._reconnect_callback = fHaveReConnect(self._on_sdk_reconnect)
+        self._message_callback = fMessCallBackEx1(self._on_sdk_message)
+        self.card_rec_buffers = RecordBufferPool(NET_RECORDSET_ACCESS_CTL_CARDREC)
+        self.card_buffers = RecordBufferPool(NET_RECORDSET_ACCESS_CTL_CARD)
+        self.file_buffers = FileBufferPool()
+
+        # find handle -> device_code, every handle opened by FindRecord until closed
+        self._find_handles: Dict[int, str] = {}
+        self._find_handles_lock = threading.Lock()
+        self._record_cursors: Dict[str, AccessRecordCursor] = {}
+
+        self.user_directory_ttl = user_directory_ttl
+        self._user_directories: Dict[str, UserDirectory] = {}
+
+        # (device_code, "user" | "card" | "face") -> records per insert call
+        self._insert_batch_sizes: Dict[tuple[str, str], int] = {}
+
+        # device_code -> called on the device's access-control alarms
+        self._alarm_listeners: Dict[str, Callable[[], None]] = {}
+        # login_id -> device_code, every login subscribed with StartListenEx
+        self._alarm_logins: Dict[int, str] = {}
+        self._alarm_lock = threading.Lock()
+        self._alarm_stats = {"subscriptions": 0, "subscribe_failures": 0, "alarms": 0}
 
     async def init(self):
         logger.info("Initializing DahuaNetSDKService...")
         self.sdk = NetClient()
-        result = self.sdk.InitEx()  # type: ignore
+        result = self.sdk.InitEx(self._disconnect_callback)  # type: ignore
         if result == 1:
             logger.info("DahuaNetSDKService initialized.")
         else:
@@ -32,11 +108,15 @@ class DahuaNetSDKService:
                 "Failed to initialize DahuaNetSDKService.",
                 msg=self.sdk.GetLastErrorMessage(),
             )
+        self.sdk.SetAutoReconnect(self._reconnect_callback)  # type: ignore
+        self.sdk.SetDVRMessCallBackEx1(self._message_callback, 0)  # type: ignore
 
         self._setup_log()
+        self.session_manager.start()
 
     async def shutdown(self):
         logger.info("DahuaNetSDKService shutting down...")
+        self.session_manager.stop()
         self.sdk.Cleanup()
         logger.info("DahuaNetSDKService shut down.")
 
@@ -54,17 +134,32 @@ class DahuaNetSDKService:
         device_port: int,
         username: str,
         password: str,
+        auto_register: bool = True,
     ) -> int:
-        """Login to the Dahua device."""
+        """Login to the Dahua device.
+
+        `auto_register` logs in over the connection the device opened to the
+        server; otherwise the device is dialled directly.
+        """
+        return self.session_manager.open(
+            device_code, device_ip, device_port, username, password, auto_register
+        )
+
+    def _login_session(self, session: DeviceSession) -> int:
+        device_code = session.device_code
         logger.info("Logging in to Dahua device...")
         stInParam = NET_IN_LOGIN_WITH_HIGHLEVEL_SECURITY()
         stInParam.dwSize = sizeof(NET_IN_LOGIN_WITH_HIGHLEVEL_SECURITY)
-        stInParam.szIP = device_ip.encode()
-        stInParam.nPort = device_port
-        stInParam.szUserName = username.encode()
-        stInParam.szPassword = password.encode()
-
-        stInParam.emSpecCap = EM_LOGIN_SPAC_CAP_TYPE.SERVER_CONN
+        stInParam.szIP = session.ip.encode()
+        stInParam.nPort = session.port
+        stInParam.szUserName = session.username.encode()
+        stInParam.szPassword = session.password.encode()
+
+        stInParam.emSpecCap = (
+            EM_LOGIN_SPAC_CAP_TYPE.SERVER_CONN
+            if session.auto_register
+            else EM_LOGIN_SPAC_CAP_TYPE.TCP
+        )
 
         def get_utf8_string_pointer(src: str):
             b = src.encode("utf-8")
@@ -86,29 +181,230 @@ class DahuaNetSDKService:
             logger.info(
                 "Logged in to Dahua device.", login_id=login_id, device_code=device_code
             )
-            self.sessions[device_code] = login_id
             return login_id
         else:
             logger.error("Failed to login to Dahua device.", error=error_msg)
             raise Exception(error_msg)
 
-    def _validate_login(self, device_code: str):
+    def _validate_login(self, device_code: str) -> int:
+        """Return the device's login_id, waiting briefly for a reconnect."""
         if not self.sdk:
             raise Exception("SDK is not available.")
-        if device_code not in self.sessions:
-            raise Exception("Device not logged in")
+        return self.session_manager.acquire(device_code)
+
+    def is_logged_in(self, device_code: str) -> bool:
+        return self.session_manager.is_connected(device_code)
+
+    def get_session_stats(self) -> Dict[str, Any]:
+        return self.session_manager.get_stats()
+
+    def logout(self, device_code: str) -> None:
+        """Close the device's cursor and find handles, then log out."""
+        self._release_device_handles(device_code)
+        self.session_manager.close(device_code)
+
+    def _release_device_handles(self, device_code: str) -> None:
+        self._stop_alarm_listen(device_code)
+        self.close_record_cursor(device_code)
+        # The device may be changed while it is offline; reload on return
+        self._user_directories.pop(device_code, None)
+        with self._find_handles_lock:
+            handles = [
+                h for h, code in self._find_handles.items() if code == device_code
+            ]
+        for finde_handle in handles:
+            self.close_find_handle(finde_handle)
+
+    def _logout_login_id(self, login_id: int) -> None:
+        self.sdk.Logout(login_id)
+
+    def _probe_login_id(self, login_id: int) -> bool:
+        version_info = NET_A_DEV_VERSION_INFO()
+        version_info.dwSize = sizeof(NET_A_DEV_VERSION_INFO)
+        return bool(
+            self.sdk.QueryDevState(
+                login_id,
+                EM_QUERY_DEV_STATE_TYPE.SOFTWARE,
+                version_info,
+                sizeof(NET_A_DEV_VERSION_INFO),
+                0,
+                3000,
+            )
+        )
+
+    def _on_sdk_disconnect(self, login_id, ip, port, user_data) -> None:
+        # Runs on an SDK thread: only hand the session to the reconnect thread
+        self.session_manager.on_disconnect(login_id)
+
+    def _on_sdk_reconnect(self, login_id, ip, port, user_data) -> None:
+        self.session_manager.on_reconnect(login_id)
+
+    def subscribe_alarms(self, device_code: str, listener: Callable[[], None]) -> bool:
+        """Call `listener` whenever the device pushes an access-control alarm.
+
+        The device is subscribed now if it is connected, and again on every
+        login. `listener` is also called after each login, since alarms are
+        missed while the device is away. It runs on SDK threads and must not
+        block. Returns whether the device is subscribed now.
+        """
+        with self._alarm_lock:
+            self._alarm_listeners[device_code] = listener
+        login_id = self.session_manager.get_login_id(device_code)
+        if login_id is None:
+            return False
+        return self._start_alarm_listen(device_code, login_id)
+
+    def unsubscribe_alarms(self, device_code: str) -> None:
+        with self._alarm_lock:
+            self._alarm_listeners.pop(device_code, None)
+        self._stop_alarm_listen(device_code)
+
+    def is_listening(self, device_code: str) -> bool:
+        """Whether the device's current login pushes alarms to a listener."""
+        with self._alarm_lock:
+            return device_code in self._alarm_logins.values()
+
+    def get_alarm_stats(self) -> Dict[str, Any]:
+        with self._alarm_lock:
+            return {
+                **self._alarm_stats,
+                "listeners": len(self._alarm_listeners),
+                "listening": sorted(self._alarm_logins.values()),
+            }
+
+    def _start_alarm_listen(self, device_code: str, login_id: int) -> bool:
+        with self._alarm_lock:
+            if device_code not in self._alarm_listeners:
+                return False
+            if self._alarm_logins.get(login_id) == device_code:
+                return True
+        if not self.sdk.StartListenEx(login_id):
+            with self._alarm_lock:
+                self._alarm_stats["subscribe_failures"] += 1
+            logger.warning(
+                "Failed to subscribe to device alarms",
+                device_code=device_code,
+                error=self.sdk.GetLastErrorMessage(),
+            )
+            return False
+        with self._alarm_lock:
+            self._alarm_logins[login_id] = device_code
+            self._alarm_stats["subscriptions"] += 1
+        logger.info("Subscribed to device alarms", device_code=device_code)
+        return True
+
+    def _stop_alarm_listen(self, device_code: str) -> None:
+        with self._alarm_lock:
+            login_ids = [
+                login_id
+                for login_id, code in self._alarm_logins.items()
+                if code == device_code
+            ]
+            for login_id in login_ids:
+                del self._alarm_logins[login_id]
+        for login_id in login_ids:
+            self.sdk.StopListen(login_id)
+
+    def _on_session_connected(self, device_code: str, login_id: int) -> None:
+        self._start_alarm_listen(device_code, login_id)
+        with self._alarm_lock:
+            listener = self._alarm_listeners.get(device_code)
+        if listener is not None:
+            # Catch up on records made while the device was away
+            listener()
+
+    def _on_sdk_message(
+        self,
+        command,
+        login_id,
+        buf,
+        buf_len,
+        ip,
+        port,
+        alarm_ack_flag,
+        event_id,
+        user_data,
+    ) -> None:
+        # Runs on an SDK thread: only hand the alarm to the device's listener
+        if command != SDK_ALARM_TYPE.ALARM_ACCESS_CTL_EVENT:
+            return
+        with self._alarm_lock:
+            self._alarm_stats["alarms"] += 1
+            device_code = self._alarm_logins.get(login_id)
+            listener = self._alarm_listeners.get(device_code or "")
+        if listener is None:
+            return
+        try:
+            listener()
+        except Exception as e:
+            logger.warning(
+                "Alarm listener failed", device_code=device_code, error=str(e)
+            )
+
+    def _track_find_handle(self, device_code: str, finde_handle: int) -> None:
+        with self._find_handles_lock:
+            self._find_handles[finde_handle] = device_code
+
+    def close_find_handle(self, finde_handle: int) -> None:
+        """Release a handle opened by FindRecord."""
+        with self._find_handles_lock:
+            if self._find_handles.pop(finde_handle, None) is None:
+                return
+        if not self.sdk.FindRecordClose(finde_handle):
+            logger.warning(
+                "FindRecordClose failed",
+                finde_handle=finde_handle,
+                error=self.sdk.GetLastErrorMessage(),
+            )
 
-        if self.sessions[device_code] <= 0:
-            raise Exception("Device offline")
+    def open_find_handle_count(self, device_code: Optional[str] = None) -> int:
+        with self._find_handles_lock:
+            if device_code is None:
+                return len(self._find_handles)
+            return sum(1 for code in self._find_handles.values() if code == device_code)
+
+    def get_record_cursor(self, device_code: str) -> AccessRecordCursor:
+        """Return the device's persistent access-record cursor."""
+        cursor = self._record_cursors.get(device_code)
+        if cursor is None:
+            # Racing callers all get the instance that was stored first
+            cursor = self._record_cursors.setdefault(
+                device_code, AccessRecordCursor(self, device_code)
+            )
+        return cursor
+
+    def close_record_cursor(self, device_code: str) -> None:
+        cursor = self._record_cursors.pop(device_code, None)
+        if cursor is not None:
+            cursor.retire()
+
+    def get_find_handle_stats(self) -> Dict[str, Any]:
+        with self._find_handles_lock:
+            by_device: Dict[str, int] = {}
+            for code in self._find_handles.values():
+                by_device[code] = by_device.get(code, 0) + 1
+        return {
+            "open_find_handles": sum(by_device.values()),
+            "open_find_handles_by_device": by_device,
+            "record_cursors": {
+                code: cursor.get_stats()
+                for code, cursor in list(self._record_cursors.items())
+            },
+            "card_rec_buffers": self.card_rec_buffers.get_stats(),
+            "card_buffers": self.card_buffers.get_stats(),
+            "file_buffers": self.file_buffers.get_stats(),
+            "user_directories": {
+                code: directory.get_stats()
+                for code, directory in list(self._user_directories.items())
+            },
+        }
 
     def add_user(
         self,
         device_code: str,
         payload: UserPayload,
     ):
-        self._validate_login(device_code)
-
-        login_id = self.sessions[device_code]
+        login_id = self._validate_login(device_code)
         try:
             # Create main parameter structure
             stInParam = NET_CTRL_RECORDSET_INSERT_PARAM()
@@ -127,7 +423,7 @@ class DahuaNetSDKService:
             card_record.szUserID = payload.user_id.encode()
             card_record.emStatus = 0  # Card status (0 = normal, 1 = lost, 2 = freeze)
             card_record.emType = 0  # Card type (0 = normal card)
-            card_record.szPsw = payload.sz_pw.encode() if payload.sz_pw else b"123456"
+            card_record.szPsw = (payload.sz_pw or DEFAULT_CARD_PASSWORD).encode()
             card_record.bIsValid = True  # Card is valid
 
             # Door permissions
@@ -199,6 +495,8 @@ class DahuaNetSDKService:
             )
 
             if result > 0:
+                payload.rec_no = stInParam.stuCtrlRecordSetResult.nRecNo
+                self.user_directory(device_code).upsert(payload)
                 return True
 
             raise Exception(self.sdk.GetLastErrorMessage())
@@ -212,6 +510,170 @@ class DahuaNetSDKService:
             logger.error("Error occurred while adding user", error=str(e))
             raise e
 
+    def add_users(
+        self, device_code: str, payloads: List[UserPayload]
+    ) -> List[UserBatchResult]:
+        """Insert many users and their cards with multi-record service calls.
+
+        Users are inserted first, then the cards of the users that made it.
+        Each result carries the device's NET_EM_FAILCODE for that user, or the
+        SDK error when a whole call failed.
+        """
+        login_id = self._validate_login(device_code)
+
+        results = [UserBatchResult(p.user_id, p.card_no) for p in payloads]
+        pending = list(range(len(payloads)))
+        for kind, insert in (
+            ("user", self._insert_user_infos),
+            ("card", self._insert_card_infos),
+        ):
+            pending = self._insert_in_chunks(
+                device_code, kind, login_id, insert, payloads, pending, results
+            )
+
+        directory = self.user_directory(device_code)
+        for index in pending:
+            directory.upsert(payloads[index])
+
+        logger.info(
+            "Batch user insert finished",
+            device_code=device_code,
+            total=len(payloads),
+            succeeded=len(pending),
+        )
+        return results
+
+    def _insert_in_chunks(
+        self,
+        device_code: str,
+        kind: str,
+        login_id: int,
+        insert: Any,
+        items: List[Any],
+        indexes: List[int],
+        results: List[Any],
+        default_size: int = INSERT_BATCH_SIZE,
+    ) -> List[int]:
+        """Run `insert` over `items[indexes]` in chunks; return the ones that succeeded.
+
+        A chunk the device rejects as too large is retried at half the size,
+        and the smaller size is kept for the device.
+        """
+        max_insert_rate = NET_EM_FAILCODE.NET_EM_FAILCODE_ERROR_MAX_INSERT_RATE
+        key = (device_code, kind)
+        succeeded: List[int] = []
+        queue = list(indexes)
+
+        while queue:
+            size = self._insert_batch_sizes.get(key, default_size)
+            chunk, queue = queue[:size], queue[size:]
+            try:
+                fail_codes = insert(login_id, [items[i] for i in chunk])
+            except Exception as e:
+                for index in chunk:
+                    results[index].error = str(e)
+                continue
+
+            retry: List[int] = []
+            for index, fail_code in zip(chunk, fail_codes):
+                if fail_code == 0:
+                    succeeded.append(index)
+                elif fail_code == max_insert_rate and size > 1:
+                    retry.append(index)
+                else:
+                    results[index].fail_code = fail_code
+
+            if retry:
+                self._insert_batch_sizes[key] = max(size // 2, 1)
+                logger.info(
+                    "Device insert limit reached, reducing batch size",
+                    device_code=device_code,
+                    kind=kind,
+                    batch_size=self._insert_batch_sizes[key],
+                )
+                queue = retry + queue
+
+        return succeeded
+
+    def _insert_user_infos(self, login_id: int, chunk: List[UserPayload]) -> List[int]:
+        user_infos = (NET_ACCESS_USER_INFO * len(chunk))()
+        for user_info, payload in zip(user_infos, chunk):
+            user_info.szUserID = payload.user_id.encode()
+            user_info.szName = payload.card_name.encode()
+            user_info.emUserType = 0  # General user
+            user_info.szPsw = (payload.sz_pw or DEFAULT_CARD_PASSWORD).encode()
+
+            # Same door and time section permissions as add_user
+            user_info.nDoorNum = 1
+            user_info.nDoors[0] = 0
+            user_info.nTimeSectionNum = 1
+            user_info.nTimeSectionNo[0] = 0
+
+            user_info.stuValidBeginTime = timestamp_to_net_time(
+                payload.valid_start_time if payload.valid_start_time else 0
+            )
+            user_info.stuValidEndTime = timestamp_to_net_time(
+                payload.valid_end_time if payload.valid_end_time else 0
+            )
+            user_info.bFirstEnter = payload.first_enter
+            user_info.szCitizenIDNo = (
+                payload.citizen_id_no.encode() if payload.citizen_id_no else b""
+            )
+
+        stInParam = NET_IN_ACCESS_USER_SERVICE_INSERT()
+        stInParam.dwSize = sizeof(NET_IN_ACCESS_USER_SERVICE_INSERT)
+        stInParam.nInfoNum = len(chunk)
+        stInParam.pUserInfo = cast(user_infos, POINTER(NET_ACCESS_USER_INFO))
+
+        stOutParam = NET_OUT_ACCESS_USER_SERVICE_INSERT()
+        stOutParam.dwSize = sizeof(NET_OUT_ACCESS_USER_SERVICE_INSERT)
+        stOutParam.nMaxRetNum = len(chunk)
+        fail_codes = (c_int * len(chunk))()
+        stOutParam.pFailCode = cast(fail_codes, POINTER(c_int))
+
+        result = self.sdk.OperateAccessUserService(  # type: ignore
+            login_id,
+            EM_A_NET_EM_ACCESS_CTL_USER_SERVICE.NET_EM_ACCESS_CTL_USER_SERVICE_INSERT,
+            stInParam,
+            stOutParam,
+            5000,
+        )
+        return self._fail_codes(result, fail_codes)
+
+    def _insert_card_infos(self, login_id: int, chunk: List[UserPayload]) -> List[int]:
+        card_infos = (NET_ACCESS_CARD_INFO * len(chunk))()
+        for card_info, payload in zip(card_infos, chunk):
+            card_info.szCardNo = payload.card_no.encode()
+            card_info.szUserID = payload.user_id.encode()
+            card_info.emType = payload.card_type
+
+        stInParam = NET_IN_ACCESS_CARD_SERVICE_INSERT()
+        stInParam.dwSize = sizeof(NET_IN_ACCESS_CARD_SERVICE_INSERT)
+        stInParam.nInfoNum = len(chunk)
+        stInParam.pCardInfo = cast(card_infos, POINTER(NET_ACCESS_CARD_INFO))
+
+        stOutParam = NET_OUT_ACCESS_CARD_SERVICE_INSERT()
+        stOutParam.dwSize = sizeof(NET_OUT_ACCESS_CARD_SERVICE_INSERT)
+        stOutParam.nMaxRetNum = len(chunk)
+        fail_codes = (c_int * len(chunk))()
+        stOutParam.pFailCode = cast(fail_codes, POINTER(c_int))
+
+        result = self.sdk.OperateAccessCardService(  # type: ignore
+            login_id,
+            EM_A_NET_EM_ACCESS_CTL_CARD_SERVICE.NET_EM_ACCESS_CTL_CARD_SERVICE_INSERT,
+            stInParam,
+            stOutParam,
+            5000,
+        )
+        return self._fail_codes(result, fail_codes)
+
+    def _fail_codes(self, result: Any, fail_codes: Any) -> List[int]:
+        """Per-record codes of a multi-record call; raise if the call itself failed."""
+        codes = list(fail_codes)
+        if not result and not any(codes):
+            raise Exception(self.sdk.GetLastErrorMessage())
+        return codes
+
     def update_user(
         self,
         device_code: str,
@@ -220,9 +682,7 @@ class DahuaNetSDKService:
         """
         Update user information.
         """
-        self._validate_login(device_code)
-
-        login_id = self.sessions[device_code]
+        login_id = self._validate_login(device_code)
 
         stInParam = NET_IN_ACCESS_CTL_USER_UPDATE()
         stInParam.dwSize = sizeof(NET_IN_ACCESS_CTL_USER_UPDATE)
@@ -243,38 +703,68 @@ class DahuaNetSDKService:
         )
 
         if result > 0:
+            # Dropped rather than patched: the next lookup refetches the card
+            self.user_directory(device_code).remove(payload.user_id)
             return True
 
         raise Exception(self.sdk.GetLastErrorMessage())
 
     def add_face(self, device_code: str, user_id: str, face_photo_url: str):
         """Add a face to a user."""
-        self._validate_login(device_code)
+        face_data = get_face_image_url_to_bytes(face_photo_url)
 
-        login_id = self.sessions[device_code]
+        [result] = self.add_faces(device_code, [(user_id, face_data)])
+        if not result.success:
+            raise Exception(result.error or self.sdk.GetLastErrorMessage())
+        return True
 
-        face_data = get_face_image_url_to_bytes(face_photo_url)
+    def add_faces(
+        self, device_code: str, faces: List[Tuple[str, bytes]]
+    ) -> List[FaceBatchResult]:
+        """Enroll (user_id, photo) pairs, several NET_ACCESS_FACE_INFO per call."""
+        login_id = self._validate_login(device_code)
+
+        results = [FaceBatchResult(user_id) for user_id, _ in faces]
+        succeeded = self._insert_in_chunks(
+            device_code,
+            "face",
+            login_id,
+            self._insert_face_infos,
+            faces,
+            list(range(len(faces))),
+            results,
+            FACE_INSERT_BATCH_SIZE,
+        )
+
+        logger.info(
+            "Batch face insert finished",
+            device_code=device_code,
+            total=len(faces),
+            succeeded=len(succeeded),
+        )
+        return results
 
+    def _insert_face_infos(
+        self, login_id: int, chunk: List[Tuple[str, bytes]]
+    ) -> List[int]:
         pstInParam = NET_IN_ACCESS_FACE_SERVICE_INSERT()
         pstInParam.dwSize = sizeof(NET_IN_ACCESS_FACE_SERVICE_INSERT)
-        pstInParam.nFaceInfoNum = 1  # Number of face records to add
-
-        # Create face info structure
-        faceInfo = NET_ACCESS_FACE_INFO()
-        faceInfo.szUserID = user_id.encode()  # User ID (must match existing user)
+        pstInParam.nFaceInfoNum = len(chunk)  # Number of face records to add
 
-        # Set up face photo data
-        faceInfo.nFacePhoto = 1  # Number of face photos (1 photo)
-        faceInfo.nInFacePhotoLen[0] = len(face_data)  # Input photo length
-        faceInfo.nOutFacePhotoLen[0] = len(face_data)  # Expected output length
+        face_info_array = (NET_ACCESS_FACE_INFO * len(chunk))()
+        # Photo buffers must outlive the SDK call
+        image_buffers = []
+        for faceInfo, (user_id, face_data) in zip(face_info_array, chunk):
+            faceInfo.szUserID = user_id.encode()  # User ID (must match existing user)
 
-        # Allocate buffer for image data and keep reference
-        image_buffer = create_string_buffer(face_data, len(face_data))
-        faceInfo.pFacePhoto[0] = cast(image_buffer, c_void_p)
+            # Set up face photo data
+            faceInfo.nFacePhoto = 1  # Number of face photos (1 photo)
+            faceInfo.nInFacePhotoLen[0] = len(face_data)  # Input photo length
+            faceInfo.nOutFacePhotoLen[0] = len(face_data)  # Expected output length
 
-        # Create array of face info (even though we only have 1)
-        face_info_array = (NET_ACCESS_FACE_INFO * 1)()
-        face_info_array[0] = faceInfo
+            image_buffer = create_string_buffer(face_data, len(face_data))
+            image_buffers.append(image_buffer)
+            faceInfo.pFacePhoto[0] = cast(image_buffer, c_void_p)
 
         # Assign face info array to input parameter
         pstInParam.pFaceInfo = cast(face_info_array, POINTER(NET_ACCESS_FACE_INFO))
@@ -282,10 +772,10 @@ class DahuaNetSDKService:
         # Create output parameter structure
         pstOutParam = NET_OUT_ACCESS_FACE_SERVICE_INSERT()
         pstOutParam.dwSize = sizeof(NET_OUT_ACCESS_FACE_SERVICE_INSERT)
-        pstOutParam.nMaxRetNum = 1  # Maximum return number (should match input count)
+        pstOutParam.nMaxRetNum = len(chunk)  # Should match input count
 
-        # Allocate memory for failure codes (in case of errors)
-        fail_codes = (c_int * 1)()
+        # Allocate memory for failure codes, one per face
+        fail_codes = (c_int * len(chunk))()
         pstOutParam.pFailCode = cast(fail_codes, POINTER(c_int))
 
         result = self.sdk.OperateAccessFaceService(  # type: ignore
@@ -295,15 +785,60 @@ class DahuaNetSDKService:
             pstOutParam,
             5000,  # Timeout in milliseconds
         )
+        return self._fail_codes(result, fail_codes)
+
+    def remove_user(self, device_code: str, user_id: str) -> bool:
+        """Remove every card of a user. Returns False if the user has none."""
+        login_id = self._validate_login(device_code)
+
+        # Card rec_nos come from the device, not the directory, so a stale
+        # directory can't make us remove the wrong record
+        cards = [
+            UserPayload.from_net_recordset(record)
+            for records in self.iter_cards(device_code, user_id)
+            for record in records
+        ]
 
-        print("result", result)
+        try:
+            for card in cards:
+                self._remove_card_record(login_id, card.rec_no or 0)
+        finally:
+            self.user_directory(device_code).remove(user_id)
+        return bool(cards)
+
+    def remove_cards(self, device_code: str, rec_nos: List[int]) -> List[Optional[str]]:
+        """Remove card records by rec_no; returns the error of each, or None."""
+        login_id = self._validate_login(device_code)
+
+        errors: List[Optional[str]] = []
+        for rec_no in rec_nos:
+            try:
+                self._remove_card_record(login_id, rec_no)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+
+        # Removed cards may belong to users with other cards; reload on next list
+        self.user_directory(device_code).invalidate()
+        return errors
+
+    def _remove_card_record(self, login_id: int, rec_no: int) -> None:
+        rec_no_value = c_int(rec_no)
+
+        stInParam = NET_CTRL_RECORDSET_PARAM()
+        stInParam.dwSize = sizeof(NET_CTRL_RECORDSET_PARAM)
+        stInParam.emType = EM_NET_RECORD_TYPE.ACCESSCTLCARD
+        stInParam.pBuf = cast(pointer(rec_no_value), c_void_p)
+        stInParam.nBufLen = sizeof(c_int)
 
+        result = self.sdk.ControlDevice(
+            login_id,
+            CtrlType.RECORDSET_REMOVE,
+            stInParam,  # type: ignore
+            5000,
+        )
         if result <= 0:  # type: ignore
             raise Exception(self.sdk.GetLastErrorMessage())
-        return True
-
-    def remove_user(self, device_code: str, user_id: str):
-        """"""
 
     def listen_server(
         self,
@@ -330,12 +865,10 @@ class DahuaNetSDKService:
             raise e
 
     def find_card(self, device_code: str, user_id: Optional[str] = None):
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
+        login_id = self._validate_login(device_code)
         find_condition = NET_A_FIND_RECORD_ACCESSCTLCARD_CONDITION()
         find_condition.dwSize = sizeof(NET_A_FIND_RECORD_ACCESSCTLCARD_CONDITION)
         if user_id:
-            print("use find condition")
             find_condition.abUserID = 1
             find_condition.szUserID = user_id.encode()
         st_in = NET_IN_FIND_RECORD_PARAM()
@@ -348,120 +881,135 @@ class DahuaNetSDKService:
         st_out.dwSize = sizeof(NET_OUT_FIND_RECORD_PARAM)
 
         result = self.sdk.FindRecord(login_id, st_in, st_out)
-        print("result", result)
+        if result and st_out.lFindeHandle:
+            self._track_find_handle(device_code, st_out.lFindeHandle)
         return st_out.lFindeHandle
 
     def find_next_card(
         self, finde_handle: Any, find_count: int
     ) -> Optional[List[NET_RECORDSET_ACCESS_CTL_CARD]]:
         try:
-            # 1. Tạo mảng struct giống như Java (tương đương với new NET_RECORDSET_ACCESS_CTL_CARD[nFindCount])
-            pst_record = (NET_RECORDSET_ACCESS_CTL_CARD * find_count)()
-
-            # 2. Khởi tạo từng element trong mảng và set dwSize
-            for i in range(find_count):
-                pst_record[i] = NET_RECORDSET_ACCESS_CTL_CARD()
-                pst_record[i].dwSize = sizeof(NET_RECORDSET_ACCESS_CTL_CARD)
-
-            # 3. Thiết lập input parameters
-            st_in = NET_IN_FIND_NEXT_RECORD_PARAM()
-            st_in.dwSize = sizeof(NET_IN_FIND_NEXT_RECORD_PARAM)
-            st_in.lFindeHandle = finde_handle
-            st_in.nFileCount = find_count
-
-            # 4. Thiết lập output parameters
-            st_out = NET_OUT_FIND_NEXT_RECORD_PARAM()
-            st_out.nMaxRecordNum = find_count
-            # 5. Cấp phát memory cho pRecordList (tương đương với new Memory() trong Java)
-            st_out.pRecordList = cast(pst_record, c_void_p)
-            st_out.dwSize = sizeof(NET_OUT_FIND_NEXT_RECORD_PARAM)
-            # 6. Gọi SDK API
-            result = self.sdk.FindNextRecord(st_in, st_out, 5000)
-
-            if not result:
-                logger.warning("FindNextRecord failed")
-                return None
-
-            record_count = st_out.nRetRecordNum
-
-            if record_count == 0:
-                logger.info("No records found")
-                return None
-
-            # 7. Extract dữ liệu từ mảng (SDK đã fill dữ liệu vào pst_record)
-            # Tương đương với GetPointerDataToStructArr trong Java
-            records: List[NET_RECORDSET_ACCESS_CTL_CARD] = []
-
-            # 8. Tạo list chỉ chứa số lượng record thực tế trả về
-            # (tương đương với tạo pstRecordEx[stNextOut.nRetRecordNum] trong Java)
-            for i in range(record_count):
-                print("pst_record[i].", pst_record[i])
-                print(
-                    "pst_record[i].szCardNo",
-                    pst_record[i].szCardNo.decode("utf-8", errors="ignore"),
-                )
-                records.append(pst_record[i])
+            # 1. Mượn mảng struct đã khởi tạo sẵn dwSize từ pool
+            with self.card_buffers.lease(find_count) as buffer:
+                pst_record = buffer.records
 
-            return records
+                # 2. Thiết lập input parameters
+                st_in = NET_IN_FIND_NEXT_RECORD_PARAM()
+                st_in.dwSize = sizeof(NET_IN_FIND_NEXT_RECORD_PARAM)
+                st_in.lFindeHandle = finde_handle
+                st_in.nFileCount = find_count
+
+                # 3. Thiết lập output parameters
+                st_out = NET_OUT_FIND_NEXT_RECORD_PARAM()
+                st_out.nMaxRecordNum = find_count
+                st_out.pRecordList = cast(pst_record, c_void_p)
+                st_out.dwSize = sizeof(NET_OUT_FIND_NEXT_RECORD_PARAM)
+
+                # 4. Gọi SDK API
+                result = self.sdk.FindNextRecord(st_in, st_out, 5000)
+
+                if not result:
+                    logger.warning("FindNextRecord failed")
+                    return None
+
+                record_count = st_out.nRetRecordNum
+                buffer.used = record_count
+
+                if record_count == 0:
+                    logger.info("No records found")
+                    return None
+
+                # 5. Copy các record thực tế trả về ra khỏi buffer trước khi trả lại pool
+                # (tương đương với tạo pstRecordEx[stNextOut.nRetRecordNum] trong Java)
+                records: List[NET_RECORDSET_ACCESS_CTL_CARD] = [
+                    NET_RECORDSET_ACCESS_CTL_CARD.from_buffer_copy(pst_record[i])
+                    for i in range(record_count)
+                ]
+
+                return records
 
         except Exception as e:
             logger.error("Error occurred while finding next card", error=str(e))
             raise e
 
     # ***
-    def find_next_record(self, finde_handle: Any, find_count: int):
-        # 1. Tạo mảng struct
-        pst_record = (NET_RECORDSET_ACCESS_CTL_CARDREC * find_count)()
+    def find_next_record(
+        self, finde_handle: Any, find_count: int, buffer: RecordBuffer
+    ):
+        """Fetch the next page into a leased buffer from `card_rec_buffers`.
 
-        # 2. Khởi tạo từng element trong mảng và set dwsize
-        for i in range(find_count):
-            pst_record[i] = NET_RECORDSET_ACCESS_CTL_CARDREC()
-            pst_record[i].dwSize = sizeof(NET_RECORDSET_ACCESS_CTL_CARDREC)
+        The returned records live in the leased buffer and must be decoded
+        before the lease is released.
+        """
+        pst_record = buffer.records
 
-        # 3. Thiết lập input
+        # 1. Thiết lập input
         st_next_in = NET_IN_FIND_NEXT_RECORD_PARAM()
         st_next_in.dwSize = sizeof(NET_IN_FIND_NEXT_RECORD_PARAM)
         st_next_in.lFindeHandle = finde_handle
         st_next_in.nFileCount = find_count
 
-        # 4. Thiết lập output parameters
+        # 2. Thiết lập output parameters
         st_next_out = NET_OUT_FIND_NEXT_RECORD_PARAM()
         st_next_out.nMaxRecordNum = find_count
 
-        # 5. Cấp phát memory cho pRecordList (tương đương với new Memory() trong Java)
+        # 3. Dùng mảng đã cấp phát sẵn cho pRecordList
         st_next_out.pRecordList = cast(pst_record, c_void_p)
         st_next_out.dwSize = sizeof(NET_OUT_FIND_NEXT_RECORD_PARAM)
 
-        # 6. Gọi SDK API
+        # 4. Gọi SDK API
         result = self.sdk.FindNextRecord(st_next_in, st_next_out, 5000)
         if not result:
             logger.warning("FindNextRecord failed")
             return None
 
         record_count = st_next_out.nRetRecordNum
+        buffer.used = record_count
         if record_count == 0:
             logger.info("No records found")
             return None
 
         return st_next_out
 
-    def find_user(self, device_code: str, user_id: Optional[str] = None):
-        self._validate_login(device_code)
-
-        finde_handle = self.find_card(device_code, user_id)
-
-        records = self.find_next_card(finde_handle, 1)
+    def find_user(
+        self, device_code: str, user_id: Optional[str] = None
+    ) -> Optional[UserPayload]:
+        """Look a user up in the device's directory.
 
-        if not records:
-            return None
+        The directory answers while it is fresh. A user missing from it, or
+        any user once it is stale, is fetched from the device and written
+        back, so changes made outside this service show up incrementally.
+        """
+        self._validate_login(device_code)
 
-        return records[0]
+        directory = self.user_directory(device_code)
+        if user_id is None:
+            users = self.list_users(device_code)
+            return users[0] if users else None
+
+        stale = directory.is_stale
+        if not stale:
+            user = directory.get(user_id)
+            if user is not None:
+                return user
+
+        cards = [
+            UserPayload.from_net_recordset(record)
+            for records in self.iter_cards(device_code, user_id, page_size=1)
+            for record in records
+        ]
+        if stale:
+            # Cards the device no longer has must not be served again
+            directory.remove(user_id)
+        for card in cards:
+            directory.upsert(card)
+
+        return cards[0] if cards else None
 
     def find_user_v2(
         self, device_code: str, user_id: str
     ) -> NET_OUT_ACCESS_USER_SERVICE_GET:
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
+        login_id = self._validate_login(device_code)
         st_in = NET_IN_ACCESS_USER_SERVICE_GET()
         st_in.dwSize = sizeof(NET_IN_ACCESS_USER_SERVICE_GET)
         st_in.szUserID = user_id.encode()
@@ -485,62 +1033,65 @@ class DahuaNetSDKService:
         """List users for a specific device."""
         self._validate_login(device_code)
 
-        n_find_count = 50
-        try:
-            finde_handle = self.find_card(device_code)
-            records = self.find_next_card(finde_handle, n_find_count)
+        directory = self.user_directory(device_code)
+        if directory.is_stale:
+            self.refresh_user_directory(device_code)
 
-            if not records:
-                return []
+        return directory.list()
 
-            # Convert NET_RECORDSET_ACCESS_CTL_CARD records to UserPayload objects
-            users: List[UserPayload] = []
-            for record in records:
-                try:
-                    user = UserPayload(
-                        card_name=record.szCardName.decode(
-                            "utf-8", errors="ignore"
-                        ).rstrip("\x00"),
-                        card_no=record.szCardNo.decode("utf-8", errors="ignore").rstrip(
-                            "\x00"
-                        ),
-                        user_id=record.szUserID.decode("utf-8", errors="ignore").rstrip(
-                            "\x00"
-                        ),
-                        sz_pw=(
-                            record.szPsw.decode("utf-8", errors="ignore").rstrip("\x00")
-                            if record.szPsw
-                            else None
-                        ),
-                        valid_start_time=(
-                            net_time_to_timestamp(record.stuValidStartTime)
-                            if hasattr(record, "stuValidStartTime")
-                            else None
-                        ),
-                        valid_end_time=(
-                            net_time_to_timestamp(record.stuValidEndTime)
-                            if hasattr(record, "stuValidEndTime")
-                            else None
-                        ),
-                        first_enter=bool(record.bFirstEnter),
-                        citizen_id_no=(
-                            record.szCitizenIDNo.decode(
-                                "utf-8", errors="ignore"
-                            ).rstrip("\x00")
-                            if record.szCitizenIDNo
-                            else None
-                        ),
-                    )
-                    users.append(user)
-                except Exception as e:
-                    logger.warning(f"Failed to parse record: {e}")
-                    continue
+    def user_directory(self, device_code: str) -> UserDirectory:
+        """Return the device's user directory, empty until first loaded."""
+        directory = self._user_directories.get(device_code)
+        if directory is None:
+            # Racing callers all get the instance that was stored first
+            directory = self._user_directories.setdefault(
+                device_code, UserDirectory(device_code, self.user_directory_ttl)
+            )
+        return directory
 
-            return users
+    def refresh_user_directory(self, device_code: str) -> UserDirectory:
+        """Enumerate every card on the device into its user directory."""
+        try:
+            users: List[UserPayload] = []
+            for records in self.iter_cards(device_code):
+                for record in records:
+                    try:
+                        users.append(UserPayload.from_net_recordset(record))
+                    except Exception as e:
+                        logger.warning(f"Failed to parse record: {e}")
+                        continue
+
+            directory = self.user_directory(device_code)
+            directory.load(users)
+            logger.info(
+                "User directory loaded", device_code=device_code, cards=len(users)
+            )
+            return directory
         except Exception as e:
             logger.error("Error occurred while listing users", error=str(e))
             raise e
 
+    def iter_cards(
+        self,
+        device_code: str,
+        user_id: Optional[str] = None,
+        page_size: int = USER_PAGE_SIZE,
+    ) -> Iterator[List[NET_RECORDSET_ACCESS_CTL_CARD]]:
+        """Yield the device's card records page by page until none are left."""
+        finde_handle = self.find_card(device_code, user_id)
+        if not finde_handle:
+            return
+
+        try:
+            while True:
+                # A short page doesn't mean the end, devices cap the page size
+                records = self.find_next_card(finde_handle, page_size)
+                if not records:
+                    break
+                yield records
+        finally:
+            self.close_find_handle(finde_handle)
+
     def get_records_from_pointer(
         self, st_next_out: NET_OUT_FIND_NEXT_RECORD_PARAM
     ) -> List[NET_RECORDSET_ACCESS_CTL_CARDREC]:
@@ -565,17 +1116,15 @@ class DahuaNetSDKService:
 
         return records
 
-    def find_records(
+    def _open_access_record_query(
         self,
-        device_code: str,
+        login_id: int,
         card_no: Optional[str] = None,
         start_time: Optional[int] = None,
         end_time: Optional[int] = None,
-        n_rec: Optional[int] = 1,
         by_asc_order: Optional[bool] = True,
-    ) -> List[AccessCardRecord]:
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
+    ) -> Optional[int]:
+        """Open an access record query and return its find handle."""
         find_condition = NET_FIND_RECORD_ACCESSCTLCARDREC_CONDITION_EX()
         find_condition.dwSize = sizeof(NET_FIND_RECORD_ACCESSCTLCARDREC_CONDITION_EX)
         if card_no:
@@ -609,127 +1158,169 @@ class DahuaNetSDKService:
         st_out.dwSize = sizeof(NET_OUT_FIND_RECORD_PARAM)
         find_record_result = self.sdk.FindRecord(login_id, st_in, st_out, 5000)
         if not find_record_result:
-            return []
+            return None
 
-        ### Find next record
-        n_remain_records_to_find = 0
-        max_records_find_for_each_request = 2000
+        return st_out.lFindeHandle
 
-        if n_rec and n_rec > 0:
-            max_records_find_for_each_request = n_rec if n_rec < 2000 else 2000
-            n_remain_records_to_find = n_rec
-        else:
-            n_remain_records_to_find = 100000
+    def open_record_query(
+        self,
+        device_code: str,
+        card_no: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        by_asc_order: Optional[bool] = True,
+    ) -> Optional[int]:
+        """Open a tracked access record query; close it with close_find_handle."""
+        login_id = self._validate_login(device_code)
 
-        # List to store all records
-        pst_record_ex_list: List[AccessCardRecord] = []
+        finde_handle = self._open_access_record_query(
+            login_id, card_no, start_time, end_time, by_asc_order
+        )
+        if finde_handle is not None:
+            self._track_find_handle(device_code, finde_handle)
+        return finde_handle
+
+    def open_seek_query(
+        self, device_code: str, from_time: Optional[int] = None
+    ) -> Optional[int]:
+        """Open an ascending query resuming at a checkpoint record's time."""
+        start_time, end_time = seek_window(from_time)
+        return self.open_record_query(
+            device_code, start_time=start_time, end_time=end_time
+        )
+
+    def iter_record_pages(
+        self,
+        finde_handle: int,
+        n_rec: int,
+        page_size: int,
+        from_rec_no: Optional[int] = None,
+    ) -> Iterator[Sequence[AccessCardRecord]]:
+        """Yield records one FindNextRecord page at a time, decoded as a batch."""
+        n_remain_records_to_find = n_rec
 
         # Implement do-while loop logic equivalent in Python
         while True:
-            st_next_out = self.find_next_record(
-                st_out.lFindeHandle, max_records_find_for_each_request
-            )
+            # Records are decoded before the buffer goes back to the pool
+            with self.card_rec_buffers.lease(page_size) as buffer:
+                st_next_out = self.find_next_record(finde_handle, page_size, buffer)
 
-            if st_next_out is None:
-                break
-            record_count = st_next_out.nRetRecordNum
+                if st_next_out is None:
+                    break
+                record_count = st_next_out.nRetRecordNum
 
-            record_list = cast(
-                st_next_out.pRecordList, POINTER(NET_RECORDSET_ACCESS_CTL_CARDREC)
-            )
+                page = AccessCardRecordBatch.from_net_recordset_array(
+                    buffer.records, record_count
+                ).from_rec_no(from_rec_no)
 
-            for i in range(record_count):
-                pst_record_ex_list.append(
-                    AccessCardRecord.from_net_recordset(record_list[i])
-                )
-                n_remain_records_to_find -= 1
+            if len(page) > n_remain_records_to_find:
+                page = page[:n_remain_records_to_find]
+            n_remain_records_to_find -= len(page)
 
-                if n_remain_records_to_find == 0:
-                    break
+            if len(page):
+                yield page
 
             # Continue while we haven't found enough records and there are still records available
-            if st_next_out.nRetRecordNum == 0 or n_remain_records_to_find <= 0:
+            if record_count == 0 or n_remain_records_to_find <= 0:
                 break
 
-        return pst_record_ex_list
-
-    def find_records_by_rec_no(
-        self, device_code: str, from_rec_no: int, n_rec: int, by_asc_order: bool
-    ) -> List[AccessCardRecord]:
-        """Find records by record number range."""
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
-
-        find_condition = NET_FIND_RECORD_ACCESSCTLCARDREC_CONDITION_EX()
-        find_condition.dwSize = sizeof(NET_FIND_RECORD_ACCESSCTLCARDREC_CONDITION_EX)
-        find_condition.bCardNoEnable = 0
-        find_condition.bTimeEnable = 0
+    def iter_records(
+        self,
+        device_code: str,
+        card_no: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        n_rec: Optional[int] = 1,
+        by_asc_order: Optional[bool] = True,
+    ) -> Iterator[Sequence[AccessCardRecord]]:
+        """Stream access records page by page instead of building one list."""
+        finde_handle = self.open_record_query(
+            device_code, card_no, start_time, end_time, by_asc_order
+        )
+        if finde_handle is None:
+            return
 
-        find_order = NET_FIND_RECORD_ACCESSCTLCARDREC_ORDER()
-        if by_asc_order:
-            find_order.emOrderType = 1
+        if n_rec and n_rec > 0:
+            page_size = n_rec if n_rec < 2000 else 2000
+            n_remain_records_to_find = n_rec
         else:
-            find_order.emOrderType = 2
-        find_order.emField = 1
-
-        find_condition.nOrderNum = 1
-        find_condition.stuOrders[0] = find_order
-
-        st_in = NET_IN_FIND_RECORD_PARAM()
-        st_in.dwSize = sizeof(NET_IN_FIND_RECORD_PARAM)
-        st_in.emType = EM_NET_RECORD_TYPE.ACCESSCTLCARDREC_EX
-        st_in.pQueryCondition = cast(pointer(find_condition), c_void_p)
-
-        st_out = NET_OUT_FIND_RECORD_PARAM()
-        st_out.dwSize = sizeof(NET_OUT_FIND_RECORD_PARAM)
-
-        find_record_result = self.sdk.FindRecord(login_id, st_in, st_out, 5000)
-        if not find_record_result:
-            return []
+            page_size = 2000
+            n_remain_records_to_find = 100000
 
-        ### Find next record
-        n_remain_records_to_find = n_rec
-        max_records_find_for_each_request = 2000
+        try:
+            yield from self.iter_record_pages(
+                finde_handle, n_remain_records_to_find, page_size
+            )
+        finally:
+            self.close_find_handle(finde_handle)
 
-        # List to store all records
+    def find_records(
+        self,
+        device_code: str,
+        card_no: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        n_rec: Optional[int] = 1,
+        by_asc_order: Optional[bool] = True,
+    ) -> List[AccessCardRecord]:
         pst_record_ex_list: List[AccessCardRecord] = []
+        for page in self.iter_records(
+            device_code, card_no, start_time, end_time, n_rec, by_asc_order
+        ):
+            pst_record_ex_list.extend(page)
 
-        # Implement do-while loop logic equivalent in Python
-        while True:
-
-            st_next_out = self.find_next_record(
-                st_out.lFindeHandle, max_records_find_for_each_request
-            )
+        return pst_record_ex_list
 
-            if st_next_out is None:
-                break
-            record_count = st_next_out.nRetRecordNum
+    def iter_records_by_rec_no(
+        self,
+        device_code: str,
+        from_rec_no: int,
+        n_rec: int,
+        by_asc_order: bool,
+        from_time: Optional[int] = None,
+    ) -> Iterator[Sequence[AccessCardRecord]]:
+        """Stream records from a record number page by page.
+
+        When `from_time` (the checkpoint record's time) is given, the device
+        query starts at that time instead of at the beginning of the table, so
+        the cost follows the number of new records rather than the history.
+        """
+        start_time, end_time = seek_window(from_time)
+        finde_handle = self.open_record_query(
+            device_code,
+            start_time=start_time,
+            end_time=end_time,
+            by_asc_order=by_asc_order,
+        )
+        if finde_handle is None:
+            return
 
-            record_list = cast(
-                st_next_out.pRecordList, POINTER(NET_RECORDSET_ACCESS_CTL_CARDREC)
+        try:
+            yield from self.iter_record_pages(
+                finde_handle, n_rec, 2000, from_rec_no=from_rec_no
             )
+        finally:
+            self.close_find_handle(finde_handle)
 
-            for i in range(record_count):
-                if record_list[i].nRecNo < from_rec_no:
-                    continue
-
-                pst_record_ex_list.append(
-                    AccessCardRecord.from_net_recordset(record_list[i])
-                )
-                n_remain_records_to_find -= 1
-
-                if n_remain_records_to_find == 0:
-                    break
-
-            # Continue while we haven't found enough records and there are still records available
-            if st_next_out.nRetRecordNum == 0 or n_remain_records_to_find <= 0:
-                break
+    def find_records_by_rec_no(
+        self,
+        device_code: str,
+        from_rec_no: int,
+        n_rec: int,
+        by_asc_order: bool,
+        from_time: Optional[int] = None,
+    ) -> List[AccessCardRecord]:
+        """Find records by record number range."""
+        pst_record_ex_list: List[AccessCardRecord] = []
+        for page in self.iter_records_by_rec_no(
+            device_code, from_rec_no, n_rec, by_asc_order, from_time
+        ):
+            pst_record_ex_list.extend(page)
 
         return pst_record_ex_list
 
     def get_device_info(self, device_code: str):
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
+        login_id = self._validate_login(device_code)
         version_info = NET_A_DEV_VERSION_INFO()
         version_info.dwSize = sizeof(NET_A_DEV_VERSION_INFO)  # Set size field
 
@@ -760,27 +1351,51 @@ class DahuaNetSDKService:
         }
 
     def download_remote_file(self, device_code: str, file_path: str):
-        self._validate_login(device_code)
-        login_id = self.sessions[device_code]
-        st_in = NET_IN_DOWNLOAD_REMOTE_FILE()
-        st_in.dwSize = sizeof(NET_IN_DOWNLOAD_REMOTE_FILE)
-        st_in.pszFileName = cast(file_path.encode("utf-8"), c_void_p)  # type: ignore
-        st_in.pszFileDst = cast(b"", c_void_p)  # type: ignore
-
-        st_out = NET_OUT_DOWNLOAD_REMOTE_FILE()
-        st_out.dwMaxFileBufLen = 999999
-        file_buf = create_string_buffer(999999)
-        st_out.pstFileBuf = cast(file_buf, c_void_p)
-        memset(file_buf, 0, 999999)
-
-        result = self.sdk.DownloadRemoteFile(login_id, st_in, st_out, 6000)
-        if not result:
-            logger.error(
-                "Error downloading remote file",
-                device_code=device_code,
-                file_path=file_path,
-                error=self.sdk.GetLastErrorMessage(),
-            )
-            return None
+        with self.lease_remote_file(device_code, file_path) as file_data:
+            return bytes(file_data) if file_data is not None else None
+
+    @contextmanager
+    def lease_remote_file(
+        self, device_code: str, file_path: str
+    ) -> Iterator[Optional[memoryview]]:
+        """Download a file into a pooled buffer and yield a view of its bytes.
+
+        The view is only valid inside the `with` block; the buffer goes back
+        to the pool afterwards. Yields None when the download fails.
+        """
+        login_id = self._validate_login(device_code)
+        file_name = file_path.encode("utf-8")
+
+        min_size = 0
+        while True:
+            with self.file_buffers.lease(min_size) as file_buf:
+                st_in = NET_IN_DOWNLOAD_REMOTE_FILE()
+                st_in.dwSize = sizeof(NET_IN_DOWNLOAD_REMOTE_FILE)
+                st_in.pszFileName = cast(file_name, c_void_p)  # type: ignore
+                st_in.pszFileDst = cast(b"", c_void_p)  # type: ignore
+
+                st_out = NET_OUT_DOWNLOAD_REMOTE_FILE()
+                st_out.dwSize = sizeof(NET_OUT_DOWNLOAD_REMOTE_FILE)
+                st_out.dwMaxFileBufLen = len(file_buf)
+                st_out.pstFileBuf = cast(file_buf, c_void_p)
+
+                result = self.sdk.DownloadRemoteFile(login_id, st_in, st_out, 6000)
+                file_len = st_out.dwRetFileBufLen
+                if file_len > len(file_buf) and min_size == 0:
+                    # Larger than the pooled buffers: retry once with room for it
+                    min_size = file_len
+                    continue
+
+                if not result or file_len > len(file_buf):
+                    logger.error(
+                        "Error downloading remote file",
+                        device_code=device_code,
+                        file_path=file_path,
+                        error=self.sdk.GetLastErrorMessage(),
+                    )
+                    yield None
+                    return
 
-        return file_buf.raw
+                with memoryview(file_buf).cast("B")[:file_len] as file_data:
+                    yield file_data
+                return
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.models.device import Device
+from app.repos.device_repo import DeviceRepo
+
+logger = structlog.get_logger(__name__)
+
+
+class DeviceRegistry:
+    """In-memory cache of device rows for the auto-register path.
+
+    Warmed with every device at startup. A cached device, or the absence of
+    one, is reused for `ttl` seconds and then reloaded on the next lookup;
+    if that reload fails the stale entry is served. The /devices endpoints
+    invalidate the devices they change. Other processes sharing the
+    database see changes only after the TTL.
+
+    Cached rows are detached snapshots: fields the service writes often,
+    such as is_online and last_uploaded_rec_no, may be out of date.
+    """
+
+    def __init__(self, device_repo: DeviceRepo, ttl: float = 300):
+        self.device_repo = device_repo
+        self.ttl = ttl
+
+        self._devices: Dict[str, Tuple[Optional[Device], float]] = {}
+        # Bumped by invalidate, so a load that started before is neither
+        # cached nor shared with later lookups
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        # One load per device and generation; concurrent lookups share it
+        self._loading: Dict[
+            str, Tuple[Tuple[int, int], asyncio.Future[Optional[Device]]]
+        ] = {}
+        self._stats = {"hits": 0, "misses": 0, "refresh_failures": 0}
+
+    async def warm(self) -> None:
+        """Load every device."""
+        devices = await self.device_repo.get_all_devices()
+        loaded_at = time.monotonic()
+        for device in devices:
+            self._devices[device.code] = (device, loaded_at)  # type: ignore
+        logger.info("Device registry warmed", devices=len(devices))
+
+    async def get(self, device_code: str) -> Optional[Device]:
+        """The device with this code, from the cache when fresh enough."""
+        entry = self._devices.get(device_code)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._stats["hits"] += 1
+            return entry[0]
+
+        self._stats["misses"] += 1
+        generation = self._generation(device_code)
+        shared = self._loading.get(device_code)
+        if shared is not None and shared[0] == generation:
+            return await asyncio.shield(shared[1])
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[device_code] = (generation, loading)
+        try:
+            device = await self.device_repo.get_by_code(device_code)
+        except Exception as e:
+            if entry is None:
+                loading.set_exception(e)
+                # Not logged as unretrieved when nobody else was waiting
+                loading.exception()
+                raise
+            self._stats["refresh_failures"] += 1
+            logger.warning(
+                "Failed to refresh device, using cached row",
+                device_code=device_code,
+                error=str(e),
+            )
+            device = entry[0]
+            loading.set_result(device)
+        else:
+            if self._generation(device_code) == generation:
+                self._devices[device_code] = (device, time.monotonic())
+            loading.set_result(device)
+        finally:
+            if self._loading.get(device_code, (None, None))[1] is loading:
+                del self._loading[device_code]
+            if not loading.done():
+                # Cancelled: waiters get a CancelledError rather than hanging
+                loading.cancel()
+
+        return device
+
+    def invalidate(self, device_code: Optional[str] = None) -> None:
+        """Drop one device, or every device, so the next lookup reloads it."""
+        if device_code is None:
+            self._epoch += 1
+            self._generations.clear()
+            self._devices.clear()
+        else:
+            self._generations[device_code] = self._generations.get(device_code, 0) + 1
+            self._devices.pop(device_code, None)
+
+    def _generation(self, device_code: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(device_code, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "devices": len(self._devices), "ttl": self.ttl}
@@ -0,0 +1,305 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.models.event import Event
+from app.repos.event_repo import EventRepo
+from app.services.webhook_router import WebhookRouter
+
+logger = structlog.get_logger(__name__)
+
+
+class _OutboxEntry:
+    def __init__(self, row: Dict[str, Any]):
+        self.row = row
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+
+class EventOutbox:
+    """Stores events in the events table and delivers them from there.
+
+    `add` returns once the event is committed, so callers can move their
+    checkpoint past it. Events added while an insert runs are inserted
+    together by the next one, up to `batch_size` rows per statement.
+    Committed events are delivered right away while fewer than
+    `max_in_flight` are outstanding, and marked sent or failed in bulk every
+    `flush_interval` seconds.
+
+    Undelivered rows are replayed from the table on start and every
+    `replay_interval` seconds, backing off up to 32 times that while replays
+    deliver nothing. An event is given up after `max_attempts` failed
+    deliveries. Delivery is at least once.
+    """
+
+    def __init__(
+        self,
+        event_repo: EventRepo,
+        webhook_router: WebhookRouter,
+        batch_size: int = 200,
+        flush_interval: float = 0.2,
+        max_in_flight: int = 1000,
+        replay_interval: float = 60,
+        max_attempts: int = 10,
+    ):
+        self.event_repo = event_repo
+        self.webhook_router = webhook_router
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_in_flight = max_in_flight
+        self.replay_interval = replay_interval
+        self.max_attempts = max_attempts
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[_OutboxEntry] = []
+        self._has_pending = asyncio.Event()
+        # Rows being delivered or waiting to be marked; replay skips them
+        self._in_flight: set[str] = set()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._sent: List[str] = []
+        self._failed: List[str] = []
+        self._tasks: List[asyncio.Task[None]] = []
+        self._deliveries: set[asyncio.Task[None]] = set()
+        self._replay_now = asyncio.Event()
+        self._closing = False
+        self._replay_delay = replay_interval
+        # Rows marked during a replay, whose query results may predate that
+        self._marked_during_query: Optional[set[str]] = None
+        self._sent_since_replay = 0
+
+        self._stats = {
+            "stored": 0,
+            "duplicates": 0,
+            "batches": 0,
+            "sent": 0,
+            "failed": 0,
+            "replayed": 0,
+            "deferred": 0,
+        }
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [
+            asyncio.create_task(self._write_loop()),
+            asyncio.create_task(self._mark_loop()),
+            asyncio.create_task(self._replay_loop()),
+        ]
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        if not self._tasks:
+            return
+        writer, marker, replayer = self._tasks
+        replayer.cancel()
+        # Commit what callers are waiting on, then let deliveries finish
+        self._closing = True
+        self._has_pending.set()
+        await asyncio.gather(writer, return_exceptions=True)
+        if self._deliveries:
+            await asyncio.wait(self._deliveries, timeout=timeout)
+        for task in self._deliveries:
+            task.cancel()
+        marker.cancel()
+        await asyncio.gather(*self._tasks, *self._deliveries, return_exceptions=True)
+        await self._mark()
+        self._tasks = []
+        logger.info("Event outbox shut down", **self._stats)
+
+    async def add(
+        self,
+        event_type: str,
+        event_id: str,
+        device_code: str,
+        occurred_at: datetime,
+        payload: Dict[str, Any],
+    ) -> None:
+        """Store an event for delivery; returns once it is committed.
+
+        `event_id` identifies the event across re-polls: an event already
+        stored is not stored or delivered again. May be awaited from any
+        thread's event loop.
+        """
+        if self._loop is None:
+            raise Exception("Event outbox is not started.")
+        row = {
+            "id": str(uuid.uuid4()),
+            "event_type": event_type,
+            "event_id": event_id,
+            "device_code": device_code,
+            "occurred_at": occurred_at,
+            "payload": payload,
+        }
+        if asyncio.get_running_loop() is self._loop:
+            return await self._add(row)
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._add(row), self._loop)
+        )
+
+    def replay(self) -> None:
+        """Retry undelivered events now instead of at the next interval."""
+        self._replay_now.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "waiting": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "max_in_flight": self.max_in_flight,
+            "replay_delay": self._replay_delay,
+        }
+
+    async def _add(self, row: Dict[str, Any]) -> None:
+        entry = _OutboxEntry(row)
+        self._pending.append(entry)
+        self._has_pending.set()
+        await entry.future
+
+    async def _write_loop(self) -> None:
+        while self._pending or not self._closing:
+            await self._has_pending.wait()
+            if not self._pending:
+                continue
+            batch = self._pending[: self.batch_size]
+            del self._pending[: self.batch_size]
+            if not self._pending:
+                self._has_pending.clear()
+
+            ids = [entry.row["id"] for entry in batch]
+            self._in_flight.update(ids)
+            try:
+                inserted = await self.event_repo.insert_events(
+                    [entry.row for entry in batch]
+                )
+            except Exception as e:
+                self._in_flight.difference_update(ids)
+                logger.error("Failed to store events", count=len(batch), error=str(e))
+                for entry in batch:
+                    if not entry.future.done():
+                        entry.future.set_exception(e)
+                continue
+
+            self._stats["batches"] += 1
+            self._stats["stored"] += len(inserted)
+            self._stats["duplicates"] += len(batch) - len(inserted)
+            for entry in batch:
+                if not entry.future.done():
+                    entry.future.set_result(None)
+
+            for entry in batch:
+                row = entry.row
+                if row["id"] not in inserted:
+                    self._in_flight.discard(row["id"])
+                elif self._slots.locked():
+                    # Left for replay, so a slow webhook does not hold events
+                    # in memory
+                    self._in_flight.discard(row["id"])
+                    self._stats["deferred"] += 1
+                    if self._replay_delay == self.replay_interval:
+                        self._replay_now.set()
+                else:
+                    await self._slots.acquire()
+                    self._start_delivery(row["id"], row["event_type"], row["payload"])
+
+    def _start_delivery(
+        self, row_id: str, event_type: str, payload: Dict[str, Any]
+    ) -> None:
+        task = asyncio.create_task(self._deliver(row_id, event_type, payload))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(
+        self, row_id: str, event_type: str, payload: Dict[str, Any]
+    ) -> None:
+        delivered = False
+        try:
+            delivered = await self.webhook_router.deliver(event_type, payload)
+            if delivered:
+                self._sent_since_replay += 1
+        except Exception as e:
+            logger.error("Failed to deliver event", event_id=row_id, error=str(e))
+        finally:
+            (self._sent if delivered else self._failed).append(row_id)
+            self._slots.release()
+
+    async def _mark_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self._mark()
+            except Exception as e:
+                logger.warning("Failed to mark events", error=str(e))
+
+    async def _mark(self) -> None:
+        sent, self._sent = self._sent, []
+        failed, self._failed = self._failed, []
+        try:
+            if sent:
+                await self.event_repo.mark_sent(sent)
+            if failed:
+                await self.event_repo.record_failed_attempts(failed, self.max_attempts)
+        except Exception:
+            # Keep them for the next round
+            self._sent[:0] = sent
+            self._failed[:0] = failed
+            raise
+        self._stats["sent"] += len(sent)
+        self._stats["failed"] += len(failed)
+        self._in_flight.difference_update(sent)
+        self._in_flight.difference_update(failed)
+        if self._marked_during_query is not None:
+            self._marked_during_query.update(sent, failed)
+
+    async def _replay_loop(self) -> None:
+        replayed = 0
+        while True:
+            if replayed and not self._sent_since_replay:
+                # Nothing got through since the last replay; the webhooks are
+                # likely down, so spend fewer attempts on them
+                self._replay_delay = min(
+                    self._replay_delay * 2, self.replay_interval * 32
+                )
+            else:
+                self._replay_delay = self.replay_interval
+            self._sent_since_replay = 0
+            try:
+                replayed = await self._replay()
+            except Exception as e:
+                replayed = 0
+                logger.warning("Failed to replay events", error=str(e))
+            try:
+                await asyncio.wait_for(self._replay_now.wait(), self._replay_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._replay_now.clear()
+
+    async def _replay(self) -> int:
+        after: Optional[Tuple[datetime, str]] = None
+        replayed = 0
+        self._marked_during_query = marked = set()
+        try:
+            while True:
+                events: List[Event] = await self.event_repo.get_pending_events(
+                    self.batch_size, after
+                )
+                if not events:
+                    break
+                for event in events:
+                    row_id: str = event.id  # type: ignore
+                    await self._slots.acquire()
+                    if row_id in self._in_flight or row_id in marked:
+                        self._slots.release()
+                        continue
+                    self._in_flight.add(row_id)
+                    self._start_delivery(
+                        row_id, event.event_type, event.payload  # type: ignore
+                    )
+                    replayed += 1
+                after = (events[-1].created_at, events[-1].id)  # type: ignore
+        finally:
+            self._marked_during_query = None
+
+        if replayed:
+            self._stats["replayed"] += replayed
+            logger.info("Replaying undelivered events", count=replayed)
+        return replayed
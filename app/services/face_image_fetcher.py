@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class _UrlEntry:
+    def __init__(self, digest: str, etag: Optional[str], checked_at: float):
+        self.digest = digest
+        self.etag = etag
+        self.checked_at = checked_at
+
+
+class FaceImageFetcher:
+    """Face photo downloader with a content-addressed memory and disk cache.
+
+    Photos are stored once per sha256 of their content, in a size-bounded LRU
+    in memory and in a size-bounded LRU directory on disk. Each URL maps to the
+    digest and ETag of its last download. Within `ttl` seconds a URL is served
+    from cache without a request; after that it is revalidated with
+    If-None-Match, so an unchanged photo is not downloaded again. Concurrent
+    fetches of one URL share a single request.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        ttl: float = 300,
+        max_concurrency: int = 8,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._urls: Dict[str, _UrlEntry] = {}
+        self._in_flight: Dict[str, asyncio.Future[bytes]] = {}
+
+        # digest -> content, least recently used first
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        # digest -> size of the file on disk, least recently used first
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+
+        self._stats = {
+            "downloads": 0,
+            "not_modified": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "shared": 0,
+        }
+
+    async def init(self) -> None:
+        self._client = httpx.AsyncClient(
+            timeout=10.0,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        if self.cache_dir is not None:
+            await asyncio.to_thread(self._load_disk_index)
+        logger.info(
+            "Face image fetcher initialized",
+            cache_dir=str(self.cache_dir),
+            disk_files=len(self._disk),
+        )
+
+    async def shutdown(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> bytes:
+        """Return the photo at `url`, from cache when possible."""
+        in_flight = self._in_flight.get(url)
+        if in_flight is not None:
+            self._stats["shared"] += 1
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        self._in_flight[url] = future
+        try:
+            content = await self._fetch(url)
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(url, None)
+
+    async def fetch_many(self, urls: List[str]) -> List[Union[bytes, Exception]]:
+        """Fetch photos concurrently, in order; failures are returned, not raised."""
+        return await asyncio.gather(
+            *(self.fetch(url) for url in urls), return_exceptions=True
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "urls": len(self._urls),
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_items": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    async def _fetch(self, url: str) -> bytes:
+        entry = self._urls.get(url)
+        if entry is None and self.cache_dir is not None:
+            entry = await asyncio.to_thread(self._read_url_entry, url)
+            if entry is not None:
+                self._urls[url] = entry
+
+        cached = await self._get_blob(entry.digest) if entry else None
+        if (
+            entry
+            and cached is not None
+            and time.monotonic() - entry.checked_at < self.ttl
+        ):
+            return cached
+
+        headers = {}
+        if entry and cached is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+
+        async with self._semaphore:
+            response = await self._get_client().get(url, headers=headers)
+
+        if response.status_code == 304 and entry and cached is not None:
+            self._stats["not_modified"] += 1
+            entry.checked_at = time.monotonic()
+            return cached
+
+        response.raise_for_status()
+        self._stats["downloads"] += 1
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+
+        entry = _UrlEntry(digest, response.headers.get("ETag"), time.monotonic())
+        self._urls[url] = entry
+        self._put_memory(digest, content)
+        if self.cache_dir is not None:
+            await self._put_disk(url, entry, content)
+        return content
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise Exception("Face image fetcher is not initialized.")
+        return self._client
+
+    async def _get_blob(self, digest: str) -> Optional[bytes]:
+        content = self._memory.get(digest)
+        if content is not None:
+            self._memory.move_to_end(digest)
+            self._stats["memory_hits"] += 1
+            return content
+
+        if self.cache_dir is None or digest not in self._disk:
+            return None
+        content = await asyncio.to_thread(self._read_blob, digest)
+        if content is None:
+            self._disk_bytes -= self._disk.pop(digest, 0)
+            return None
+        if digest in self._disk:
+            self._disk.move_to_end(digest)
+        self._stats["disk_hits"] += 1
+        self._put_memory(digest, content)
+        return content
+
+    async def _put_disk(self, url: str, entry: _UrlEntry, content: bytes) -> None:
+        # The index is only changed on the loop; the thread does file I/O
+        write_blob = entry.digest not in self._disk
+        evicted: List[str] = []
+        if write_blob and len(content) <= self.max_disk_bytes:
+            self._disk[entry.digest] = len(content)
+            self._disk_bytes += len(content)
+            evicted = self._evict_disk()
+        else:
+            write_blob = False
+
+        await asyncio.to_thread(
+            self._write_files, url, entry, content if write_blob else None, evicted
+        )
+
+    def _put_memory(self, digest: str, content: bytes) -> None:
+        if len(content) > self.max_memory_bytes or digest in self._memory:
+            return
+        self._memory[digest] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # Disk cache files, accessed through asyncio.to_thread.
+    # Layout: blobs/<digest[:2]>/<digest> and urls/<sha256(url)>.json
+
+    def _blob_path(self, digest: str) -> Path:
+        assert self.cache_dir is not None
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def _url_path(self, url: str) -> Path:
+        assert self.cache_dir is not None
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / "urls" / f"{key}.json"
+
+    def _load_disk_index(self) -> None:
+        blobs = self._blob_path("00").parent.parent
+        blobs.mkdir(parents=True, exist_ok=True)
+        self._url_path("").parent.mkdir(parents=True, exist_ok=True)
+
+        files = [
+            (p.stat().st_mtime, p)
+            for p in blobs.glob("*/*")
+            if p.is_file() and p.suffix != ".tmp"
+        ]
+        for _, path in sorted(files):
+            size = path.stat().st_size
+            self._disk[path.name] = size
+            self._disk_bytes += size
+        for digest in self._evict_disk():
+            self._blob_path(digest).unlink(missing_ok=True)
+
+    def _read_url_entry(self, url: str) -> Optional[_UrlEntry]:
+        try:
+            data = json.loads(self._url_path(url).read_text())
+        except (OSError, ValueError):
+            return None
+        # Loaded from disk: revalidate before use
+        return _UrlEntry(data["digest"], data.get("etag"), float("-inf"))
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        path = self._blob_path(digest)
+        try:
+            content = path.read_bytes()
+            os.utime(path)
+            return content
+        except OSError:
+            return None
+
+    def _write_files(
+        self,
+        url: str,
+        entry: _UrlEntry,
+        content: Optional[bytes],
+        evicted: List[str],
+    ) -> None:
+        try:
+            for digest in evicted:
+                self._blob_path(digest).unlink(missing_ok=True)
+
+            if content is not None:
+                path = self._blob_path(entry.digest)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(content)
+                tmp_path.replace(path)
+
+            self._url_path(url).write_text(
+                json.dumps({"digest": entry.digest, "etag": entry.etag})
+            )
+        except OSError as e:
+            logger.warning("Failed to write face image cache", url=url, error=str(e))
+
+    def _evict_disk(self) -> List[str]:
+        """Drop least recently used blobs from the index until under the limit."""
+        evicted: List[str] = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            digest, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(digest)
+        return evicted
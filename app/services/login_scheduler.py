@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.exceptions import DeviceOfflineError
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+
+logger = structlog.get_logger(__name__)
+
+
+class LoginPriority:
+    # Lower runs first
+    API = 0
+    CONNECT = 1
+
+
+class _LoginRequest:
+    def __init__(
+        self,
+        device_code: str,
+        ip: str,
+        port: int,
+        username: str,
+        password: str,
+        priority: int,
+        seq: int,
+    ):
+        self.device_code = device_code
+        self.ip = ip
+        self.port = port
+        self.username = username
+        self.password = password
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        # Set when the device disconnects while this login is running
+        self.cancelled = False
+        self.future: asyncio.Future[Optional[int]] = (
+            asyncio.get_running_loop().create_future()
+        )
+
+
+class LoginScheduler:
+    """Admission control for device logins.
+
+    Auto-register connects are queued and logged in at most `max_concurrency`
+    at a time and at most `rate` per second (with bursts of `burst`), so a
+    reconnect storm drains at a predictable pace without taking every NetSDK
+    thread. A device has at most one queued login: repeated connects update
+    the queued request instead of adding another. Devices that API work is
+    waiting on are moved to the front of the queue.
+    """
+
+    def __init__(
+        self,
+        async_dahua_netsdk_service: AsyncDahuaNetSDKService,
+        max_concurrency: int = 16,
+        rate: float = 20,
+        burst: int = 20,
+    ):
+        self.async_dahua_netsdk_service = async_dahua_netsdk_service
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+
+        self._heap: List[Tuple[int, int, str]] = []
+        self._queued: Dict[str, _LoginRequest] = {}
+        self._in_flight: Dict[str, _LoginRequest] = {}
+        self._seq = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tokens = float(burst)
+        self._tokens_at = time.monotonic()
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        self._stats = {
+            "submitted": 0,
+            "collapsed": 0,
+            "prioritized": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "max_wait_seconds": 0.0,
+        }
+
+    async def start(self) -> None:
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self) -> None:
+        tasks = [task for task in (self._dispatcher, *self._tasks) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for device_code in list(self._queued):
+            self.cancel(device_code)
+
+    async def login(
+        self,
+        device_code: str,
+        ip: str,
+        port: int,
+        username: str,
+        password: str,
+        priority: int = LoginPriority.CONNECT,
+    ) -> Optional[int]:
+        """Queue a login and wait for it.
+
+        Returns the login_id, or None when the device already had a login
+        queued (that request is updated with these connection details and its
+        caller handles the result) or disconnected while this one was running.
+        """
+        request = self._queued.get(device_code)
+        if request is not None:
+            request.ip, request.port = ip, port
+            request.username, request.password = username, password
+            self._stats["collapsed"] += 1
+            if priority < request.priority:
+                self._push(request, priority)
+            return None
+
+        request = _LoginRequest(
+            device_code, ip, port, username, password, priority, next(self._seq)
+        )
+        self._queued[device_code] = request
+        self._push(request, priority)
+        self._stats["submitted"] += 1
+        return await request.future
+
+    def prioritize(self, device_code: str) -> bool:
+        """Move a queued login to the front; False if none is queued."""
+        request = self._queued.get(device_code)
+        if request is None:
+            return False
+        if request.priority > LoginPriority.API:
+            self._stats["prioritized"] += 1
+            self._push(request, LoginPriority.API)
+        return True
+
+    async def wait_online(self, device_code: str, timeout: float = 30) -> bool:
+        """Wait for a queued or running login of the device, ahead of others."""
+        self.prioritize(device_code)
+        request = self._queued.get(device_code) or self._in_flight.get(device_code)
+        if request is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(request.future), timeout)
+            except Exception:
+                pass
+        return self.async_dahua_netsdk_service.sdk_service.is_logged_in(device_code)
+
+    def cancel(self, device_code: str) -> None:
+        """Drop the device's logins, e.g. when it disconnects.
+
+        A queued login fails with DeviceOfflineError. A running one cannot be
+        stopped; it is logged out when it completes and returns None.
+        """
+        request = self._queued.pop(device_code, None)
+        if request is not None and not request.future.done():
+            self._stats["cancelled"] += 1
+            request.future.set_exception(
+                DeviceOfflineError("Device disconnected before login")
+            )
+        request = self._in_flight.get(device_code)
+        if request is not None and not request.cancelled:
+            self._stats["cancelled"] += 1
+            request.cancelled = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        queued = len(self._queued)
+        return {
+            **self._stats,
+            "queued": queued,
+            "in_flight": len(self._in_flight),
+            "max_concurrency": self.max_concurrency,
+            "rate": self.rate,
+            "estimated_drain_seconds": queued / self.rate if self.rate else None,
+        }
+
+    def _push(self, request: _LoginRequest, priority: int) -> None:
+        # Older heap entries of the request are skipped by seq when popped
+        request.priority = priority
+        request.seq = next(self._seq)
+        heapq.heappush(self._heap, (priority, request.seq, request.device_code))
+        self._not_empty.set()
+
+    def _pop(self) -> Optional[_LoginRequest]:
+        while self._heap:
+            _, seq, device_code = heapq.heappop(self._heap)
+            request = self._queued.get(device_code)
+            if request is not None and request.seq == seq:
+                del self._queued[device_code]
+                return request
+        self._not_empty.clear()
+        return None
+
+    async def _take_token(self) -> None:
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._tokens_at) * self.rate
+            )
+            self._tokens_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            await self._take_token()
+
+            request = self._pop()
+            while request is None:
+                await self._not_empty.wait()
+                request = self._pop()
+
+            previous = self._in_flight.get(request.device_code)
+            self._in_flight[request.device_code] = request
+            task = asyncio.create_task(self._run(request, previous))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self, request: _LoginRequest, previous: Optional[_LoginRequest]
+    ) -> None:
+        wait = time.monotonic() - request.enqueued_at
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+        try:
+            if previous is not None:
+                # The device's earlier login is still running; it goes first
+                await asyncio.wait([previous.future])
+            login_id = await self.async_dahua_netsdk_service.login(
+                request.device_code,
+                request.ip,
+                request.port,
+                request.username,
+                request.password,
+            )
+            self._stats["succeeded"] += 1
+            if request.cancelled:
+                # The device disconnected meanwhile; its logout already ran
+                logger.info(
+                    "Device disconnected during login, logging out",
+                    device_code=request.device_code,
+                )
+                await self.async_dahua_netsdk_service.logout(request.device_code)
+                login_id = None
+            if not request.future.done():
+                request.future.set_result(login_id)
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as e:
+            self._stats["failed"] += 1
+            if not request.future.done():
+                request.future.set_exception(e)
+        finally:
+            if self._in_flight.get(request.device_code) is request:
+                del self._in_flight[request.device_code]
+            self._slots.release()
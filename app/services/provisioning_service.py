@@ -0,0 +1,210 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from app.repos.device_repo import DeviceRepo
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.login_scheduler import LoginScheduler
+from app.types.dahua_netsdk_types import UserPayload
+
+logger = structlog.get_logger(__name__)
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class DeviceStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    OFFLINE = "offline"
+
+
+class DeviceProvisioningResult:
+    def __init__(self, device_code: str):
+        self.device_code = device_code
+        self.status = DeviceStatus.PENDING
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class ProvisioningJob:
+    """One user (and optional face) pushed to a set of devices."""
+
+    def __init__(
+        self,
+        user: UserPayload,
+        face_image_url: Optional[str],
+        company_code: Optional[str],
+        device_codes: List[str],
+    ):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.face_image_url = face_image_url
+        self.company_code = company_code
+        self.status = JobStatus.PENDING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.results: Dict[str, DeviceProvisioningResult] = {
+            code: DeviceProvisioningResult(code) for code in dict.fromkeys(device_codes)
+        }
+
+    def progress(self) -> Dict[str, int]:
+        counts = {"total": len(self.results)}
+        for result in self.results.values():
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    def to_dict(self, with_results: bool = True) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "id": self.id,
+            "status": self.status,
+            "user_id": self.user.user_id,
+            "card_no": self.user.card_no,
+            "face_image_url": self.face_image_url,
+            "company_code": self.company_code,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress(),
+        }
+        if with_results:
+            data["results"] = [r.to_dict() for r in self.results.values()]
+        return data
+
+
+class ProvisioningService:
+    """Fans a user out to many devices concurrently as background jobs.
+
+    `max_concurrency` bounds device operations across all jobs (it should not
+    exceed the NetSDK executor size) and `per_device_concurrency` bounds
+    operations on any single device, so overlapping jobs queue per door
+    instead of piling onto it. Jobs live in memory; running jobs and the most
+    recent finished ones, up to `max_jobs` in all, are kept for status queries.
+    """
+
+    def __init__(
+        self,
+        async_dahua_netsdk_service: AsyncDahuaNetSDKService,
+        device_repo: DeviceRepo,
+        login_scheduler: LoginScheduler,
+        max_concurrency: int = 32,
+        per_device_concurrency: int = 1,
+        max_jobs: int = 100,
+    ):
+        self.async_dahua_netsdk_service = async_dahua_netsdk_service
+        self.device_repo = device_repo
+        self.login_scheduler = login_scheduler
+        self.per_device_concurrency = per_device_concurrency
+        self.max_jobs = max_jobs
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._device_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._jobs: OrderedDict[str, ProvisioningJob] = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task[None]] = {}
+
+    async def create_job(
+        self,
+        user: UserPayload,
+        face_image_url: Optional[str] = None,
+        company_code: Optional[str] = None,
+        device_codes: Optional[List[str]] = None,
+    ) -> ProvisioningJob:
+        """Resolve the targets and start provisioning them in the background."""
+        targets = list(device_codes or [])
+        if company_code:
+            devices = await self.device_repo.get_devices_by_company_code(company_code)
+            targets.extend(device.code for device in devices)
+
+        job = ProvisioningJob(user, face_image_url, company_code, targets)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run_job(job))
+        while len(self._jobs) > self.max_jobs:
+            # Running jobs stay until they finish, so shutdown can cancel them
+            finished_id = next((i for i in self._jobs if i not in self._tasks), None)
+            if finished_id is None:
+                break
+            del self._jobs[finished_id]
+
+        logger.info(
+            "Provisioning job created",
+            job_id=job.id,
+            user_id=user.user_id,
+            company_code=company_code,
+            devices=len(job.results),
+        )
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ProvisioningJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[ProvisioningJob]:
+        return list(reversed(self._jobs.values()))
+
+    async def shutdown(self) -> None:
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_job(self, job: ProvisioningJob) -> None:
+        job.status = JobStatus.RUNNING
+        try:
+            await asyncio.gather(
+                *(self._provision_device(job, r) for r in job.results.values())
+            )
+            job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.id, None)
+            logger.info("Provisioning job finished", job_id=job.id, **job.progress())
+
+    async def _provision_device(
+        self, job: ProvisioningJob, result: DeviceProvisioningResult
+    ) -> None:
+        device_code = result.device_code
+        # A device still waiting for its login is logged in ahead of the queue
+        if not await self.login_scheduler.wait_online(device_code):
+            result.status = DeviceStatus.OFFLINE
+            return
+
+        device_semaphore = self._device_semaphores.setdefault(
+            device_code, asyncio.Semaphore(self.per_device_concurrency)
+        )
+        async with device_semaphore, self._semaphore:
+            result.status = DeviceStatus.RUNNING
+            started_at = time.monotonic()
+            try:
+                # Each device gets its own copy: add_user records the rec_no
+                user = UserPayload(**vars(job.user))
+                await self.async_dahua_netsdk_service.add_user(device_code, user)
+                if job.face_image_url:
+                    await self.async_dahua_netsdk_service.add_face(
+                        device_code, user.user_id, job.face_image_url
+                    )
+                result.status = DeviceStatus.SUCCEEDED
+            except Exception as e:
+                result.status = DeviceStatus.FAILED
+                result.error = str(e)
+                logger.warning(
+                    "Provisioning failed on device",
+                    job_id=job.id,
+                    device_code=device_code,
+                    error=str(e),
+                )
+            finally:
+                result.duration = time.monotonic() - started_at
@@ -0,0 +1,206 @@
+import asyncio
+import itertools
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Union
+
+import aioboto3  # type: ignore
+import structlog
+from botocore.config import Config  # type: ignore
+
+from app.utils.file_buffer_pool import BufferReader
+
+logger = structlog.get_logger(__name__)
+
+Body = Union[bytes, bytearray, memoryview]
+
+
+class _UploadJob:
+    def __init__(self, key: str, body: BufferReader, content_type: str):
+        self.key = key
+        self.body = body
+        self.content_type = content_type
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+
+
+class S3Uploader:
+    """Process-wide S3 uploader with long-lived clients.
+
+    `client_count` S3 clients are opened once on the main loop and keep their
+    connections alive between uploads. Uploads from any thread's event loop
+    go through one bounded queue (awaiting `upload` waits while it is full) to
+    `max_concurrency` upload tasks that share the clients round-robin.
+    `endpoint_url` points the clients at an S3-compatible stand-in.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        endpoint_url: Optional[str] = None,
+        client_count: int = 2,
+        max_concurrency: int = 16,
+        max_queue_size: int = 1000,
+    ):
+        self.bucket = bucket
+        self.region = region
+        self.endpoint_url = endpoint_url or None
+        self.client_count = client_count
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+
+        self._session = aioboto3.Session(
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            region_name=region,
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[_UploadJob]] = None
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._clients: List[Any] = []
+        self._next_client = itertools.cycle([0])
+        self._tasks: List[asyncio.Task[None]] = []
+        self._in_flight = 0
+
+        self._stats = {
+            "uploaded": 0,
+            "failed": 0,
+            "bytes": 0,
+            "max_queue_seconds": 0.0,
+        }
+
+    async def init(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        # Each client's connection pool covers its share of the upload tasks
+        config = Config(
+            max_pool_connections=-(-self.max_concurrency // self.client_count),
+            tcp_keepalive=True,
+        )
+        self._exit_stack = AsyncExitStack()
+        for _ in range(self.client_count):
+            client = await self._exit_stack.enter_async_context(
+                self._session.client(
+                    "s3", endpoint_url=self.endpoint_url, config=config
+                )
+            )
+            self._clients.append(client)
+        self._next_client = itertools.cycle(range(len(self._clients)))
+
+        self._tasks = [
+            asyncio.create_task(self._upload_loop())
+            for _ in range(self.max_concurrency)
+        ]
+        logger.info(
+            "S3 uploader initialized",
+            bucket=self.bucket,
+            endpoint_url=self.endpoint_url,
+            clients=self.client_count,
+            max_concurrency=self.max_concurrency,
+        )
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "S3 uploads still queued at shutdown", queued=self._queue.qsize()
+                )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+        self._clients = []
+        logger.info("S3 uploader shut down", **self._stats)
+
+    async def upload(
+        self, key: str, body: Body, content_type: str = "application/octet-stream"
+    ) -> str:
+        """Upload `body` to `key` and return its URL.
+
+        May be awaited from any thread's event loop. `body` must stay valid
+        until this returns; it is read in place, not copied. If the caller is
+        cancelled the upload may still be running, so the body is copied
+        before this returns and the caller can release it.
+        """
+        if self._loop is None:
+            raise Exception("S3 uploader is not initialized.")
+        reader = BufferReader(body)
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                return await self._enqueue(key, reader, content_type)
+            return await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(
+                    self._enqueue(key, reader, content_type), self._loop
+                )
+            )
+        except asyncio.CancelledError:
+            reader.detach()
+            raise
+
+    def object_url(self, key: str) -> str:
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": self._in_flight,
+            "clients": len(self._clients),
+            "max_concurrency": self.max_concurrency,
+        }
+
+    async def _enqueue(self, key: str, body: BufferReader, content_type: str) -> str:
+        assert self._queue is not None
+        job = _UploadJob(key, body, content_type)
+        await self._queue.put(job)
+        return await job.future
+
+    async def _upload_loop(self) -> None:
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.future.done():
+                    await self._upload(job)
+            finally:
+                self._queue.task_done()
+
+    async def _upload(self, job: _UploadJob) -> None:
+        waited = time.monotonic() - job.enqueued_at
+        self._stats["max_queue_seconds"] = max(self._stats["max_queue_seconds"], waited)
+        client = self._clients[next(self._next_client)]
+        self._in_flight += 1
+        try:
+            await client.put_object(
+                Bucket=self.bucket,
+                Key=job.key,
+                Body=job.body,
+                ContentLength=len(job.body),
+                ContentType=job.content_type,
+            )
+            self._stats["uploaded"] += 1
+            self._stats["bytes"] += len(job.body)
+            if not job.future.done():
+                job.future.set_result(self.object_url(job.key))
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning("S3 upload failed", key=job.key, error=str(e))
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._in_flight -= 1
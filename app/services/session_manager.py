@@ -0,0 +1,451 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import structlog
+
+from app.exceptions import DeviceOfflineError
+
+logger = structlog.get_logger(__name__)
+
+
+class SessionState:
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+    # Auto-register session lost; waiting for the device to come back
+    DISCONNECTED = "disconnected"
+    CLOSED = "closed"
+
+
+class DeviceSession:
+    """One device login, with the credentials needed to log in again.
+
+    `auto_register` sessions ride on a connection the device opened to the
+    server, so they cannot be dialled again from here.
+    """
+
+    def __init__(
+        self,
+        device_code: str,
+        ip: str,
+        port: int,
+        username: str,
+        password: str,
+        auto_register: bool = False,
+    ):
+        self.device_code = device_code
+        self.ip = ip
+        self.port = port
+        self.username = username
+        self.password = password
+        self.auto_register = auto_register
+
+        self.login_id = 0
+        self.state = SessionState.CONNECTING
+        self.created_at = time.time()
+        self.connected_at: Optional[float] = None
+        self.last_used = time.monotonic()
+        self.last_error: Optional[str] = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "device_code": self.device_code,
+            "ip": self.ip,
+            "port": self.port,
+            "auto_register": self.auto_register,
+            "login_id": self.login_id,
+            "state": self.state,
+            "created_at": self.created_at,
+            "connected_at": self.connected_at,
+            "idle_seconds": time.monotonic() - self.last_used,
+            "last_error": self.last_error,
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+        }
+
+
+class SessionManager:
+    """Tracks device logins and keeps them usable.
+
+    A session is logged in once and reused. When the SDK reports a lost
+    connection, or a keepalive probe of a session idle for `keepalive_interval`
+    seconds fails, a directly dialled session is logged out and logged in
+    again in the background with exponential backoff until it succeeds or is
+    closed. An auto-register session cannot be dialled: it is marked
+    disconnected, keeping its handle for the SDK's own reconnect, until that
+    reconnect or the device's next connect replaces it.
+
+    Callers get a login_id from `acquire`, which waits up to `reconnect_wait`
+    seconds for a reconnecting session and otherwise raises DeviceOfflineError
+    right away instead of letting an SDK call time out on a dead handle.
+
+    `on_connected` is called with the device code and login_id each time a
+    session becomes usable, `on_lost` with the device code when it stops.
+    """
+
+    def __init__(
+        self,
+        login: Callable[[DeviceSession], int],
+        logout: Callable[[int], None],
+        probe: Callable[[int], bool],
+        on_lost: Optional[Callable[[str], None]] = None,
+        on_connected: Optional[Callable[[str, int], None]] = None,
+        keepalive_interval: float = 30,
+        reconnect_wait: float = 5,
+        backoff_base: float = 1,
+        backoff_max: float = 60,
+        max_sessions: int = 1000,
+    ):
+        self._login = login
+        self._logout = logout
+        self._probe = probe
+        self._on_lost = on_lost
+        self._on_connected = on_connected
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_wait = reconnect_wait
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_sessions = max_sessions
+
+        self._sessions: Dict[str, DeviceSession] = {}
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._keepalive_thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            "logins": 0,
+            "login_failures": 0,
+            "disconnects": 0,
+            "reconnects": 0,
+            "keepalive_failures": 0,
+            "waits": 0,
+            "rejected": 0,
+        }
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive_loop, name="netsdk-keepalive", daemon=True
+        )
+        self._keepalive_thread.start()
+
+    def stop(self) -> None:
+        """Stop keepalive and reconnects and log out of every device."""
+        self._stopped.set()
+        with self._lock:
+            device_codes = list(self._sessions)
+            self._changed.notify_all()
+        for device_code in device_codes:
+            self.close(device_code)
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.join(timeout=5)
+            self._keepalive_thread = None
+
+    def open(
+        self,
+        device_code: str,
+        ip: str,
+        port: int,
+        username: str,
+        password: str,
+        auto_register: bool = False,
+    ) -> int:
+        """Log in to a device, replacing any session it already has."""
+        self.close(device_code)
+
+        session = DeviceSession(
+            device_code, ip, port, username, password, auto_register
+        )
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise Exception(f"Maximum sessions limit reached: {self.max_sessions}")
+            self._sessions[device_code] = session
+
+        try:
+            login_id = self._login(session)
+        except Exception as e:
+            with self._lock:
+                self._stats["login_failures"] += 1
+                session.last_error = str(e)
+                if session.state == SessionState.CONNECTING:
+                    if session.auto_register:
+                        # Retried when the device connects again
+                        session.state = SessionState.DISCONNECTED
+                        self._changed.notify_all()
+                    else:
+                        # The device may still accept a login shortly
+                        session.state = SessionState.RECONNECTING
+                        self._start_reconnect(session)
+            raise
+
+        with self._lock:
+            closed = session.state == SessionState.CLOSED
+            if not closed:
+                self._set_connected(session, login_id)
+                self._stats["logins"] += 1
+        if closed:
+            # Closed while logging in
+            self._logout(login_id)
+            raise DeviceOfflineError("Device not logged in")
+        self._notify_connected(session, login_id)
+        return login_id
+
+    def close(self, device_code: str) -> None:
+        """Log out of a device and stop reconnecting to it."""
+        with self._lock:
+            session = self._sessions.pop(device_code, None)
+            if session is None:
+                return
+            # A disconnected session still holds its handle
+            login_id = (
+                session.login_id
+                if session.state in (SessionState.CONNECTED, SessionState.DISCONNECTED)
+                else 0
+            )
+            session.state = SessionState.CLOSED
+            self._changed.notify_all()
+
+        if login_id > 0:
+            self._logout(login_id)
+            logger.info("Logged out of Dahua device.", device_code=device_code)
+
+    def acquire(self, device_code: str, wait: Optional[float] = None) -> int:
+        """Return the device's login_id, waiting for a reconnect in progress."""
+        wait = self.reconnect_wait if wait is None else wait
+        deadline = time.monotonic() + wait
+        with self._lock:
+            waited = False
+            while True:
+                session = self._sessions.get(device_code)
+                if session is None:
+                    self._stats["rejected"] += 1
+                    raise DeviceOfflineError("Device not logged in")
+                if session.state == SessionState.CONNECTED:
+                    session.last_used = time.monotonic()
+                    return session.login_id
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["rejected"] += 1
+                    raise DeviceOfflineError("Device offline")
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._changed.wait(remaining)
+
+    def get_login_id(self, device_code: str) -> Optional[int]:
+        """The device's login_id if it is connected, without waiting."""
+        with self._lock:
+            session = self._sessions.get(device_code)
+            if session is None or session.state != SessionState.CONNECTED:
+                return None
+            return session.login_id
+
+    def is_connected(self, device_code: str) -> bool:
+        return self.get_login_id(device_code) is not None
+
+    def get(self, device_code: str) -> Optional[DeviceSession]:
+        with self._lock:
+            return self._sessions.get(device_code)
+
+    def on_disconnect(self, login_id: int) -> None:
+        """The SDK lost a login; safe to call from SDK callback threads."""
+        with self._lock:
+            session = self._find_by_login_id(login_id)
+            if session is None or session.state != SessionState.CONNECTED:
+                return
+            self._lose(session, "Disconnected")
+
+    def on_reconnect(self, login_id: int) -> None:
+        """The SDK restored a login on its own."""
+        with self._lock:
+            session = self._find_by_login_id(login_id)
+            if session is None or session.state == SessionState.CLOSED:
+                return
+            session.reconnects += 1
+            self._stats["reconnects"] += 1
+            self._set_connected(session, login_id)
+        self._notify_connected(session, login_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = [session.to_dict() for session in self._sessions.values()]
+        states: Dict[str, int] = {}
+        for session in sessions:
+            states[session["state"]] = states.get(session["state"], 0) + 1
+        return {
+            **self._stats,
+            "sessions": len(sessions),
+            "states": states,
+            "devices": sessions,
+        }
+
+    def _find_by_login_id(self, login_id: int) -> Optional[DeviceSession]:
+        for session in self._sessions.values():
+            if session.login_id == login_id:
+                return session
+        return None
+
+    def _set_connected(self, session: DeviceSession, login_id: int) -> None:
+        session.login_id = login_id
+        session.state = SessionState.CONNECTED
+        session.connected_at = time.time()
+        session.last_used = time.monotonic()
+        session.reconnect_attempts = 0
+        session.last_error = None
+        self._changed.notify_all()
+
+    def _notify_connected(self, session: DeviceSession, login_id: int) -> None:
+        if self._on_connected is None:
+            return
+        try:
+            self._on_connected(session.device_code, login_id)
+        except Exception as e:
+            logger.warning(
+                "Failed to set up connected session",
+                device_code=session.device_code,
+                error=str(e),
+            )
+
+    def _lose(self, session: DeviceSession, reason: str) -> None:
+        """Mark a connected session lost and start logging in again."""
+        session.disconnects += 1
+        session.last_error = reason
+        self._stats["disconnects"] += 1
+        if session.auto_register:
+            # Only the device can reopen the connection; the handle is kept
+            # for the SDK's reconnect, which reports back in on_reconnect
+            session.state = SessionState.DISCONNECTED
+            self._changed.notify_all()
+            logger.warning(
+                "Device session lost, waiting for the device",
+                device_code=session.device_code,
+                login_id=session.login_id,
+                reason=reason,
+            )
+            threading.Thread(
+                target=self._release_lost,
+                args=(session,),
+                name=f"netsdk-release-{session.device_code}",
+                daemon=True,
+            ).start()
+            return
+
+        session.state = SessionState.RECONNECTING
+        logger.warning(
+            "Device session lost, reconnecting",
+            device_code=session.device_code,
+            login_id=session.login_id,
+            reason=reason,
+        )
+        self._start_reconnect(session)
+
+    def _start_reconnect(self, session: DeviceSession) -> None:
+        threading.Thread(
+            target=self._reconnect_loop,
+            args=(session,),
+            name=f"netsdk-reconnect-{session.device_code}",
+            daemon=True,
+        ).start()
+
+    def _release_lost(self, session: DeviceSession) -> None:
+        if self._on_lost is None:
+            return
+        try:
+            self._on_lost(session.device_code)
+        except Exception as e:
+            logger.warning(
+                "Failed to release lost session resources",
+                device_code=session.device_code,
+                error=str(e),
+            )
+
+    def _reconnect_loop(self, session: DeviceSession) -> None:
+        stale_login_id = session.login_id
+        self._release_lost(session)
+        if stale_login_id > 0:
+            # The SDK keeps a lost login's resources until it is logged out
+            self._logout(stale_login_id)
+
+        while not self._stopped.is_set():
+            with self._lock:
+                if session.state != SessionState.RECONNECTING:
+                    return
+                delay = min(
+                    self.backoff_base * 2**session.reconnect_attempts,
+                    self.backoff_max,
+                )
+                session.reconnect_attempts += 1
+            # Jitter spreads out the logins of devices lost at the same time
+            if self._stopped.wait(delay * random.uniform(0.5, 1)):
+                return
+
+            with self._lock:
+                if session.state != SessionState.RECONNECTING:
+                    return
+            try:
+                login_id = self._login(session)
+            except Exception as e:
+                with self._lock:
+                    session.last_error = str(e)
+                    self._stats["login_failures"] += 1
+                logger.info(
+                    "Device reconnect failed",
+                    device_code=session.device_code,
+                    attempt=session.reconnect_attempts,
+                    error=str(e),
+                )
+                continue
+
+            with self._lock:
+                closed = session.state != SessionState.RECONNECTING
+                if not closed:
+                    session.reconnects += 1
+                    self._stats["reconnects"] += 1
+                    self._set_connected(session, login_id)
+            if closed:
+                # Closed while logging in
+                self._logout(login_id)
+                return
+            logger.info(
+                "Device session reconnected",
+                device_code=session.device_code,
+                login_id=login_id,
+            )
+            self._notify_connected(session, login_id)
+            return
+
+    def _keepalive_loop(self) -> None:
+        while not self._stopped.wait(self.keepalive_interval):
+            idle_before = time.monotonic() - self.keepalive_interval
+            with self._lock:
+                idle = [
+                    (session, session.login_id)
+                    for session in self._sessions.values()
+                    if session.state == SessionState.CONNECTED
+                    and session.last_used < idle_before
+                ]
+
+            for session, login_id in idle:
+                try:
+                    alive = self._probe(login_id)
+                except Exception:
+                    alive = False
+                with self._lock:
+                    if (
+                        session.state != SessionState.CONNECTED
+                        or session.login_id != login_id
+                    ):
+                        continue
+                    if alive:
+                        session.last_used = time.monotonic()
+                    else:
+                        self._stats["keepalive_failures"] += 1
+                        self._lose(session, "Keepalive failed")
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.types.dahua_netsdk_types import UserPayload
+
+
+class UserDirectory:
+    """In-memory copy of one device's access cards, by user_id and card_no.
+
+    The directory is filled by a full paginated enumeration of the device and
+    kept current by the service's own writes: added cards are written through,
+    updated and removed users are dropped so the next lookup refetches them.
+    It is considered stale `ttl` seconds after the last full load.
+    """
+
+    def __init__(self, device_code: str, ttl: float):
+        self.device_code = device_code
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_card_no: Dict[str, UserPayload] = {}
+        self._by_user_id: Dict[str, List[UserPayload]] = {}
+        self._loaded_at: Optional[float] = None
+        self._stats = {"loads": 0, "hits": 0, "misses": 0}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, users: Iterable[UserPayload]) -> None:
+        """Replace the directory with a complete enumeration of the device."""
+        by_card_no: Dict[str, UserPayload] = {}
+        by_user_id: Dict[str, List[UserPayload]] = {}
+        for user in users:
+            by_card_no[user.card_no] = user
+            by_user_id.setdefault(user.user_id, []).append(user)
+
+        with self._lock:
+            self._by_card_no = by_card_no
+            self._by_user_id = by_user_id
+            self._loaded_at = time.monotonic()
+            self._stats["loads"] += 1
+
+    def get(self, user_id: str) -> Optional[UserPayload]:
+        with self._lock:
+            cards = self._by_user_id.get(user_id)
+            self._stats["hits" if cards else "misses"] += 1
+            return cards[0] if cards else None
+
+    def get_by_card_no(self, card_no: str) -> Optional[UserPayload]:
+        with self._lock:
+            user = self._by_card_no.get(card_no)
+            self._stats["hits" if user else "misses"] += 1
+            return user
+
+    def list(self) -> List[UserPayload]:
+        with self._lock:
+            return list(self._by_card_no.values())
+
+    def upsert(self, user: UserPayload) -> None:
+        with self._lock:
+            previous = self._by_card_no.get(user.card_no)
+            if previous is not None:
+                self._unlink(previous)
+            self._by_card_no[user.card_no] = user
+            self._by_user_id.setdefault(user.user_id, []).append(user)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            for user in self._by_user_id.pop(user_id, []):
+                self._by_card_no.pop(user.card_no, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_card_no = {}
+            self._by_user_id = {}
+            self._loaded_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "cards": len(self._by_card_no),
+                "users": len(self._by_user_id),
+                "is_loaded": self._loaded_at is not None,
+            }
+
+    def _unlink(self, user: UserPayload) -> None:
+        cards = self._by_user_id.get(user.user_id, [])
+        if user in cards:
+            cards.remove(user)
+        if not cards:
+            self._by_user_id.pop(user.user_id, None)
@@ -0,0 +1,233 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import structlog
+
+from app.repos.device_repo import DeviceRepo
+from app.services.async_dahua_netsdk_service import AsyncDahuaNetSDKService
+from app.services.login_scheduler import LoginScheduler
+from app.types.dahua_netsdk_types import UserPayload
+
+logger = structlog.get_logger(__name__)
+
+
+class UserSyncPlan:
+    """Changes needed to turn a device's card set into the desired one."""
+
+    def __init__(self):
+        self.inserts: List[UserPayload] = []
+        self.updates: List[UserPayload] = []
+        # Device cards to remove, with the rec_no they were read with
+        self.deletes: List[UserPayload] = []
+        self.unchanged = 0
+
+    @classmethod
+    def diff(
+        cls,
+        current: Iterable[UserPayload],
+        desired: Iterable[UserPayload],
+        delete_missing: bool = False,
+    ) -> "UserSyncPlan":
+        """Compare cards by card_no and the card fields the sync writes.
+
+        A card that moved to another user is removed and inserted again, since
+        the insert services key the card on its user.
+        """
+        plan = cls()
+        on_device = {card.card_no: card for card in current}
+        wanted = {user.card_no: user for user in desired}
+
+        for card_no, user in wanted.items():
+            card = on_device.get(card_no)
+            if card is None:
+                plan.inserts.append(user)
+                continue
+
+            if user.sync_hash() == card.sync_hash():
+                plan.unchanged += 1
+            elif card.user_id != user.user_id:
+                plan.deletes.append(card)
+                plan.inserts.append(user)
+            else:
+                plan.updates.append(user)
+
+        if delete_missing:
+            plan.deletes.extend(
+                card for card_no, card in on_device.items() if card_no not in wanted
+            )
+        return plan
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.inserts or self.updates or self.deletes)
+
+
+class UserSyncReport:
+    def __init__(self, device_code: str, dry_run: bool = False):
+        self.device_code = device_code
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.failures: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None and not self.failures
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**vars(self), "success": self.success}
+
+
+class UserSyncService:
+    """Reconciles the cards stored on devices with a desired set of users.
+
+    The device's cards are enumerated page by page into its user directory,
+    compared with the desired users by per-card hash, and only the difference
+    is written: removals per record, inserts and updates through the batched
+    insert services. Devices of a fleet sync concurrently, at most
+    `max_concurrency` at a time.
+    """
+
+    def __init__(
+        self,
+        async_dahua_netsdk_service: AsyncDahuaNetSDKService,
+        device_repo: DeviceRepo,
+        login_scheduler: LoginScheduler,
+        max_concurrency: int = 8,
+    ):
+        self.async_dahua_netsdk_service = async_dahua_netsdk_service
+        self.device_repo = device_repo
+        self.login_scheduler = login_scheduler
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def plan(
+        self,
+        device_code: str,
+        desired: List[UserPayload],
+        delete_missing: bool = False,
+    ) -> UserSyncPlan:
+        """Read the device's full card set and diff it with `desired`."""
+        await self.async_dahua_netsdk_service.refresh_user_directory(device_code)
+        current = self.async_dahua_netsdk_service.sdk_service.user_directory(
+            device_code
+        ).list()
+        return UserSyncPlan.diff(current, desired, delete_missing)
+
+    async def sync_device(
+        self,
+        device_code: str,
+        desired: List[UserPayload],
+        delete_missing: bool = False,
+        dry_run: bool = False,
+    ) -> UserSyncReport:
+        """Apply the changes that make the device hold exactly `desired`."""
+        report = UserSyncReport(device_code, dry_run)
+        if not await self.login_scheduler.wait_online(device_code):
+            report.error = "Device is offline"
+            return report
+
+        started_at = time.monotonic()
+        async with self._semaphore:
+            try:
+                plan = await self.plan(device_code, desired, delete_missing)
+                report.unchanged = plan.unchanged
+                if dry_run:
+                    report.inserted = len(plan.inserts)
+                    report.updated = len(plan.updates)
+                    report.deleted = len(plan.deletes)
+                elif not plan.is_empty:
+                    await self._apply(device_code, plan, report)
+            except Exception as e:
+                report.error = str(e)
+                logger.warning(
+                    "User sync failed", device_code=device_code, error=str(e)
+                )
+            finally:
+                report.duration = time.monotonic() - started_at
+
+        logger.info(
+            "User sync finished",
+            device_code=device_code,
+            dry_run=dry_run,
+            inserted=report.inserted,
+            updated=report.updated,
+            deleted=report.deleted,
+            unchanged=report.unchanged,
+            failed=len(report.failures),
+        )
+        return report
+
+    async def sync_devices(
+        self,
+        desired: List[UserPayload],
+        company_code: Optional[str] = None,
+        device_codes: Optional[List[str]] = None,
+        delete_missing: bool = False,
+        dry_run: bool = False,
+    ) -> List[UserSyncReport]:
+        """Sync the same desired users to many devices concurrently."""
+        targets = list(device_codes or [])
+        if company_code:
+            devices = await self.device_repo.get_devices_by_company_code(company_code)
+            targets.extend(device.code for device in devices)
+
+        # Each device gets its own copies: add_users records them as written
+        return list(
+            await asyncio.gather(
+                *(
+                    self.sync_device(
+                        device_code,
+                        [UserPayload(**vars(user)) for user in desired],
+                        delete_missing,
+                        dry_run,
+                    )
+                    for device_code in dict.fromkeys(targets)
+                )
+            )
+        )
+
+    async def _apply(
+        self, device_code: str, plan: UserSyncPlan, report: UserSyncReport
+    ) -> None:
+        # Removals first, so moved cards and their user_ids are free again
+        if plan.deletes:
+            errors = await self.async_dahua_netsdk_service.remove_cards(
+                device_code, [card.rec_no or 0 for card in plan.deletes]
+            )
+            for card, error in zip(plan.deletes, errors):
+                if error is None:
+                    report.deleted += 1
+                else:
+                    report.failures.append(
+                        {
+                            "action": "delete",
+                            "user_id": card.user_id,
+                            "card_no": card.card_no,
+                            "error": error,
+                        }
+                    )
+
+        # The insert services overwrite existing users and cards
+        writes = plan.inserts + plan.updates
+        if writes:
+            results = await self.async_dahua_netsdk_service.add_users(
+                device_code, writes
+            )
+            for index, result in enumerate(results):
+                is_insert = index < len(plan.inserts)
+                if not result.success:
+                    report.failures.append(
+                        {
+                            "action": "insert" if is_insert else "update",
+                            **result.to_dict(),
+                        }
+                    )
+                elif is_insert:
+                    report.inserted += 1
+                else:
+                    report.updated += 1
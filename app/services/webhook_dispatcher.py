@@ -0,0 +1,223 @@
+import asyncio
+import importlib.util
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+Headers = Dict[str, str]
+
+
+class _Destination:
+    """Delivery state of one webhook URL, method and header set."""
+
+    def __init__(
+        self,
+        url: str,
+        method: str,
+        headers: Optional[Headers],
+        timeout: float,
+        concurrency: int,
+    ):
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Payloads waiting for the next batch, with the futures of their senders
+        self.pending: List[Tuple[Dict[str, Any], asyncio.Future[bool]]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.stats = {"requests": 0, "events": 0, "failed": 0}
+
+
+class WebhookDispatcher:
+    """Delivers webhook payloads over one pooled, keep-alive HTTP client.
+
+    Requests to a destination run at most `per_destination_concurrency` at a
+    time. With `batch_size` above 1, payloads for a destination are collected
+    and posted as a JSON array once `batch_size` are waiting or the oldest has
+    waited `batch_linger` seconds. `http2` needs the optional h2 package and
+    falls back to HTTP/1.1 without it.
+    """
+
+    def __init__(
+        self,
+        default_url: str,
+        http2: bool = False,
+        max_connections: int = 100,
+        per_destination_concurrency: int = 8,
+        batch_size: int = 1,
+        batch_linger: float = 0.05,
+        timeout: float = 10,
+    ):
+        self.default_url = default_url
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.per_destination_concurrency = per_destination_concurrency
+        self.batch_size = max(batch_size, 1)
+        self.batch_linger = batch_linger
+        self.timeout = timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._destinations: Dict[Tuple[Any, ...], _Destination] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def init(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            self.http2 = False
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        logger.info(
+            "Webhook dispatcher initialized",
+            http2=self.http2,
+            batch_size=self.batch_size,
+            batch_linger=self.batch_linger,
+        )
+
+    async def shutdown(self) -> None:
+        for destination in self._destinations.values():
+            self._flush(destination)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send(
+        self,
+        payload: Dict[str, Any],
+        url: Optional[str] = None,
+        method: str = "POST",
+        headers: Optional[Headers] = None,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Deliver one payload; True once the destination accepted it.
+
+        May be awaited from any thread's event loop. Payloads are batched
+        only with others for the same URL, method and headers.
+        """
+        if self._loop is None:
+            raise Exception("Webhook dispatcher is not initialized.")
+        send = self._send(
+            payload,
+            url or self.default_url,
+            method.upper(),
+            headers or None,
+            self.timeout if timeout is None else timeout,
+        )
+        if asyncio.get_running_loop() is self._loop:
+            return await send
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(send, self._loop)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "batch_size": self.batch_size,
+            "destinations": [
+                {
+                    "url": destination.url,
+                    "method": destination.method,
+                    **destination.stats,
+                    "pending": len(destination.pending),
+                }
+                for destination in self._destinations.values()
+            ],
+        }
+
+    async def _send(
+        self,
+        payload: Dict[str, Any],
+        url: str,
+        method: str,
+        headers: Optional[Headers],
+        timeout: float,
+    ) -> bool:
+        key = (url, method, tuple(sorted(headers.items())) if headers else None)
+        destination = self._destinations.get(key)
+        if destination is None:
+            destination = _Destination(
+                url, method, headers, timeout, self.per_destination_concurrency
+            )
+            self._destinations[key] = destination
+        destination.timeout = timeout
+
+        if self.batch_size == 1:
+            return await self._post(destination, payload, 1)
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        destination.pending.append((payload, future))
+        if len(destination.pending) >= self.batch_size:
+            self._flush(destination)
+        elif destination.flush_handle is None:
+            destination.flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_linger, self._flush, destination
+            )
+        return await future
+
+    def _flush(self, destination: _Destination) -> None:
+        if destination.flush_handle is not None:
+            destination.flush_handle.cancel()
+            destination.flush_handle = None
+        if not destination.pending:
+            return
+        batch, destination.pending = destination.pending, []
+        task = asyncio.create_task(self._post_batch(destination, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _post_batch(
+        self,
+        destination: _Destination,
+        batch: List[Tuple[Dict[str, Any], asyncio.Future[bool]]],
+    ) -> None:
+        delivered = await self._post(
+            destination, [payload for payload, _ in batch], len(batch)
+        )
+        for _, future in batch:
+            if not future.done():
+                future.set_result(delivered)
+
+    async def _post(self, destination: _Destination, body: Any, events: int) -> bool:
+        assert self._client is not None
+        async with destination.semaphore:
+            destination.stats["requests"] += 1
+            destination.stats["events"] += events
+            try:
+                response = await self._client.request(
+                    destination.method,
+                    destination.url,
+                    json=body,
+                    headers=destination.headers,
+                    timeout=destination.timeout,
+                )
+            except httpx.HTTPError as e:
+                destination.stats["failed"] += 1
+                logger.error(
+                    "Failed to send webhook", url=destination.url, error=str(e)
+                )
+                return False
+
+        if not response.is_success:
+            destination.stats["failed"] += 1
+            logger.error(
+                "Webhook rejected",
+                url=destination.url,
+                status=response.status_code,
+                events=events,
+            )
+            return False
+        return True
@@ -0,0 +1,343 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.models.webhook import Webhook
+from app.repos.webhook_repo import WebhookRepo
+from app.services.webhook_dispatcher import WebhookDispatcher
+
+logger = structlog.get_logger(__name__)
+
+ACCESS_CARD_EVENT = "access_card"
+
+# event_types entry matching every event; an empty list matches every event too
+ANY_EVENT = "*"
+
+
+class WebhookRoute:
+    """Where and how events are delivered to one webhook."""
+
+    def __init__(
+        self,
+        webhook_id: str,
+        name: str,
+        url: str,
+        method: str = "POST",
+        headers: Optional[Dict[str, str]] = None,
+        event_types: Optional[List[str]] = None,
+        max_retries: int = 3,
+        retry_delay: float = 5,
+        timeout: float = 30,
+    ):
+        self.webhook_id = webhook_id
+        self.name = name
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.event_types = event_types or []
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    @classmethod
+    def from_model(cls, webhook: Webhook) -> "WebhookRoute":
+        return cls(
+            webhook_id=webhook.id,  # type: ignore
+            name=webhook.name,  # type: ignore
+            url=webhook.url,  # type: ignore
+            method=webhook.method or "POST",  # type: ignore
+            headers=webhook.headers,  # type: ignore
+            event_types=webhook.event_types,  # type: ignore
+            max_retries=webhook.max_retries,  # type: ignore
+            retry_delay=webhook.retry_delay,  # type: ignore
+            timeout=webhook.timeout,  # type: ignore
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "webhook_id": self.webhook_id,
+            "name": self.name,
+            "url": self.url,
+            "method": self.method,
+            "event_types": self.event_types,
+            "max_retries": self.max_retries,
+            "retry_delay": self.retry_delay,
+            "timeout": self.timeout,
+        }
+
+
+# Event type, payload, and the future of a caller waiting for the outcome
+_Delivery = Tuple[str, Dict[str, Any], Optional["asyncio.Future[bool]"]]
+
+
+class _RouteQueue:
+    """Delivery queue and workers of one route."""
+
+    def __init__(self, route: WebhookRoute, max_queue_size: int):
+        self.route = route
+        self.queue: asyncio.Queue[_Delivery] = asyncio.Queue(maxsize=max_queue_size)
+        self.tasks: List[asyncio.Task[None]] = []
+        self.stats = {"delivered": 0, "retried": 0, "failed": 0, "dropped": 0}
+
+
+class WebhookRouter:
+    """Routes events to the active webhooks subscribed to their type.
+
+    Active rows of the webhooks table are loaded into a routing table keyed
+    by event type and reloaded whenever the table changes (checked every
+    `refresh_interval` seconds, or on `refresh`). Without active webhooks,
+    events go to `default_url`.
+
+    Each route has its own bounded queue and `concurrency` delivery tasks
+    that retry with the route's `max_retries`, `retry_delay` and `timeout`,
+    so a slow or failing destination only backs up its own queue. Events
+    for a full queue are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        webhook_dispatcher: WebhookDispatcher,
+        webhook_repo: WebhookRepo,
+        default_url: Optional[str] = None,
+        default_timeout: float = 10,
+        concurrency: int = 8,
+        max_queue_size: int = 1000,
+        refresh_interval: float = 30,
+    ):
+        self.webhook_dispatcher = webhook_dispatcher
+        self.webhook_repo = webhook_repo
+        self.default_url = default_url
+        self.default_timeout = default_timeout
+        self.concurrency = concurrency
+        self.max_queue_size = max_queue_size
+        self.refresh_interval = refresh_interval
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._routes: Dict[str, _RouteQueue] = {}
+        # Routes per event type; types no route names fall back to _catch_all
+        self._table: Dict[str, List[_RouteQueue]] = {}
+        self._catch_all: List[_RouteQueue] = []
+        self._version: Optional[Tuple[Any, ...]] = None
+        self._refresh_task: Optional[asyncio.Task[None]] = None
+        self._retiring: set[asyncio.Task[None]] = set()
+        self._unrouted = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.refresh()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+        routes = list(self._routes.values())
+        self._routes, self._table, self._catch_all = {}, {}, []
+        await asyncio.gather(
+            *(self._drain(route_queue, timeout) for route_queue in routes),
+            *self._retiring,
+            return_exceptions=True,
+        )
+
+    async def publish(self, event_type: str, payload: Dict[str, Any]) -> int:
+        """Queue an event for every route subscribed to its type.
+
+        Returns the number of routes it was queued for. May be awaited from
+        any thread's event loop; delivery happens in the background.
+        """
+        if self._loop is None:
+            raise Exception("Webhook router is not started.")
+        if asyncio.get_running_loop() is self._loop:
+            return self._publish(event_type, payload)
+
+        async def publish() -> int:
+            return self._publish(event_type, payload)
+
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(publish(), self._loop)
+        )
+
+    async def deliver(self, event_type: str, payload: Dict[str, Any]) -> bool:
+        """Deliver an event to every route subscribed to its type and wait.
+
+        True when every route accepted it, or no route wants it. Waits for
+        room in full queues instead of dropping. Must be awaited on the loop
+        the router was started on.
+        """
+        route_queues = self._table.get(event_type, self._catch_all)
+        if not route_queues:
+            self._unrouted += 1
+            return True
+
+        loop = asyncio.get_running_loop()
+        futures: List[asyncio.Future[bool]] = []
+        for route_queue in route_queues:
+            future = loop.create_future()
+            await route_queue.queue.put((event_type, payload, future))
+            futures.append(future)
+        return all(await asyncio.gather(*futures))
+
+    async def refresh(self) -> None:
+        """Reload the routing table from the webhooks table."""
+        version = await self.webhook_repo.get_version()
+        webhooks = await self.webhook_repo.get_active_webhooks()
+
+        routes = [WebhookRoute.from_model(webhook) for webhook in webhooks]
+        if not routes and self.default_url:
+            routes = [
+                WebhookRoute(
+                    webhook_id="default",
+                    name="default",
+                    url=self.default_url,
+                    timeout=self.default_timeout,
+                )
+            ]
+
+        current = {route.webhook_id: route for route in routes}
+        for webhook_id in list(self._routes):
+            if webhook_id not in current:
+                self._retire(self._routes.pop(webhook_id))
+        for webhook_id, route in current.items():
+            route_queue = self._routes.get(webhook_id)
+            if route_queue is None:
+                self._routes[webhook_id] = self._open(route)
+            else:
+                # Queued events are delivered with the new settings
+                route_queue.route = route
+
+        self._table = {}
+        self._catch_all = []
+        for route_queue in self._routes.values():
+            event_types = route_queue.route.event_types
+            if not event_types or ANY_EVENT in event_types:
+                self._catch_all.append(route_queue)
+                continue
+            for event_type in event_types:
+                self._table.setdefault(event_type, []).append(route_queue)
+        for route_queues in self._table.values():
+            route_queues.extend(self._catch_all)
+
+        self._version = version
+        logger.info(
+            "Webhook routes loaded",
+            routes=len(self._routes),
+            event_types=sorted(self._table),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "unrouted": self._unrouted,
+            "retiring": len(self._retiring),
+            "routes": [
+                {
+                    **route_queue.route.to_dict(),
+                    **route_queue.stats,
+                    "queued": route_queue.queue.qsize(),
+                }
+                for route_queue in self._routes.values()
+            ],
+        }
+
+    def _publish(self, event_type: str, payload: Dict[str, Any]) -> int:
+        route_queues = self._table.get(event_type, self._catch_all)
+        if not route_queues:
+            self._unrouted += 1
+            return 0
+
+        queued = 0
+        for route_queue in route_queues:
+            try:
+                route_queue.queue.put_nowait((event_type, payload, None))
+                queued += 1
+            except asyncio.QueueFull:
+                route_queue.stats["dropped"] += 1
+                logger.warning(
+                    "Webhook queue full, dropping event",
+                    webhook=route_queue.route.name,
+                    event_type=event_type,
+                )
+        return queued
+
+    def _open(self, route: WebhookRoute) -> _RouteQueue:
+        route_queue = _RouteQueue(route, self.max_queue_size)
+        route_queue.tasks = [
+            asyncio.create_task(self._deliver_loop(route_queue))
+            for _ in range(self.concurrency)
+        ]
+        return route_queue
+
+    def _retire(self, route_queue: _RouteQueue) -> None:
+        task = asyncio.create_task(self._drain(route_queue, self.refresh_interval))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def _drain(self, route_queue: _RouteQueue, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(route_queue.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Webhook events undelivered at route removal",
+                webhook=route_queue.route.name,
+                queued=route_queue.queue.qsize(),
+            )
+        for task in route_queue.tasks:
+            task.cancel()
+        await asyncio.gather(*route_queue.tasks, return_exceptions=True)
+        while not route_queue.queue.empty():
+            _, _, future = route_queue.queue.get_nowait()
+            if future is not None and not future.done():
+                future.set_result(False)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if await self.webhook_repo.get_version() != self._version:
+                    await self.refresh()
+            except Exception as e:
+                logger.warning("Failed to refresh webhook routes", error=str(e))
+
+    async def _deliver_loop(self, route_queue: _RouteQueue) -> None:
+        while True:
+            event_type, payload, future = await route_queue.queue.get()
+            delivered = False
+            try:
+                delivered = await self._deliver(route_queue, event_type, payload)
+            finally:
+                route_queue.queue.task_done()
+                if future is not None and not future.done():
+                    future.set_result(delivered)
+
+    async def _deliver(
+        self, route_queue: _RouteQueue, event_type: str, payload: Dict[str, Any]
+    ) -> bool:
+        attempt = 0
+        while True:
+            route = route_queue.route
+            try:
+                delivered = await self.webhook_dispatcher.send(
+                    payload, route.url, route.method, route.headers, route.timeout
+                )
+            except Exception as e:
+                logger.error("Failed to send webhook", url=route.url, error=str(e))
+                delivered = False
+
+            if delivered:
+                route_queue.stats["delivered"] += 1
+                return True
+            if attempt >= route.max_retries:
+                route_queue.stats["failed"] += 1
+                logger.error(
+                    "Giving up on webhook event",
+                    webhook=route.name,
+                    event_type=event_type,
+                    attempts=attempt + 1,
+                )
+                return False
+
+            attempt += 1
+            route_queue.stats["retried"] += 1
+            await asyncio.sleep(route.retry_delay)
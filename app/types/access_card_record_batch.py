@@ -0,0 +1,252 @@
+import datetime
+from ctypes import Array, Structure, sizeof
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union, overload
+
+import numpy as np
+from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARDREC  # type: ignore
+
+from app.types.dahua_netsdk_types import AccessCardRecord
+
+# AccessCardRecord attribute -> NET_RECORDSET_ACCESS_CTL_CARDREC field
+STRING_FIELDS = {
+    "card_no": "szCardNo",
+    "card_name": "szCardName",
+    "user_id": "szUserID",
+    "reader_id": "szReaderID",
+    "snap_ftp_url": "szSnapFtpUrl",
+}
+NUMBER_FIELDS = {
+    "rec_no": "nRecNo",
+    "card_type": "emCardType",
+    "door": "nDoor",
+    "b_status": "bStatus",
+    "error_code": "nErrorCode",
+    "method": "nMethod",
+    "em_direction": "emDirection",
+    "is_over_temparature": "bIsOverTemparature",
+    "temperature_unit": "emTemperatureUnit",
+    "current_temperature": "fCurrentTemperature",
+    "em_mask": "emMask",
+}
+TIME_FIELD = "stuTime"
+# AccessCardRecord.__init__ positional order, used when materialising rows
+RECORD_ARGS = (
+    "card_no",
+    "rec_no",
+    "card_name",
+    "card_type",
+    "user_id",
+    "reader_id",
+    "door",
+    "b_status",
+    "error_code",
+    "stu_time",
+    "method",
+    "snap_ftp_url",
+    "em_direction",
+    "is_over_temparature",
+    "temperature_unit",
+    "current_temperature",
+    "em_mask",
+)
+NET_TIME_PARTS = ("dwYear", "dwMonth", "dwDay", "dwHour", "dwMinute", "dwSecond")
+
+
+def _field_dtype(ctype: Any) -> np.dtype:
+    """NumPy dtype for a ctypes field type (char arrays become fixed bytes)."""
+    if issubclass(ctype, Array) and ctype._type_.__name__ == "c_char":
+        return np.dtype(f"S{ctype._length_}")
+    if issubclass(ctype, Structure):
+        return _struct_dtype(ctype, [name for name, _ in ctype._fields_])
+    return np.dtype(ctype)
+
+
+def _struct_dtype(struct_type: Any, field_names: Sequence[str]) -> np.dtype:
+    """Structured dtype viewing `field_names` of a ctypes Structure in place.
+
+    Offsets and itemsize come from the ctypes layout, so the dtype can be laid
+    over a ctypes array without copying and without describing the fields we
+    don't read.
+    """
+    field_types = dict(struct_type._fields_)
+    names, formats, offsets = [], [], []
+    for name in field_names:
+        if name not in field_types:
+            continue
+        names.append(name)
+        formats.append(_field_dtype(field_types[name]))
+        offsets.append(getattr(struct_type, name).offset)
+
+    return np.dtype(
+        {
+            "names": names,
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": sizeof(struct_type),
+        }
+    )
+
+
+CARD_REC_DTYPE = _struct_dtype(
+    NET_RECORDSET_ACCESS_CTL_CARDREC,
+    [*STRING_FIELDS.values(), *NUMBER_FIELDS.values(), TIME_FIELD],
+)
+
+
+def _decode_strings(raw: np.ndarray) -> np.ndarray:
+    """Decode a fixed-width bytes column up to the first NUL of each value."""
+    width = raw.dtype.itemsize
+    chars = np.ascontiguousarray(raw).view(np.uint8).reshape(len(raw), width)
+    # Like ctypes, stop at the first NUL; the S dtype then drops the padding.
+    # Only rows with bytes left over after a NUL need clearing.
+    nul = chars == 0
+    dirty = nul.any(axis=1) & (nul.sum(axis=1) < width - np.argmax(nul, axis=1))
+    if dirty.any():
+        rows = chars[dirty]
+        rows[np.logical_or.accumulate(rows == 0, axis=1)] = 0
+        chars[dirty] = rows
+    values = chars.view(f"S{width}").ravel()
+    # Cast to the longest value rather than the field width
+    unicode = f"U{max(int(np.strings.str_len(values).max(initial=0)), 1)}"
+
+    # ASCII rows are cast in C; only the others go through bytes.decode
+    non_ascii = (chars >= 0x80).any(axis=1)
+    if not non_ascii.any():
+        return values.astype(unicode)
+    decoded = np.empty(len(values), dtype=unicode)
+    decoded[~non_ascii] = values[~non_ascii].astype(unicode)
+    decoded[non_ascii] = np.char.decode(values[non_ascii], "utf-8", errors="ignore")
+    return decoded
+
+
+def _net_times_to_epoch(times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised `net_time_to_datetime`: epoch seconds plus a validity mask.
+
+    A row is invalid where the NET_TIME fields don't form a real date/time,
+    i.e. where `datetime(...)` would raise.
+    """
+    year, month, day, hour, minute, second = (
+        times[part].astype(np.int64) for part in NET_TIME_PARTS
+    )
+    valid = (
+        (year >= datetime.MINYEAR)
+        & (year <= datetime.MAXYEAR)
+        & (month >= 1)
+        & (month <= 12)
+        & (day >= 1)
+        & (hour < 24)
+        & (minute < 60)
+        & (second < 60)
+    )
+    months = (np.where(valid, year, 1970) - 1970) * 12 + np.where(valid, month, 1) - 1
+    month_start = months.astype("datetime64[M]")
+    days = month_start.astype("datetime64[D]") + (np.where(valid, day, 1) - 1)
+    # Day 31 of a 30-day month rolls into the next month
+    valid &= days.astype("datetime64[M]") == month_start
+
+    epoch = days.astype("datetime64[s]").astype(np.int64)
+    epoch += hour * 3600 + minute * 60 + second
+    return np.where(valid, epoch, 0), valid
+
+
+class AccessCardRecordBatch(Sequence[AccessCardRecord]):
+    """Columnar page of access-card records decoded in bulk from ctypes.
+
+    The batch copies the used part of a FindNextRecord buffer through a
+    NumPy structured view, decodes the string and NET_TIME columns once for the
+    whole page, and only builds AccessCardRecord objects when indexed or
+    iterated.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def from_net_recordset_array(
+        cls, records: Array, count: int
+    ) -> "AccessCardRecordBatch":
+        """Decode the first `count` records of a FindNextRecord result array."""
+        view = np.frombuffer(records, dtype=CARD_REC_DTYPE, count=count)
+
+        # Every column is a copy, so the ctypes buffer can go back to its pool
+        columns: Dict[str, np.ndarray] = {}
+        for attr, field in STRING_FIELDS.items():
+            if field in view.dtype.names:
+                columns[attr] = _decode_strings(view[field])
+            else:
+                columns[attr] = np.full(count, "", dtype="U1")
+
+        for attr, field in NUMBER_FIELDS.items():
+            if field in view.dtype.names:
+                columns[attr] = view[field].copy()
+            else:
+                columns[attr] = np.zeros(count, dtype=np.int32)
+        columns["is_over_temparature"] = columns["is_over_temparature"].astype(bool)
+
+        columns["net_time"] = view[TIME_FIELD].copy()
+        columns["timestamp"], columns["time_valid"] = _net_times_to_epoch(
+            columns["net_time"]
+        )
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["rec_no"])
+
+    @overload
+    def __getitem__(self, index: int) -> AccessCardRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "AccessCardRecordBatch": ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[AccessCardRecord, "AccessCardRecordBatch"]:
+        if isinstance(index, slice):
+            return self.filter(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("AccessCardRecordBatch index out of range")
+        return self.filter(np.array([index])).to_records()[0]
+
+    def __iter__(self) -> Iterator[AccessCardRecord]:
+        return iter(self.to_records())
+
+    def to_records(self) -> List[AccessCardRecord]:
+        """Materialise every row as an AccessCardRecord."""
+        stu_times = [
+            self._stu_time(index, timestamp, valid)
+            for index, (timestamp, valid) in enumerate(
+                zip(
+                    self.columns["timestamp"].tolist(),
+                    self.columns["time_valid"].tolist(),
+                )
+            )
+        ]
+        columns = [
+            stu_times if name == "stu_time" else self.columns[name].tolist()
+            for name in RECORD_ARGS
+        ]
+        return [AccessCardRecord(*row) for row in zip(*columns)]
+
+    def filter(self, mask: np.ndarray) -> "AccessCardRecordBatch":
+        """Rows selected by a boolean mask or index array, as a new batch."""
+        return AccessCardRecordBatch(
+            {name: column[mask] for name, column in self.columns.items()}
+        )
+
+    def from_rec_no(self, rec_no: Optional[int]) -> "AccessCardRecordBatch":
+        """Rows with rec_no >= `rec_no` (all rows when `rec_no` is None)."""
+        if rec_no is None:
+            return self
+        return self.filter(self.columns["rec_no"] >= rec_no)
+
+    def _stu_time(self, index: int, timestamp: int, valid: bool) -> datetime.datetime:
+        if valid:
+            return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+        # Raise the same ValueError the per-record decoder would
+        net_time = self.columns["net_time"][index]
+        return datetime.datetime(
+            *(int(net_time[part]) for part in NET_TIME_PARTS),
+            tzinfo=datetime.timezone.utc,
+        )
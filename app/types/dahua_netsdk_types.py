@@ -1,10 +1,16 @@
+import hashlib
+import json
 from datetime import datetime
 from typing import Any, Optional
 
 from NetSDK.SDK_Enum import EM_AUTOREGISTER_TYPE  # type: ignore
+from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARD  # type: ignore
 from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARDREC  # type: ignore
 
-from app.utils.dahua_converter import net_time_to_datetime  # type: ignore
+from app.utils.dahua_converter import (  # type: ignore
+    net_time_to_datetime,
+    net_time_to_timestamp,
+)
 
 
 class DeviceAutoRegisterEvent:
@@ -30,6 +36,8 @@ class UserPayload:
         user_name: Optional[str] = None,
         password: Optional[str] = None,
         first_enter: bool = False,
+        rec_no: Optional[int] = None,
+        card_type: int = 0,
     ):
         self.user_id = user_id
         self.card_name = card_name
@@ -41,6 +49,98 @@ class UserPayload:
         self.password = password
         self.first_enter = first_enter
         self.citizen_id_no = citizen_id_no
+        self.rec_no = rec_no
+        self.card_type = card_type
+
+    def sync_hash(self) -> str:
+        """Stable hash of the card fields the batch insert writes.
+
+        Name, password and validity go to the user record and are not read
+        back with the card, so they are left out; otherwise every card would
+        differ from its payload on every sync.
+        """
+        fields = [self.user_id, self.card_no, self.card_type]
+        return hashlib.sha1(json.dumps(fields).encode()).hexdigest()
+
+    @staticmethod
+    def from_net_recordset(record: NET_RECORDSET_ACCESS_CTL_CARD) -> "UserPayload":
+        """
+        Initialize UserPayload from a NET_RECORDSET_ACCESS_CTL_CARD card record.
+        """
+        return UserPayload(
+            card_name=record.szCardName.decode("utf-8", errors="ignore").rstrip("\x00"),
+            card_no=record.szCardNo.decode("utf-8", errors="ignore").rstrip("\x00"),
+            user_id=record.szUserID.decode("utf-8", errors="ignore").rstrip("\x00"),
+            sz_pw=(
+                record.szPsw.decode("utf-8", errors="ignore").rstrip("\x00")
+                if record.szPsw
+                else None
+            ),
+            valid_start_time=(
+                net_time_to_timestamp(record.stuValidStartTime)
+                if hasattr(record, "stuValidStartTime")
+                else None
+            ),
+            valid_end_time=(
+                net_time_to_timestamp(record.stuValidEndTime)
+                if hasattr(record, "stuValidEndTime")
+                else None
+            ),
+            first_enter=bool(record.bFirstEnter),
+            citizen_id_no=(
+                record.szCitizenIDNo.decode("utf-8", errors="ignore").rstrip("\x00")
+                if record.szCitizenIDNo
+                else None
+            ),
+            rec_no=getattr(record, "nRecNo", None),
+            card_type=getattr(record, "emType", 0),
+        )
+
+
+class UserBatchResult:
+    """Outcome of one user in a batch insert; `fail_code` is a NET_EM_FAILCODE."""
+
+    def __init__(
+        self,
+        user_id: str,
+        card_no: str,
+        fail_code: int = 0,
+        error: Optional[str] = None,
+    ):
+        self.user_id = user_id
+        self.card_no = card_no
+        self.fail_code = fail_code
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.fail_code == 0 and self.error is None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**vars(self), "success": self.success}
+
+
+class FaceBatchResult:
+    """Outcome of one face in a batch enrollment; `fail_code` is a NET_EM_FAILCODE."""
+
+    def __init__(
+        self,
+        user_id: str,
+        face_image_url: Optional[str] = None,
+        fail_code: int = 0,
+        error: Optional[str] = None,
+    ):
+        self.user_id = user_id
+        self.face_image_url = face_image_url
+        self.fail_code = fail_code
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.fail_code == 0 and self.error is None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**vars(self), "success": self.success}
 
 
 class AccessCardRecord:
@@ -100,6 +200,10 @@ class AccessCardRecord:
             "UserID": self.user_id,
         }
 
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready representation, matching the REST response shape."""
+        return {**vars(self), "stu_time": self.stu_time.isoformat()}
+
     def image_name(self):
         return f"{self.card_no}_{self.rec_no}.jpg"
 
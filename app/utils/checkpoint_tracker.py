@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class CheckpointTracker:
+    """Low-watermark over records that finish out of order.
+
+    Records are started in the order they were read from the device and may
+    complete in any order. The checkpoint only moves past a record once it
+    and every record started before it have completed, so resuming from the
+    checkpoint after a crash never skips an unfinished record.
+
+    `clear` starts a new generation. Records are started and completed with
+    the generation they were read in, and those of older generations are
+    ignored, so records read before a rec_no restart never move the new
+    checkpoint.
+    """
+
+    def __init__(self) -> None:
+        # rec_no -> (rec_time, completed), in start order
+        self._records: "OrderedDict[int, Tuple[int, bool]]" = OrderedDict()
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def start(self, rec_no: int, rec_time: int, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._records[rec_no] = (rec_time, False)
+
+    def complete(self, rec_no: int, generation: int) -> Optional[Tuple[int, int]]:
+        """Mark a record completed.
+
+        Returns the new checkpoint (rec_no, rec_time) when it moved, else None.
+        Records of older generations are ignored.
+        """
+        if generation != self.generation:
+            return None
+        record = self._records.get(rec_no)
+        if record is None:
+            return None
+        self._records[rec_no] = (record[0], True)
+
+        checkpoint = None
+        while self._records:
+            first_rec_no, (first_rec_time, completed) = next(
+                iter(self._records.items())
+            )
+            if not completed:
+                break
+            self._records.popitem(last=False)
+            checkpoint = (first_rec_no, first_rec_time)
+        return checkpoint
+
+    def clear(self) -> None:
+        """Forget started records, e.g. when the device's numbering restarts."""
+        self._records.clear()
+        self.generation += 1
@@ -0,0 +1,117 @@
+import io
+import threading
+from contextlib import contextmanager
+from ctypes import Array, c_char, create_string_buffer
+from typing import Dict, Iterator, List, Union
+
+
+class FileBufferPool:
+    """Pool of reusable ctypes byte buffers for file downloads.
+
+    Buffers start at `size` bytes and are never cleared: callers read only the
+    length the SDK reports. A request for more than `size` gets a buffer of
+    the requested size (rounded up to a power of two) that goes back to the
+    pool, so the pool only grows after an oversized file and keeps at most
+    `max_idle` buffers between calls.
+    """
+
+    def __init__(self, size: int = 1024 * 1024, max_idle: int = 4):
+        self.size = size
+        self.max_idle = max_idle
+        self._idle: List[Array[c_char]] = []
+        self._lock = threading.Lock()
+        self._stats = {"allocated": 0, "reused": 0, "grown": 0}
+
+    @contextmanager
+    def lease(self, min_size: int = 0) -> Iterator[Array[c_char]]:
+        """Lease a buffer of at least `min_size` bytes (default `size`)."""
+        min_size = max(min_size, self.size)
+        with self._lock:
+            # The largest idle buffer, so a grown one serves later large files
+            buffer = max(self._idle, key=len, default=None)
+            if buffer is not None and len(buffer) < min_size:
+                buffer = None
+            if buffer is not None:
+                self._idle.remove(buffer)
+                self._stats["reused"] += 1
+
+        if buffer is None:
+            buffer = self._allocate(min_size)
+
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(buffer)
+                elif len(buffer) > self.size:
+                    # Keep the larger buffer rather than another default one
+                    smallest = min(self._idle, key=len)
+                    if len(smallest) < len(buffer):
+                        self._idle[self._idle.index(smallest)] = buffer
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._stats,
+                "idle": len(self._idle),
+                "idle_bytes": sum(len(b) for b in self._idle),
+            }
+
+    def _allocate(self, min_size: int) -> Array[c_char]:
+        size = self.size
+        while size < min_size:
+            size *= 2
+        with self._lock:
+            self._stats["allocated"] += 1
+            if size > self.size:
+                self._stats["grown"] += 1
+        return create_string_buffer(size)
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like object, without copying it.
+
+    Lets uploaders stream a memoryview into a leased buffer; reads copy only
+    the chunk being read. `detach` switches the reader to a private copy, so
+    the buffer can be released while a reader on another thread still uses it.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore[override]
+        target = memoryview(buffer).cast("B")
+        with self._lock:
+            chunk = self._view[self._pos : self._pos + len(target)]
+            target[: len(chunk)] = chunk
+            self._pos += len(chunk)
+        return len(chunk)
+
+    def detach(self) -> None:
+        """Copy the data, so later reads no longer touch the original buffer."""
+        with self._lock:
+            if not isinstance(self._view.obj, bytes):
+                self._view = memoryview(self._view.tobytes())
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
@@ -0,0 +1,45 @@
+import random
+from typing import Optional
+
+
+class AdaptivePollingSchedule:
+    """Polling interval that follows a device's activity.
+
+    A poll that finds new records drops the interval to `min_interval`; each
+    poll that finds none multiplies it by `backoff_factor`, up to
+    `max_interval`. Every delay is spread by +/- `jitter` (a fraction of the
+    interval), and the first one is drawn from [0, min_interval], so devices
+    that connected together do not poll together.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 1,
+        max_interval: float = 30,
+        backoff_factor: float = 2,
+        jitter: float = 0.2,
+        rng: Optional[random.Random] = None,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.interval = min_interval
+
+        self._rng = rng or random.Random()
+        self._first = True
+
+    def record_poll(self, new_records: int) -> None:
+        """Adjust the interval after a poll that found `new_records`."""
+        if new_records > 0:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next poll."""
+        if self._first:
+            self._first = False
+            return self._rng.uniform(0, self.min_interval)
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + self._rng.uniform(-spread, spread))
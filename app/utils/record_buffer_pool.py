@@ -0,0 +1,73 @@
+import threading
+from contextlib import contextmanager
+from ctypes import Array, Structure, sizeof
+from typing import Any, Dict, Iterator, List
+
+
+class RecordBuffer:
+    """A leased record array; `used` is how many slots the SDK wrote."""
+
+    def __init__(self, records: Array[Any]):
+        self.records = records
+        self.used = 0
+
+
+class RecordBufferPool:
+    """Pool of pre-initialised NetSDK record arrays.
+
+    FindNextRecord needs an array whose elements already carry ``dwSize``.
+    Arrays are built and stamped once, then leased out and returned after each
+    call, so a poll costs no allocation and only re-stamps the slots the device
+    actually filled. The number of live arrays follows the number of concurrent
+    calls, not the number of devices or threads.
+    """
+
+    def __init__(
+        self, struct_type: type[Structure], capacity: int = 2000, max_idle: int = 4
+    ):
+        self.struct_type = struct_type
+        self.capacity = capacity
+        self.max_idle = max_idle
+        self._idle: List[Array[Any]] = []
+        self._lock = threading.Lock()
+        self._stats = {"allocated": 0, "reused": 0}
+
+    @contextmanager
+    def lease(self, count: int) -> Iterator[RecordBuffer]:
+        """Lease an array with room for at least `count` records."""
+        if count > self.capacity:
+            yield RecordBuffer(self._allocate(count))
+            return
+
+        with self._lock:
+            records = self._idle.pop() if self._idle else None
+            if records is not None:
+                self._stats["reused"] += 1
+
+        if records is None:
+            records = self._allocate(self.capacity)
+
+        buffer = RecordBuffer(records)
+        try:
+            yield buffer
+        finally:
+            self._restamp(records, buffer.used)
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(records)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle)}
+
+    def _allocate(self, count: int) -> Array[Any]:
+        records = (self.struct_type * count)()
+        self._restamp(records, count)
+        with self._lock:
+            self._stats["allocated"] += 1
+        return records
+
+    def _restamp(self, records: Array[Any], count: int) -> None:
+        size = sizeof(self.struct_type)
+        for i in range(min(count, len(records))):
+            records[i].dwSize = size
@@ -1,8 +1,11 @@
 import requests
 
+# Shared so repeated downloads reuse connections
+_session = requests.Session()
+
 
 def get_face_image_url_to_bytes(face_image_url: str) -> bytes:
     """Get face image url from http request"""
-    response = requests.get(face_image_url)
+    response = _session.get(face_image_url, timeout=10)
     response.raise_for_status()
     return response.content
@@ -1,46 +1,60 @@
 import asyncio
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-import aioboto3  # type: ignore
-import httpx
 import structlog
 
 if TYPE_CHECKING:
     from app.core.containers import Container
 
-from app.core.events import UpdateLastRecNoEvent
 from app.core.settings import get_settings
+from app.services.access_record_cursor import AccessRecordCursor
+from app.services.webhook_router import ACCESS_CARD_EVENT
 from app.types.dahua_netsdk_types import AccessCardRecord
+from app.utils.checkpoint_tracker import CheckpointTracker
+from app.utils.polling_schedule import AdaptivePollingSchedule
 from app.workers.base_worker import BaseWorker
 
 settings = get_settings()
 
+# Records fetched per poll; a full fetch is followed by another poll right away
+MAX_RECORDS_PER_POLL = 2000
+
 
 class DeviceEventPollingWorker(BaseWorker):
     """
-    Worker class responsible for polling events from a specific Dahua device at regular intervals.
+    Worker class responsible for polling events from a specific Dahua device at adaptive intervals.
 
     This worker periodically checks for new access card records from the device, processes them,
     and manages event queues for further handling (such as image uploads). It uses asynchronous
-    loops to poll device events, process new events, and trigger wakeup intervals for polling.
+    loops to poll device events and process new events. Polls follow an adaptive schedule: often
+    while the device produces records, backing off while it is idle. When the device pushes
+    access-control alarms, each alarm triggers a poll and the schedule only runs as a slow safety net.
 
     Attributes:
         device_code (str): Unique identifier for the device being polled.
-        polling_interval (int): Interval in seconds between polling attempts.
+        polling_schedule (AdaptivePollingSchedule): Jittered delay before each poll.
+        safety_schedule (AdaptivePollingSchedule): Delay before each poll while alarms are pushed.
+        retry_delay (int): Seconds to wait before retrying after an error.
         dahua_netsdk_service: Service instance for interacting with Dahua device SDK.
         event_bus: Event bus for publishing or subscribing to events.
         logger: Structured logger for logging events and errors.
         metadata (Optional[Dict[str, Any]]): Additional metadata for worker configuration.
         last_uploaded_rec_no (int): Record number of the last uploaded event.
-        polling_wakeup_event (asyncio.Event): Event used to trigger polling cycles.
-        new_events_queue (asyncio.Queue[AccessCardRecord]): Queue for newly polled events.
+        polling_wakeup_event (asyncio.Event): Event used to trigger a poll before its delay ends.
+        new_events_queue (asyncio.Queue[Tuple[int, AccessCardRecord]]): Newly polled events,
+            with the checkpoint generation they were read in.
+        checkpoint_tracker (CheckpointTracker): Low-watermark of events processed concurrently.
+        records_expected (bool): Whether the last read found records, so the next poll reads
+            the cursor before querying the device's newest record.
 
     Methods:
-        process(): Main asynchronous loop that starts polling, image upload, and wakeup interval tasks.
-        _send_wakeup_interval(): Periodically sets the wakeup event to trigger polling.
-        _event_polling_loop(): Waits for wakeup events and polls device for new events.
-        _process_new_events(): Processes new events from the queue.
+        process(): Main asynchronous loop that starts the polling and event processing tasks.
+        _event_polling_loop(): Waits for the next scheduled poll or a wakeup and polls the device.
+        _on_alarm(): Wakes the polling loop; called from SDK threads on device alarms.
+        _process_new_events_loop(): Starts up to EVENT_PIPELINE_MAX_IN_FLIGHT queued events at a time.
         _poll_device_events(): Polls the device for new access card records and updates the queue.
+        _queue_new_records(): Reads records after the last queued one through the find cursor.
         cleanup(): Cleans up resources when the worker stops.
 
     Usage:
@@ -58,35 +72,76 @@ class DeviceEventPollingWorker(BaseWorker):
     ):
         super().__init__(name=f"device_event_polling_{device_code}")
         self.device_code = device_code
-        self.polling_interval = 5
+        self.retry_delay = 5
 
         self.dahua_netsdk_service = container.dahua_netsdk_service()
+        self.async_dahua_netsdk_service = container.async_dahua_netsdk_service()
         self.event_bus = container.event_bus()
+        self.s3_uploader = container.s3_uploader()
+        self.event_outbox = container.event_outbox()
+        self.checkpoint_writer = container.checkpoint_writer()
 
         self.logger = structlog.get_logger(__name__, device_code=device_code)
         self.metadata = metadata
 
+        # Per-device bounds from metadata, defaulting to the settings
+        self.polling_schedule = AdaptivePollingSchedule(
+            min_interval=metadata.get("polling_min_interval")  # type: ignore
+            or settings.POLLING_MIN_INTERVAL_SECONDS,
+            max_interval=metadata.get("polling_max_interval")  # type: ignore
+            or settings.POLLING_MAX_INTERVAL_SECONDS,
+            backoff_factor=settings.POLLING_BACKOFF_FACTOR,
+            jitter=settings.POLLING_JITTER,
+        )
+        self.safety_schedule = AdaptivePollingSchedule(
+            min_interval=settings.ALARM_SAFETY_POLL_INTERVAL_SECONDS,
+            max_interval=settings.ALARM_SAFETY_POLL_INTERVAL_SECONDS,
+            jitter=settings.POLLING_JITTER,
+        )
+
         self.last_uploaded_rec_no = metadata.get("last_uploaded_rec_no", -1)  # type: ignore
+        # Time of the checkpoint record, used to seek instead of scanning history
+        self.last_uploaded_rec_time: Optional[int] = None
 
-        self.polling_wakeup_event = asyncio.Event()
+        # Newest record handed to the queue; polling resumes after it
+        self.last_queued_rec_no = self.last_uploaded_rec_no
+        self.last_queued_rec_time: Optional[int] = None
+        # Whether the last read found records; if so the next poll reads the
+        # cursor first instead of querying the head
+        self.records_expected = False
 
-        self.new_events_queue: asyncio.Queue[AccessCardRecord] = asyncio.Queue()
+        self.polling_wakeup_event = asyncio.Event()
 
-        self.aws_session = aioboto3.Session(
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
+        self.new_events_queue: asyncio.Queue[Tuple[int, AccessCardRecord]] = (
+            asyncio.Queue()
         )
 
+        # Events are processed concurrently; the checkpoint only passes an
+        # event once every event queued before it is done
+        self.checkpoint_tracker = CheckpointTracker()
+        self.pipeline_slots = asyncio.Semaphore(settings.EVENT_PIPELINE_MAX_IN_FLIGHT)
+        self.download_slots = asyncio.Semaphore(settings.EVENT_DOWNLOAD_MAX_CONCURRENCY)
+        self.event_tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def record_cursor(self) -> AccessRecordCursor:
+        """The device's persistent find cursor, owned by the SDK service."""
+        return self.dahua_netsdk_service.get_record_cursor(self.device_code)
+
     async def process(self) -> None:
-        """Main processing loop - polls events every 5 seconds"""
+        """Main processing loop - polls events on the adaptive schedule"""
         self.logger.info("Starting device event polling", device_code=self.device_code)
 
+        if settings.ALARM_SUBSCRIPTION_ENABLED and (
+            self.dahua_netsdk_service.subscribe_alarms(self.device_code, self._on_alarm)
+        ):
+            # Alarms only announce new records; catch up on older ones now
+            self.polling_wakeup_event.set()
+
         try:
             await asyncio.gather(
                 self._event_polling_loop(),
                 self._process_new_events_loop(),
-                self._send_wakeup_interval(),
                 return_exceptions=True,
             )
 
@@ -100,46 +155,37 @@ class DeviceEventPollingWorker(BaseWorker):
                 exc_info=True,
             )
 
-    async def _send_wakeup_interval(self):
-        while not self.should_stop:
-            try:
-                self.polling_wakeup_event.set()
-                await asyncio.sleep(self.polling_interval)
-            except asyncio.CancelledError:
-                self.logger.info(
-                    "Wakeup interval cancelled", device_code=self.device_code
-                )
-                break
-            except Exception as e:
-                self.logger.error(
-                    "Error in wakeup interval",
-                    device_code=self.device_code,
-                    error=str(e),
-                    exc_info=True,
-                )
-                break
+    def _on_alarm(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self.polling_wakeup_event.set)
+        except RuntimeError:
+            # Closed after the check
+            pass
 
     def _debounce_save_last_uploaded_rec_no(self):
-        self.logger.info(
-            "Debounced save last uploaded rec no",
-            device_code=self.device_code,
-            last_uploaded_rec_no=self.last_uploaded_rec_no,
-        )
-
-        event = UpdateLastRecNoEvent(
-            device_code=self.device_code,
-            last_rec_no=self.last_uploaded_rec_no,
-        )
-
-        # Publish event via event bus (thread-safe)
-        self.event_bus.publish_threadsafe(event)
+        # Only the latest value per device is kept and written in bulk
+        self.checkpoint_writer.record(self.device_code, self.last_uploaded_rec_no)
 
     async def _event_polling_loop(self):
         while not self.should_stop:
             try:
-                await self.polling_wakeup_event.wait()
-                await self._poll_device_events()
+                if self.dahua_netsdk_service.is_listening(self.device_code):
+                    schedule = self.safety_schedule
+                else:
+                    schedule = self.polling_schedule
+                try:
+                    await asyncio.wait_for(
+                        self.polling_wakeup_event.wait(), schedule.next_delay()
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                # Cleared first, so a wakeup during the poll is not lost
                 self.polling_wakeup_event.clear()
+                new_records = await self._poll_device_events()
+                self.polling_schedule.record_poll(new_records)
 
             except asyncio.CancelledError:
                 self.logger.info("Polling cancelled", device_code=self.device_code)
@@ -154,11 +200,23 @@ class DeviceEventPollingWorker(BaseWorker):
     async def _process_new_events_loop(self):
         while not self.should_stop:
             try:
-                new_access_card_event = await asyncio.wait_for(
+                generation, new_access_card_event = await asyncio.wait_for(
                     self.new_events_queue.get(), timeout=10
                 )
 
-                await self._process_new_event(new_access_card_event)
+                await self.pipeline_slots.acquire()
+                # Records read before a rec_no restart are still stored, but
+                # no longer move the checkpoint
+                self.checkpoint_tracker.start(
+                    new_access_card_event.rec_no,
+                    int(new_access_card_event.stu_time.timestamp()),
+                    generation,
+                )
+                task = asyncio.create_task(
+                    self._process_new_event_task(new_access_card_event, generation)
+                )
+                self.event_tasks.add(task)
+                task.add_done_callback(self.event_tasks.discard)
 
             except asyncio.TimeoutError:
                 continue
@@ -175,7 +233,38 @@ class DeviceEventPollingWorker(BaseWorker):
                     exc_info=True,
                 )
 
-                await asyncio.sleep(self.polling_interval)
+                await asyncio.sleep(self.retry_delay)
+
+        for task in list(self.event_tasks):
+            task.cancel()
+        await asyncio.gather(*self.event_tasks, return_exceptions=True)
+
+    async def _process_new_event_task(
+        self, event: AccessCardRecord, generation: int
+    ) -> None:
+        try:
+            await self._process_new_event(event)
+        except asyncio.CancelledError:
+            # Unfinished: the checkpoint stays before it
+            self.pipeline_slots.release()
+            raise
+        except Exception as e:
+            # Not stored (the worker is stopping): the checkpoint stays before it
+            self.pipeline_slots.release()
+            self.logger.error(
+                "Error processing events",
+                device_code=self.device_code,
+                rec_no=event.rec_no,
+                error=str(e),
+                exc_info=True,
+            )
+            return
+        self.pipeline_slots.release()
+
+        checkpoint = self.checkpoint_tracker.complete(event.rec_no, generation)
+        if checkpoint is not None:
+            self.last_uploaded_rec_no, self.last_uploaded_rec_time = checkpoint
+            self._debounce_save_last_uploaded_rec_no()
 
     async def _process_new_event(self, event: AccessCardRecord) -> None:
         self.logger.info(
@@ -184,10 +273,34 @@ class DeviceEventPollingWorker(BaseWorker):
             rec_no=event.rec_no,
         )
 
-        if event.snap_ftp_url:
-            image_data = self.dahua_netsdk_service.download_remote_file(
-                self.device_code, event.snap_ftp_url
+        try:
+            await self._upload_snapshot(event)
+        except Exception as e:
+            # Stored without its image rather than skipped
+            event.image_url = None
+            self.logger.error(
+                "Failed to upload event snapshot",
+                device_code=self.device_code,
+                rec_no=event.rec_no,
+                error=str(e),
+                exc_info=True,
             )
+
+        await self._store_event(event)
+
+    async def _upload_snapshot(self, event: AccessCardRecord) -> None:
+        async with AsyncExitStack() as stack:
+            image_data = None
+            if event.snap_ftp_url:
+                # Device downloads are limited separately; the snapshot stays
+                # in a pooled SDK buffer until it is uploaded
+                async with self.download_slots:
+                    image_data = await stack.enter_async_context(
+                        self.async_dahua_netsdk_service.lease_remote_file(
+                            self.device_code, event.snap_ftp_url
+                        )
+                    )
+
             if image_data:
                 event.image_url = await self._upload_image_to_s3(
                     event.image_name(), image_data
@@ -198,93 +311,163 @@ class DeviceEventPollingWorker(BaseWorker):
                     device_code=self.device_code,
                     image_name=event.image_name(),
                     image_url=event.image_url,
+                    size=len(image_data),
                 )
 
-        await self._send_event_to_webhook(event)
-
-        self.last_uploaded_rec_no = event.rec_no
-        self._debounce_save_last_uploaded_rec_no()
-
-    async def _send_event_to_webhook(self, event: AccessCardRecord) -> None:
-        """Send event data to the configured webhook URL."""
-        webhook_url = settings.WEBHOOK_URL
-
-        # Debug: Check for bytes in payload
-        payload = event.to_webhook_payload()
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(webhook_url, json=payload)
-            if response.status_code != 200:
-                self.logger.error(
-                    "Failed to send event to webhook",
+    async def _store_event(self, event: AccessCardRecord) -> None:
+        """Store the event in the outbox, which delivers it to the webhooks."""
+        event_id = (
+            f"{self.device_code}:{event.rec_no}:{int(event.stu_time.timestamp())}"
+        )
+        while True:
+            try:
+                await self.event_outbox.add(
+                    ACCESS_CARD_EVENT,
+                    event_id,
+                    self.device_code,
+                    event.stu_time,
+                    event.to_webhook_payload(),
+                )
+                return
+            except Exception as e:
+                if self.should_stop:
+                    raise
+                # The checkpoint must not pass an event that was not stored
+                self.logger.warning(
+                    "Failed to store event, retrying",
                     device_code=self.device_code,
-                    event=payload,
-                    status=response.status_code,
+                    rec_no=event.rec_no,
+                    error=str(e),
                 )
-
-    async def _upload_image_to_s3(self, file_name: str, data_raw: bytes) -> str | None:
-        """Upload image to the s3."""
-
-        async with self.aws_session.client("s3") as s3:  # type: ignore
-            bucket_name = settings.AWS_S3_BUCKET
-            object_key = f"device_events/{self.device_code}/{file_name}.jpg"
-
-            await s3.put_object(  # type: ignore
-                Bucket=bucket_name,
-                Key=object_key,
-                Body=data_raw,
-                ContentType="image/jpeg",
+                await asyncio.sleep(self.retry_delay)
+
+    async def _upload_image_to_s3(
+        self, file_name: str, data_raw: bytes | memoryview
+    ) -> str | None:
+        """Upload image to the s3 through the shared uploader."""
+        object_key = f"device_events/{self.device_code}/{file_name}.jpg"
+        return await self.s3_uploader.upload(object_key, data_raw, "image/jpeg")
+
+    async def _poll_device_events(self) -> int:
+        """Queue the device's new records; returns how many were queued."""
+        if not self.dahua_netsdk_service.is_logged_in(self.device_code):
+            # Reconnecting: skip this cycle rather than wait on a dead login
+            self.logger.info(
+                "Device session is not connected, skipping poll",
+                device_code=self.device_code,
             )
+            return 0
 
-            return f"https://{bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{object_key}"
-
-    async def _poll_device_events(self) -> None:
         self.logger.info(
             "Polling events from device",
             device_code=self.device_code,
             last_uploaded_rec_no=self.last_uploaded_rec_no,
         )
 
-        latest_records = self.dahua_netsdk_service.find_records(
+        if self.records_expected and self.last_uploaded_rec_no != -1:
+            # Active device: the cursor's records tell where the head is, so
+            # the head query only runs once the cursor comes back empty
+            queued = await self._queue_new_records()
+            if queued:
+                return queued
+
+        # SDK reads run on the executor so the event pipeline keeps going
+        latest_records = await self.async_dahua_netsdk_service.find_records(
             self.device_code, None, None, None, 1, False
         )
 
         if len(latest_records) == 0:
             self.logger.info("No latest events found", device_code=self.device_code)
-            return
+            return 0
 
         rec_no_head = latest_records[0].rec_no
+        rec_time_head = int(latest_records[0].stu_time.timestamp())
 
         if self.last_uploaded_rec_no == -1:
             self.last_uploaded_rec_no = rec_no_head
+            self.last_uploaded_rec_time = rec_time_head
+            self.last_queued_rec_no = rec_no_head
+            self.last_queued_rec_time = rec_time_head
+            self._debounce_save_last_uploaded_rec_no()
             self.logger.info(
                 "Initialized last uploaded record number",
                 device_code=self.device_code,
                 last_uploaded_rec_no=self.last_uploaded_rec_no,
             )
-            return
+            return 0
 
         if rec_no_head < self.last_uploaded_rec_no:
             self.last_uploaded_rec_no = rec_no_head
-            return
-
-        records = self.dahua_netsdk_service.find_records_by_rec_no(
-            device_code=self.device_code,
-            from_rec_no=self.last_uploaded_rec_no + 1,
-            n_rec=2000,
-            by_asc_order=True,
+            self.last_uploaded_rec_time = rec_time_head
+            self.last_queued_rec_no = rec_no_head
+            self.last_queued_rec_time = rec_time_head
+            # Record numbers restarted; events queued or in flight no longer
+            # move the checkpoint
+            self.checkpoint_tracker.clear()
+            self._debounce_save_last_uploaded_rec_no()
+            await self.async_dahua_netsdk_service.reset_record_cursor(self.device_code)
+            return 0
+
+        if rec_no_head <= max(self.last_queued_rec_no, self.last_uploaded_rec_no):
+            self.logger.info("No new events found", device_code=self.device_code)
+            return 0
+
+        return await self._queue_new_records(rec_no_head)
+
+    async def _queue_new_records(self, rec_no_head: Optional[int] = None) -> int:
+        """Queue records after the last queued one, read through the cursor.
+
+        `rec_no_head` is the device's newest record when the caller queried
+        it; a seek that finds nothing then falls back to a full scan.
+        """
+        if self.last_queued_rec_no < self.last_uploaded_rec_no:
+            self.last_queued_rec_no = self.last_uploaded_rec_no
+            self.last_queued_rec_time = self.last_uploaded_rec_time
+
+        from_time = self.last_queued_rec_time or self.last_uploaded_rec_time
+        records = await self.async_dahua_netsdk_service.fetch_records(
+            self.device_code,
+            from_rec_no=self.last_queued_rec_no + 1,
+            from_time=from_time,
+            max_records=MAX_RECORDS_PER_POLL,
         )
 
+        if len(records) == 0 and from_time is not None and rec_no_head is not None:
+            # The head moved but the seek found nothing: the device clock went
+            # backwards, so fall back to a full scan from the checkpoint.
+            self.logger.warning(
+                "Seek found no new events, falling back to full scan",
+                device_code=self.device_code,
+                rec_no_head=rec_no_head,
+            )
+            await self.async_dahua_netsdk_service.reset_record_cursor(self.device_code)
+            records = await self.async_dahua_netsdk_service.fetch_records(
+                self.device_code,
+                from_rec_no=self.last_queued_rec_no + 1,
+                from_time=None,
+                max_records=MAX_RECORDS_PER_POLL,
+            )
+
+        self.records_expected = len(records) > 0
         if len(records) == 0:
-            self.logger.info("No new events found", device_code=self.device_code)
-            return
+            if rec_no_head is not None:
+                self.logger.info("No new events found", device_code=self.device_code)
+            return 0
+
+        if len(records) >= MAX_RECORDS_PER_POLL:
+            # More are waiting on the device
+            self.polling_wakeup_event.set()
 
         self.logger.info(
-            "New events found", device_code=self.device_code, records=len(records)
+            "New events found",
+            device_code=self.device_code,
+            records=len(records),
+            open_find_handles=self.record_cursor.open_handles,
         )
 
+        queued = 0
         for record in records:
-            if record.rec_no <= self.last_uploaded_rec_no:
+            if record.rec_no <= self.last_queued_rec_no:
                 self.logger.warn(
                     "Duplicate event found",
                     device_code=self.device_code,
@@ -292,16 +475,21 @@ class DeviceEventPollingWorker(BaseWorker):
                 )
                 continue
 
-            # self.logger.info(
-            #     "New event found",
-            #     device_code=self.device_code,
-            #     rec_no=record.rec_no,
-            # )
+            self.new_events_queue.put_nowait(
+                (self.checkpoint_tracker.generation, record)
+            )
+            self.last_queued_rec_no = record.rec_no
+            self.last_queued_rec_time = int(record.stu_time.timestamp())
+            queued += 1
 
-            self.new_events_queue.put_nowait(record)
+        return queued
 
     async def cleanup(self) -> None:
         """Cleanup when worker stops"""
         self.logger.info(
             "Cleaning up device event polling worker", device_code=self.device_code
         )
+        self.dahua_netsdk_service.unsubscribe_alarms(self.device_code)
+        self.dahua_netsdk_service.close_record_cursor(self.device_code)
+        # Write the final checkpoint once the manager is done stopping us
+        self.checkpoint_writer.request_flush()
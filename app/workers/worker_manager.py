@@ -82,7 +82,7 @@ class WorkerManager:
         elif (
             worker_type == WorkerType.DEVICE_EVENTS_POLLING and device_code is not None
         ):
-            return DeviceEventPollingWorker(device_code, self.container)
+            return DeviceEventPollingWorker(device_code, self.container, metadata)
         raise ValueError(f"Unknown worker type: {worker_type}")
 
     def _is_existed_device_worker(self, device_code: str, worker_type: WorkerType):
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DeviceRepo update paths, in round-trips and time per device.
+
+Runs against an in-memory SQLite database and counts the statements and
+commits each path sends. Compares update_device_by_code (UPDATE plus SELECT read-back)
+with patch_device_by_code (one Core UPDATE), and per-device patches with
+patch_devices_by_codes / bulk_patch_devices_by_code for a whole fleet.
+SQLite has no network, so real MySQL round-trips cost far more than shown.
+
+Usage: python benchmarks/bench_device_repo.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import BaseModel
+from app.models.device import Device
+from app.repos.device_repo import DeviceRepo
+
+DEVICES = 1000
+
+
+async def measure(
+    label: str,
+    statements: list[int],
+    devices: int,
+    fn: Callable[[], Awaitable[Any]],
+) -> None:
+    statements[0] = 0
+    start = time.perf_counter()
+    await fn()
+    seconds = time.perf_counter() - start
+    print(
+        f"{label:<42} {statements[0] / devices:6.3f} round-trips/device"
+        f"  {seconds / devices * 1e6:9.1f} us/device"
+    )
+
+
+async def main() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    statements = [0]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(*args: Any) -> None:
+        statements[0] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(*args: Any) -> None:
+        statements[0] += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    codes = [f"device-{i}" for i in range(DEVICES)]
+    async with session_factory() as session:
+        session.add_all(
+            Device(name=code, code=code, username="admin", password="admin")
+            for code in codes
+        )
+        await session.commit()
+
+    repo = DeviceRepo(session_factory)
+    print(f"devices: {DEVICES}")
+
+    async def each(update: Callable[[str, dict], Awaitable[Any]]) -> None:
+        for i, code in enumerate(codes):
+            await update(code, {"is_online": True, "port": 37777 + i % 10})
+
+    await measure(
+        "update_device_by_code (read-back)",
+        statements,
+        DEVICES,
+        lambda: each(repo.update_device_by_code),
+    )
+    await measure(
+        "patch_device_by_code",
+        statements,
+        DEVICES,
+        lambda: each(repo.patch_device_by_code),
+    )
+    await measure(
+        "patch_devices_by_codes (same values)",
+        statements,
+        DEVICES,
+        lambda: repo.patch_devices_by_codes(codes, {"is_online": False}),
+    )
+    await measure(
+        "bulk_patch_devices_by_code (per device)",
+        statements,
+        DEVICES,
+        lambda: repo.bulk_patch_devices_by_code(
+            {code: {"last_uploaded_rec_no": i} for i, code in enumerate(codes)}
+        ),
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fresh FindNextRecord arrays vs pooled, pre-initialised buffers.
+
+Compares the per-call cost of the old path (allocate a 2000-element
+NET_RECORDSET_ACCESS_CTL_CARDREC array and stamp every element) with leasing
+from RecordBufferPool, for pages of 0, 3 and 2000 returned records.
+
+Without the vendor NetSDK installed it runs on the stand-in structs from
+benchmarks/netsdk_standin.py.
+
+Usage: python benchmarks/bench_record_buffers.py
+"""
+
+import sys
+import timeit
+import tracemalloc
+from ctypes import sizeof
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.netsdk_standin import install as install_netsdk_standin
+
+STANDIN = install_netsdk_standin()
+
+from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARDREC  # type: ignore
+
+from app.utils.record_buffer_pool import RecordBufferPool
+
+PAGE_SIZE = 2000
+CALLS = 50
+
+
+def fresh_array(used: int) -> None:
+    pst_record = (NET_RECORDSET_ACCESS_CTL_CARDREC * PAGE_SIZE)()
+    for i in range(PAGE_SIZE):
+        pst_record[i] = NET_RECORDSET_ACCESS_CTL_CARDREC()
+        pst_record[i].dwSize = sizeof(NET_RECORDSET_ACCESS_CTL_CARDREC)
+
+
+def pooled_array(pool: RecordBufferPool, used: int) -> None:
+    with pool.lease(PAGE_SIZE) as buffer:
+        buffer.used = used
+
+
+def measure(label: str, fn) -> None:
+    fn()  # warm up
+    tracemalloc.start()
+    seconds = timeit.timeit(fn, number=CALLS)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} {seconds / CALLS * 1000:8.3f} ms/call"
+        f"  peak allocation {peak / 1024:10.1f} KiB"
+    )
+
+
+def main() -> None:
+    print(
+        f"structs: {'stand-in' if STANDIN else 'NetSDK'}, "
+        f"record size: {sizeof(NET_RECORDSET_ACCESS_CTL_CARDREC)} bytes, "
+        f"page size: {PAGE_SIZE}, calls: {CALLS}"
+    )
+    pool = RecordBufferPool(NET_RECORDSET_ACCESS_CTL_CARDREC, capacity=PAGE_SIZE)
+    for used in (0, 3, PAGE_SIZE):
+        measure(f"fresh  (returned={used})", lambda: fresh_array(used))
+        measure(f"pooled (returned={used})", lambda: pooled_array(pool, used))
+    print("pool stats:", pool.get_stats())
+
+
+if __name__ == "__main__":
+    main()
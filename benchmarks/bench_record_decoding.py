@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-record AccessCardRecord decoding vs AccessCardRecordBatch.
+
+Fills a 2000-record NET_RECORDSET_ACCESS_CTL_CARDREC page and compares
+decoding it with AccessCardRecord.from_net_recordset against the NumPy batch
+decoder, both column-only and with every record materialised.
+
+Without the vendor NetSDK installed it runs on the stand-in structs from
+benchmarks/netsdk_standin.py.
+
+Usage: python benchmarks/bench_record_decoding.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.netsdk_standin import install as install_netsdk_standin
+
+STANDIN = install_netsdk_standin()
+
+from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARDREC  # type: ignore
+
+from app.types.access_card_record_batch import AccessCardRecordBatch
+from app.types.dahua_netsdk_types import AccessCardRecord
+
+PAGE_SIZE = 2000
+CALLS = 20
+
+
+def make_page():
+    records = (NET_RECORDSET_ACCESS_CTL_CARDREC * PAGE_SIZE)()
+    for i in range(PAGE_SIZE):
+        record = records[i]
+        record.nRecNo = i
+        record.szCardNo = f"CARD{i:08d}".encode()
+        record.szCardName = f"User {i}".encode()
+        record.szUserID = f"{i:06d}".encode()
+        record.szReaderID = b"1"
+        record.szSnapFtpUrl = f"/mnt/appdata1/userpic/SnapShot/{i}.jpg".encode()
+        record.stuTime.dwYear = 2024
+        record.stuTime.dwMonth = 1 + i % 12
+        record.stuTime.dwDay = 1 + i % 28
+        record.stuTime.dwHour = i % 24
+        record.stuTime.dwMinute = i % 60
+        record.stuTime.dwSecond = i % 60
+    return records
+
+
+def per_record(records) -> None:
+    [AccessCardRecord.from_net_recordset(records[i]) for i in range(PAGE_SIZE)]
+
+
+def batch_columns(records) -> None:
+    AccessCardRecordBatch.from_net_recordset_array(records, PAGE_SIZE)
+
+
+def batch_materialised(records) -> None:
+    list(AccessCardRecordBatch.from_net_recordset_array(records, PAGE_SIZE))
+
+
+def batch_filtered(records) -> None:
+    # Typical polling page: only the tail past the checkpoint is new
+    batch = AccessCardRecordBatch.from_net_recordset_array(records, PAGE_SIZE)
+    list(batch.from_rec_no(PAGE_SIZE - 10))
+
+
+def main() -> None:
+    records = make_page()
+    print(
+        f"structs: {'stand-in' if STANDIN else 'NetSDK'}, "
+        f"page size: {PAGE_SIZE}, calls: {CALLS}"
+    )
+    for label, fn in (
+        ("per-record decode", per_record),
+        ("batch, columns only", batch_columns),
+        ("batch, all materialised", batch_materialised),
+        ("batch, last 10 materialised", batch_filtered),
+    ):
+        fn(records)  # warm up
+        seconds = timeit.timeit(lambda: fn(records), number=CALLS)
+        print(f"{label:<30} {seconds / CALLS * 1000:8.3f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Stand-in NetSDK struct modules for running the benchmarks without the SDK.
+
+`install()` does nothing when the vendor NetSDK package is importable.
+Otherwise it registers NetSDK, NetSDK.SDK_Struct and NetSDK.SDK_Enum with the
+few types the record decoding path imports. The fields the service reads
+follow the NetSDK headers; the trailing reserved block pads each record to
+roughly the SDK's size, so allocation and copy costs are comparable, but
+absolute numbers will differ from the vendor structs.
+"""
+
+import sys
+import types
+from ctypes import Structure, c_byte, c_char, c_float, c_int, c_uint
+
+
+class NET_TIME(Structure):
+    _fields_ = [
+        ("dwYear", c_uint),
+        ("dwMonth", c_uint),
+        ("dwDay", c_uint),
+        ("dwHour", c_uint),
+        ("dwMinute", c_uint),
+        ("dwSecond", c_uint),
+    ]
+
+
+class NET_RECORDSET_ACCESS_CTL_CARDREC(Structure):
+    _fields_ = [
+        ("dwSize", c_uint),
+        ("nRecNo", c_int),
+        ("szCardNo", c_char * 32),
+        ("szPwd", c_char * 64),
+        ("stuTime", NET_TIME),
+        ("bStatus", c_int),
+        ("emMethod", c_int),
+        ("nDoor", c_int),
+        ("szUserID", c_char * 32),
+        ("nReaderID", c_int),
+        ("szSnapFtpUrl", c_char * 260),
+        ("szReaderID", c_char * 32),
+        ("emCardType", c_int),
+        ("nErrorCode", c_int),
+        ("szRecordURL", c_char * 260),
+        ("nNumbers", c_int),
+        ("emAttendanceState", c_int),
+        ("emDirection", c_int),
+        ("szCardName", c_char * 64),
+        ("bIsOverTemparature", c_int),
+        ("emTemperatureUnit", c_int),
+        ("fCurrentTemperature", c_float),
+        ("emMask", c_int),
+        ("nMethod", c_int),
+        ("byReserved", c_byte * 2048),
+    ]
+
+
+class NET_RECORDSET_ACCESS_CTL_CARD(Structure):
+    _fields_ = [
+        ("dwSize", c_uint),
+        ("nRecNo", c_int),
+        ("stuCreateTime", NET_TIME),
+        ("szCardNo", c_char * 32),
+        ("szUserID", c_char * 32),
+        ("emStatus", c_int),
+        ("emType", c_int),
+        ("szPsw", c_char * 64),
+        ("nDoorNum", c_int),
+        ("sznDoors", c_int * 32),
+        ("nTimeSectionNum", c_int),
+        ("sznTimeSectionNo", c_int * 32),
+        ("nUserTime", c_int),
+        ("stuValidStartTime", NET_TIME),
+        ("stuValidEndTime", NET_TIME),
+        ("bIsValid", c_int),
+        ("szCardName", c_char * 64),
+        ("bFirstEnter", c_int),
+        ("szCitizenIDNo", c_char * 32),
+        ("byReserved", c_byte * 1024),
+    ]
+
+
+class EM_AUTOREGISTER_TYPE:
+    CONNECT = 1
+    DISCONNECT = 2
+
+
+def install() -> bool:
+    """Register the stand-in modules unless NetSDK is installed.
+
+    Returns whether the stand-in is in use.
+    """
+    try:
+        import NetSDK.SDK_Struct  # type: ignore  # noqa: F401
+
+        return False
+    except ImportError:
+        pass
+
+    sdk_struct = types.ModuleType("NetSDK.SDK_Struct")
+    sdk_struct.NET_TIME = NET_TIME  # type: ignore
+    sdk_struct.NET_RECORDSET_ACCESS_CTL_CARDREC = (  # type: ignore
+        NET_RECORDSET_ACCESS_CTL_CARDREC
+    )
+    sdk_struct.NET_RECORDSET_ACCESS_CTL_CARD = (  # type: ignore
+        NET_RECORDSET_ACCESS_CTL_CARD
+    )
+    sdk_enum = types.ModuleType("NetSDK.SDK_Enum")
+    sdk_enum.EM_AUTOREGISTER_TYPE = EM_AUTOREGISTER_TYPE  # type: ignore
+    package = types.ModuleType("NetSDK")
+    package.__path__ = []  # type: ignore
+    package.SDK_Struct = sdk_struct  # type: ignore
+    package.SDK_Enum = sdk_enum  # type: ignore
+
+    sys.modules.update(
+        {
+            "NetSDK": package,
+            "NetSDK.SDK_Struct": sdk_struct,
+            "NetSDK.SDK_Enum": sdk_enum,
+        }
+    )
+    return True
@@ -33,15 +33,40 @@ async def lifespan(app: FastAPI):
     db = container.db()
     await db.init()
 
+    device_registry = container.device_registry()
+    await device_registry.warm()
+
     dh_service = container.dahua_netsdk_service()
     await dh_service.init()
 
+    face_image_fetcher = container.face_image_fetcher()
+    await face_image_fetcher.init()
+
+    s3_uploader = container.s3_uploader()
+    await s3_uploader.init()
+
+    webhook_dispatcher = container.webhook_dispatcher()
+    await webhook_dispatcher.init()
+
+    async_dh_service = container.async_dahua_netsdk_service()
+    await async_dh_service.init()
+
+    login_scheduler = container.login_scheduler()
+    await login_scheduler.start()
+
+    webhook_router = container.webhook_router()
+    await webhook_router.start()
+
+    event_outbox = container.event_outbox()
+    await event_outbox.start()
+
+    checkpoint_writer = container.checkpoint_writer()
+    await checkpoint_writer.start()
+
     # Setup event handlers - manually subscribe
     device_handler = container.device_auto_register_handler()
-    update_handler = container.update_last_rec_no_handler()
 
     event_bus.subscribe("device_auto_register", device_handler)
-    event_bus.subscribe("update_last_rec_no", update_handler)
 
     # Start event bus
     await event_bus.start()
@@ -61,6 +86,16 @@ async def lifespan(app: FastAPI):
     # Stop event bus
     await event_bus.stop()
 
+    await container.provisioning_service().shutdown()
+    await login_scheduler.shutdown()
+    await event_outbox.shutdown()
+    await checkpoint_writer.shutdown()
+    await webhook_router.shutdown()
+
+    await async_dh_service.shutdown()
+    await face_image_fetcher.shutdown()
+    await s3_uploader.shutdown()
+    await webhook_dispatcher.shutdown()
     await dh_service.shutdown()
     # Shutdown resources
     db = container.db()
@@ -83,7 +118,13 @@ def create_app() -> FastAPI:
     app.state.container = container
 
     # Wire the container to the app modules for dependency injection
-    container.wire(modules=["app.apis.v1.users", "app.apis.v1.devices"])
+    container.wire(
+        modules=[
+            "app.apis.v1.users",
+            "app.apis.v1.devices",
+            "app.apis.v1.provisioning",
+        ]
+    )
 
     # Add CORS middleware
     app.add_middleware(
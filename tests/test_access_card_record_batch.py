@@ -0,0 +1,123 @@
+from ctypes import addressof, memmove, sizeof
+
+import pytest
+
+from benchmarks.netsdk_standin import install as install_netsdk_standin
+
+# The vendor structs when NetSDK is installed, the stand-in otherwise
+install_netsdk_standin()
+
+from NetSDK.SDK_Struct import NET_RECORDSET_ACCESS_CTL_CARDREC  # type: ignore  # noqa: E402
+
+from app.types.access_card_record_batch import AccessCardRecordBatch  # noqa: E402
+from app.types.dahua_netsdk_types import AccessCardRecord  # noqa: E402
+
+
+def set_time(record, year, month, day, hour=0, minute=0, second=0):
+    time = record.stuTime
+    time.dwYear, time.dwMonth, time.dwDay = year, month, day
+    time.dwHour, time.dwMinute, time.dwSecond = hour, minute, second
+
+
+def set_raw(record, field, raw: bytes):
+    """Write bytes into a char field, NULs and trailing garbage included."""
+    offset = getattr(NET_RECORDSET_ACCESS_CTL_CARDREC, field).offset
+    memmove(addressof(record) + offset, raw, len(raw))
+
+
+def build_page():
+    records = (NET_RECORDSET_ACCESS_CTL_CARDREC * 6)()
+    for index, record in enumerate(records):
+        record.dwSize = sizeof(NET_RECORDSET_ACCESS_CTL_CARDREC)
+        record.nRecNo = 100 + index
+        record.emCardType = index % 3
+        record.nDoor = index
+        record.bStatus = index % 2
+        record.nErrorCode = 0x10 * index
+        record.nMethod = 15
+        record.emDirection = 1 + index % 2
+        record.bIsOverTemparature = index == 3
+        record.emTemperatureUnit = 0
+        record.fCurrentTemperature = 36.6 + index / 10
+        record.emMask = index % 2
+        set_time(record, 2026, 1 + index, 28, 23, 59, index)
+
+    # Plain ASCII values
+    records[0].szCardNo = b"A1B2C3"
+    records[0].szCardName = b"Alice"
+    records[0].szUserID = b"1001"
+    records[0].szReaderID = b"1"
+    records[0].szSnapFtpUrl = b"/mnt/appdata1/userpic/SnapShot/2026-01-28/1.jpg"
+
+    # Empty strings everywhere (records[1] is left zeroed)
+
+    # Non-ASCII names
+    records[2].szCardName = "Nguyễn Văn An".encode()
+    records[2].szUserID = "用户42".encode()
+    records[3].szCardName = "Zoë Ørsted".encode()
+
+    # Bytes left after the terminating NUL are not part of the value
+    set_raw(records[4], "szCardName", b"Bob\x00stale name")
+    set_raw(records[4], "szCardNo", b"\x00leftover")
+
+    # A multi-byte character cut off at the end of the field
+    name_width = getattr(NET_RECORDSET_ACCESS_CTL_CARDREC, "szCardName").size
+    set_raw(records[5], "szCardName", b"x" * (name_width - 1) + "é".encode()[:1])
+
+    # Leap day and the first second of the epoch
+    set_time(records[3], 2024, 2, 29, 12, 0, 0)
+    set_time(records[5], 1970, 1, 1, 0, 0, 0)
+    return records
+
+
+def test_batch_decodes_like_the_per_record_decoder():
+    records = build_page()
+
+    expected = [AccessCardRecord.from_net_recordset(record) for record in records]
+    batch = AccessCardRecordBatch.from_net_recordset_array(records, len(records))
+
+    assert len(batch) == len(expected)
+    for decoded, reference in zip(batch, expected):
+        assert vars(decoded) == vars(reference)
+        assert decoded.stu_time.tzinfo == reference.stu_time.tzinfo
+
+
+def test_expected_values_are_decoded():
+    batch = AccessCardRecordBatch.from_net_recordset_array(build_page(), 6)
+
+    assert batch[0].card_name == "Alice"
+    assert batch[1].card_no == "" and batch[1].card_name == ""
+    assert batch[2].card_name == "Nguyễn Văn An"
+    assert batch[2].user_id == "用户42"
+    assert batch[4].card_name == "Bob" and batch[4].card_no == ""
+    assert batch[3].stu_time.isoformat() == "2024-02-29T12:00:00+00:00"
+    assert batch[5].stu_time.timestamp() == 0
+
+
+def test_only_the_first_count_records_are_decoded():
+    records = build_page()
+
+    batch = AccessCardRecordBatch.from_net_recordset_array(records, 2)
+
+    assert [record.rec_no for record in batch] == [100, 101]
+
+
+def test_from_rec_no_matches_filtering_decoded_records():
+    records = build_page()
+
+    batch = AccessCardRecordBatch.from_net_recordset_array(records, len(records))
+
+    assert [r.rec_no for r in batch.from_rec_no(103)] == [103, 104, 105]
+    assert len(batch.from_rec_no(None)) == len(records)
+
+
+def test_invalid_time_raises_like_the_per_record_decoder():
+    records = build_page()
+    set_time(records[1], 2026, 4, 31)
+
+    with pytest.raises(ValueError):
+        AccessCardRecord.from_net_recordset(records[1])
+    batch = AccessCardRecordBatch.from_net_recordset_array(records, len(records))
+    assert batch[0].rec_no == 100
+    with pytest.raises(ValueError):
+        batch[1]
@@ -0,0 +1,79 @@
+from app.utils.checkpoint_tracker import CheckpointTracker
+
+
+def start_all(tracker, rec_nos, generation=0):
+    for rec_no in rec_nos:
+        tracker.start(rec_no, rec_no * 10, generation)
+
+
+def test_in_order_completion_moves_the_checkpoint_each_time():
+    tracker = CheckpointTracker()
+    start_all(tracker, [1, 2, 3])
+
+    assert tracker.complete(1, 0) == (1, 10)
+    assert tracker.complete(2, 0) == (2, 20)
+    assert tracker.complete(3, 0) == (3, 30)
+    assert len(tracker) == 0
+
+
+def test_out_of_order_completion_waits_for_earlier_records():
+    tracker = CheckpointTracker()
+    start_all(tracker, [1, 2, 3, 4])
+
+    assert tracker.complete(3, 0) is None
+    assert tracker.complete(2, 0) is None
+    # Record 1 releases everything completed behind it
+    assert tracker.complete(1, 0) == (3, 30)
+    assert tracker.complete(4, 0) == (4, 40)
+
+
+def test_failed_record_holds_the_watermark():
+    tracker = CheckpointTracker()
+    start_all(tracker, [1, 2, 3, 4])
+
+    assert tracker.complete(1, 0) == (1, 10)
+    # Record 2 failed and is never completed
+    assert tracker.complete(3, 0) is None
+    assert tracker.complete(4, 0) is None
+    assert len(tracker) == 3
+
+
+def test_unknown_and_repeated_completions_are_ignored():
+    tracker = CheckpointTracker()
+    start_all(tracker, [1, 2])
+
+    assert tracker.complete(7, 0) is None
+    assert tracker.complete(1, 0) == (1, 10)
+    assert tracker.complete(1, 0) is None
+    assert tracker.complete(2, 0) == (2, 20)
+
+
+def test_clear_starts_a_new_generation():
+    tracker = CheckpointTracker()
+    start_all(tracker, [100, 101, 102])
+    assert tracker.complete(100, 0) == (100, 1000)
+
+    # The cursor was reset after the device restarted its numbering at 5
+    tracker.clear()
+    assert tracker.generation == 1
+    assert len(tracker) == 0
+    start_all(tracker, [6, 7], generation=1)
+
+    # In-flight records of the old generation no longer move the checkpoint
+    assert tracker.complete(101, 0) is None
+    assert tracker.complete(102, 0) is None
+    assert tracker.complete(6, 1) == (6, 60)
+    assert tracker.complete(7, 1) == (7, 70)
+
+
+def test_records_started_with_an_old_generation_are_not_tracked():
+    tracker = CheckpointTracker()
+    tracker.clear()
+
+    # Queued before the reset, started after it
+    tracker.start(103, 1030, 0)
+    start_all(tracker, [6], generation=1)
+
+    assert len(tracker) == 1
+    assert tracker.complete(103, 0) is None
+    assert tracker.complete(6, 1) == (6, 60)
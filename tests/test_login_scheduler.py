@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.exceptions import DeviceOfflineError
+from app.services.login_scheduler import LoginScheduler
+
+
+class FakeAsyncNetSDKService:
+    """Records login and logout calls; each login waits for `release`."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.next_login_id = 100
+
+    async def login(self, device_code, ip, port, username, password):
+        self.calls.append(("login", device_code))
+        await self.release.wait()
+        self.next_login_id += 1
+        return self.next_login_id
+
+    async def logout(self, device_code):
+        self.calls.append(("logout", device_code))
+
+
+async def started_scheduler(service):
+    scheduler = LoginScheduler(service, max_concurrency=4, rate=0)  # type: ignore
+    await scheduler.start()
+    return scheduler
+
+
+def test_login_returns_login_id():
+    async def run():
+        service = FakeAsyncNetSDKService()
+        service.release.set()
+        scheduler = await started_scheduler(service)
+
+        login_id = await scheduler.login("dev", "10.0.0.1", 37777, "u", "p")
+
+        await scheduler.shutdown()
+        return login_id, service.calls
+
+    login_id, calls = asyncio.run(run())
+    assert login_id == 101
+    assert calls == [("login", "dev")]
+
+
+def test_cancel_fails_a_queued_login():
+    async def run():
+        service = FakeAsyncNetSDKService()
+        scheduler = LoginScheduler(service)  # type: ignore  # not started
+        login = asyncio.create_task(scheduler.login("dev", "10.0.0.1", 37777, "u", "p"))
+        await asyncio.sleep(0)
+
+        scheduler.cancel("dev")
+
+        with pytest.raises(DeviceOfflineError):
+            await login
+        return service.calls
+
+    assert asyncio.run(run()) == []
+
+
+def test_disconnect_during_login_logs_out_and_returns_none():
+    async def run():
+        service = FakeAsyncNetSDKService()
+        scheduler = await started_scheduler(service)
+        login = asyncio.create_task(scheduler.login("dev", "10.0.0.1", 37777, "u", "p"))
+        while not service.calls:
+            await asyncio.sleep(0)
+
+        # DISCONNECT arrives while the SDK login is running
+        scheduler.cancel("dev")
+        await service.logout("dev")
+        service.release.set()
+
+        login_id = await login
+        await scheduler.shutdown()
+        return login_id, service.calls, scheduler.get_stats()
+
+    login_id, calls, stats = asyncio.run(run())
+    assert login_id is None
+    assert calls == [("login", "dev"), ("logout", "dev"), ("logout", "dev")]
+    assert stats["cancelled"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_reconnect_after_disconnect_during_login_stays_logged_in():
+    async def run():
+        service = FakeAsyncNetSDKService()
+        scheduler = await started_scheduler(service)
+        first = asyncio.create_task(scheduler.login("dev", "10.0.0.1", 37777, "u", "p"))
+        while not service.calls:
+            await asyncio.sleep(0)
+
+        scheduler.cancel("dev")
+        second = asyncio.create_task(
+            scheduler.login("dev", "10.0.0.2", 37777, "u", "p")
+        )
+        await asyncio.sleep(0.01)
+        service.release.set()
+
+        results = await asyncio.gather(first, second)
+        await scheduler.shutdown()
+        return results, service.calls
+
+    (first_id, second_id), calls = asyncio.run(run())
+    assert first_id is None
+    assert second_id == 102
+    # The stale login is logged out before the reconnect logs in again
+    assert calls == [("login", "dev"), ("logout", "dev"), ("login", "dev")]
@@ -0,0 +1,72 @@
+import random
+
+from app.utils.polling_schedule import AdaptivePollingSchedule
+
+
+def schedule(**kwargs):
+    kwargs.setdefault("rng", random.Random(42))
+    return AdaptivePollingSchedule(**kwargs)
+
+
+def test_first_delay_is_spread_over_the_minimum_interval():
+    delays = [
+        AdaptivePollingSchedule(min_interval=2, rng=random.Random(seed)).next_delay()
+        for seed in range(200)
+    ]
+
+    assert all(0 <= delay <= 2 for delay in delays)
+    assert min(delays) < 0.5 and max(delays) > 1.5
+
+
+def test_idle_polls_back_off_up_to_the_maximum():
+    polls = schedule(min_interval=1, max_interval=10, backoff_factor=2)
+
+    intervals = []
+    for _ in range(6):
+        polls.record_poll(0)
+        intervals.append(polls.interval)
+
+    assert intervals == [2, 4, 8, 10, 10, 10]
+
+
+def test_activity_snaps_back_to_the_minimum():
+    polls = schedule(min_interval=1, max_interval=30)
+    for _ in range(10):
+        polls.record_poll(0)
+    assert polls.interval == 30
+
+    polls.record_poll(5)
+
+    assert polls.interval == 1
+
+
+def test_jittered_delays_stay_within_bounds():
+    jitter = 0.2
+    polls = schedule(min_interval=1, max_interval=30, jitter=jitter)
+    polls.next_delay()
+
+    rng = random.Random(7)
+    for _ in range(1000):
+        polls.record_poll(rng.choice([0, 0, 0, 3]))
+        delay = polls.next_delay()
+        assert 1 <= polls.interval <= 30
+        assert polls.interval * (1 - jitter) <= delay <= polls.interval * (1 + jitter)
+        assert 1 * (1 - jitter) <= delay <= 30 * (1 + jitter)
+
+
+def test_no_jitter_gives_the_interval():
+    polls = schedule(min_interval=1, max_interval=8, jitter=0)
+    polls.next_delay()
+
+    polls.record_poll(0)
+    polls.record_poll(0)
+
+    assert polls.next_delay() == 4
+
+
+def test_max_below_min_is_raised_to_min():
+    polls = schedule(min_interval=5, max_interval=2)
+    polls.record_poll(0)
+
+    assert polls.max_interval == 5
+    assert polls.interval == 5
@@ -0,0 +1,82 @@
+from app.services.user_sync_service import UserSyncPlan
+from app.types.dahua_netsdk_types import UserPayload
+
+
+def card(user_id, card_no, rec_no=None, **fields):
+    fields.setdefault("card_name", f"{user_id} name")
+    return UserPayload(user_id=user_id, card_no=card_no, rec_no=rec_no, **fields)
+
+
+def test_matching_cards_are_unchanged():
+    current = [card("u1", "c1", rec_no=1), card("u2", "c2", rec_no=2)]
+    desired = [card("u1", "c1"), card("u2", "c2")]
+
+    plan = UserSyncPlan.diff(current, desired)
+
+    assert plan.is_empty
+    assert plan.unchanged == 2
+
+
+def test_fields_not_read_back_with_the_card_are_ignored():
+    # As read back: the batch insert does not write these to the card
+    current = [card("u1", "c1", rec_no=1, card_name="", sz_pw=None)]
+    desired = [
+        card(
+            "u1",
+            "c1",
+            card_name="Somebody",
+            sz_pw="4321",
+            valid_start_time=1700000000,
+            valid_end_time=1800000000,
+            first_enter=True,
+            citizen_id_no="123",
+        )
+    ]
+
+    plan = UserSyncPlan.diff(current, desired)
+
+    assert plan.is_empty
+    assert plan.unchanged == 1
+
+
+def test_new_card_is_inserted():
+    plan = UserSyncPlan.diff([], [card("u1", "c1")])
+
+    assert [user.card_no for user in plan.inserts] == ["c1"]
+    assert not plan.updates and not plan.deletes
+
+
+def test_card_with_another_type_is_updated():
+    current = [card("u1", "c1", rec_no=1, card_type=2)]
+
+    plan = UserSyncPlan.diff(current, [card("u1", "c1")])
+
+    assert [user.card_no for user in plan.updates] == ["c1"]
+    assert not plan.inserts and not plan.deletes
+
+
+def test_card_moved_to_another_user_is_replaced():
+    current = [card("u1", "c1", rec_no=7)]
+
+    plan = UserSyncPlan.diff(current, [card("u2", "c1")])
+
+    assert [(c.user_id, c.rec_no) for c in plan.deletes] == [("u1", 7)]
+    assert [user.user_id for user in plan.inserts] == ["u2"]
+    assert not plan.updates
+
+
+def test_missing_cards_are_kept_by_default():
+    current = [card("u1", "c1", rec_no=1), card("u2", "c2", rec_no=2)]
+
+    plan = UserSyncPlan.diff(current, [card("u1", "c1")])
+
+    assert plan.is_empty
+
+
+def test_missing_cards_are_deleted_when_asked():
+    current = [card("u1", "c1", rec_no=1), card("u2", "c2", rec_no=2)]
+
+    plan = UserSyncPlan.diff(current, [card("u1", "c1")], delete_missing=True)
+
+    assert [(c.card_no, c.rec_no) for c in plan.deletes] == [("c2", 2)]
+    assert plan.unchanged == 1